@@ -51,3 +51,16 @@ def get_test_history_path() -> Path:
 
 def get_http_log_path() -> Path:
     return get_app_data_dir() / "http_log.txt"
+
+
+def get_model_catalog_path() -> Path:
+    return get_app_data_dir() / "model_catalog.json"
+
+
+def get_llm_metrics_path() -> Path:
+    return get_app_data_dir() / "llm_metrics.json"
+
+
+def get_cache_dir(name: str) -> Path:
+    """Diretório para uma cache persistente (p.ex. 'explanations')."""
+    return get_app_data_dir() / "cache" / name
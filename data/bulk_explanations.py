@@ -0,0 +1,241 @@
+"""
+Explicação em lote das respostas erradas de um teste.
+
+BulkExplanationDialog gera todas as explicações com um conjunto de workers
+(ExplanationPrefetcher), mostra o progresso e cada explicação assim que chega,
+e exporta o conjunto para uma única folha de estudo HTML.
+"""
+
+import datetime
+import html
+import re
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                               QProgressBar, QListWidget, QListWidgetItem, QTextBrowser,
+                               QSplitter, QFileDialog, QMessageBox)
+from PySide6.QtCore import Qt, QObject, Signal
+
+from .constants import BULK_EXPLANATION_CONCURRENCY
+from .explanation_batch import question_prompt_section
+from .explanation_jobs import ExplanationPrefetcher, PRIORITY_WRONG
+from .image_enrichment import is_html_content
+from .i18n import tr
+from .llm_race import create_llm_client
+
+
+def _explanation_body_html(text: str) -> str:
+    """HTML da explicação sem os comentários (IMAGE_KEYWORDS, debug)."""
+    text = re.sub(r'<!--.*?-->', '', text or '', flags=re.DOTALL)
+    if is_html_content(text):
+        return text
+    return f"<div style='white-space: pre-wrap;'>{html.escape(text)}</div>"
+
+
+def _field(detail: dict, key: str) -> str:
+    """Campo do detalhe de uma pergunta, escapado para HTML."""
+    return html.escape(str(detail.get(key, '')))
+
+
+def build_study_sheet_html(title: str, entries: list) -> str:
+    """Folha de estudo: entries é uma lista de (detalhe da pergunta errada, explicação ou None)."""
+    sections = []
+    for i, (detail, text) in enumerate(entries, 1):
+        if text:
+            explanation = _explanation_body_html(text)
+        else:
+            explanation = f"<p><i>{html.escape(tr('Sem explicação'))}</i></p>"
+        sections.append(f"""
+        <section>
+          <h2>{i}. {html.escape(tr("Questão"))} {_field(detail, 'question_number')}
+            <small>({_field(detail, 'category')})</small></h2>
+          <p class="question">{_field(detail, 'question_text')}</p>
+          <p class="wrong"><b>{html.escape(tr("Sua resposta:"))}</b>
+            {_field(detail, 'user_answer')}</p>
+          <p class="right"><b>{html.escape(tr("Resposta correta:"))}</b>
+            {_field(detail, 'correct_answer')}</p>
+          <div class="explanation">{explanation}</div>
+        </section>""")
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>{html.escape(title)}</title>
+<style>
+  body {{ font-family: Arial, Helvetica, sans-serif; line-height: 1.6;
+         max-width: 900px; margin: 0 auto; padding: 20px; }}
+  section {{ border-bottom: 1px solid #ccc; padding-bottom: 16px; margin-bottom: 16px;
+            page-break-inside: avoid; }}
+  h2 small {{ color: #666; font-weight: normal; }}
+  .question {{ font-weight: bold; }}
+  .wrong {{ color: #c62828; }}
+  .right {{ color: #2e7d32; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>{datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}</p>
+{''.join(sections)}
+</body>
+</html>
+"""
+
+
+class _ResultRelay(QObject):
+    """Leva os resultados do event loop para a thread da UI (sinal em fila)."""
+    result = Signal(object, object, object)  # job_id, text, error
+
+
+class BulkExplanationDialog(QDialog):
+    """Gera e mostra as explicações de todas as perguntas erradas."""
+
+    def __init__(self, app, questions, wrong_details):
+        super().__init__(app)
+        self.app = app
+        self.setWindowTitle(tr("Explicar todas as erradas"))
+        self.resize(1000, 700)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, True)
+
+        self._details = list(wrong_details)
+        self._questions = {q.number: q for q in questions}
+        self._texts = {}  # question_number -> texto
+        self._errors = {}  # question_number -> mensagem
+        self._items = {}  # question_number -> QListWidgetItem
+
+        self._setup_ui()
+
+        self._relay = _ResultRelay(self)
+        self._relay.result.connect(self._on_result)
+        prefs = app.preferences
+        provider = prefs.get_llm_provider()
+        self._jobs = ExplanationPrefetcher(
+            lambda: create_llm_client(prefs, provider),
+            BULK_EXPLANATION_CONCURRENCY,
+            on_result=self._emit_result,
+            batch_template=prefs.get_llm_prompt_template(),
+            batch_size=prefs.get_llm_batch_size())
+        for order, detail in enumerate(self._details):
+            qnum = detail['question_number']
+            question = self._questions.get(qnum)
+            if question is not None:
+                self._jobs.schedule(qnum, app._build_explanation_prompt(question), PRIORITY_WRONG,
+                                    order, section=question_prompt_section(question))
+        self.finished.connect(lambda _code: self._jobs.cancel())
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        progress_layout = QHBoxLayout()
+        self.progress_label = QLabel()
+        progress_layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, len(self._details))
+        progress_layout.addWidget(self.progress_bar)
+        layout.addLayout(progress_layout)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.list_widget = QListWidget()
+        for detail in self._details:
+            item = QListWidgetItem()
+            item.setData(Qt.ItemDataRole.UserRole, detail['question_number'])
+            self._items[detail['question_number']] = item
+            self.list_widget.addItem(item)
+            self._update_item(detail)
+        self.list_widget.currentItemChanged.connect(lambda *_: self._show_current())
+        splitter.addWidget(self.list_widget)
+
+        self.viewer = QTextBrowser()
+        self.viewer.setOpenExternalLinks(True)
+        splitter.addWidget(self.viewer)
+        splitter.setSizes([300, 700])
+        layout.addWidget(splitter)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        self.export_btn = QPushButton(tr("Exportar HTML"))
+        self.export_btn.setEnabled(False)
+        self.export_btn.clicked.connect(self._export)
+        btn_layout.addWidget(self.export_btn)
+        close_btn = QPushButton(tr("Fechar"))
+        close_btn.clicked.connect(self.close)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        self._update_progress()
+        if self.list_widget.count():
+            self.list_widget.setCurrentRow(0)
+
+    # Chamado na thread do event loop
+    def _emit_result(self, job_id, text, error):
+        try:
+            self._relay.result.emit(job_id, text, error)
+        except RuntimeError:
+            pass  # Diálogo já destruído
+
+    def _on_result(self, qnum, text, error):
+        if text:
+            self._texts[qnum] = text
+        else:
+            self._errors[qnum] = error or tr("Sem explicação")
+        detail = next((d for d in self._details if d['question_number'] == qnum), None)
+        if detail is not None:
+            self._update_item(detail)
+        self._update_progress()
+        current = self.list_widget.currentItem()
+        if current is not None and current.data(Qt.ItemDataRole.UserRole) == qnum:
+            self._show_current()
+
+    def _update_item(self, detail):
+        qnum = detail['question_number']
+        if qnum in self._texts:
+            mark = "✔"
+        elif qnum in self._errors:
+            mark = "✖"
+        else:
+            mark = "…"
+        text = detail.get('question_text', '').replace("\n", " ")
+        if len(text) > 60:
+            text = text[:60] + "..."
+        self._items[qnum].setText(f"{mark} {qnum}: {text}")
+
+    def _update_progress(self):
+        done = len(self._texts) + len(self._errors)
+        self.progress_bar.setValue(done)
+        self.progress_label.setText(tr("{0} de {1} explicações").format(done, len(self._details)))
+        self.export_btn.setEnabled(bool(self._texts))
+
+    def _show_current(self):
+        item = self.list_widget.currentItem()
+        if item is None:
+            return
+        qnum = item.data(Qt.ItemDataRole.UserRole)
+        detail = next(d for d in self._details if d['question_number'] == qnum)
+        header = (
+            f"<p><b>{_field(detail, 'question_text')}</b></p>"
+            f"<p style='color: red;'><b>{html.escape(tr('Sua resposta:'))}</b> "
+            f"{_field(detail, 'user_answer')}</p>"
+            f"<p style='color: green;'><b>{html.escape(tr('Resposta correta:'))}</b> "
+            f"{_field(detail, 'correct_answer')}</p><hr>"
+        )
+        if qnum in self._texts:
+            body = _explanation_body_html(self._texts[qnum])
+        elif qnum in self._errors:
+            body = f"<p style='color: red;'>{html.escape(self._errors[qnum])}</p>"
+        else:
+            body = f"<p><i>{html.escape(tr('A gerar'))}...</i></p>"
+        self.viewer.setHtml(f"<div style='font-family: sans-serif;'>{header}{body}</div>")
+
+    def _export(self):
+        filename, _ = QFileDialog.getSaveFileName(
+            self,
+            tr("Exportar HTML"),
+            "explicacoes.html",
+            "HTML files (*.html);;All files (*.*)"
+        )
+        if not filename:
+            return
+        entries = [(d, self._texts.get(d['question_number'])) for d in self._details]
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write(build_study_sheet_html(tr("Perguntas Erradas"), entries))
+        except OSError as e:
+            QMessageBox.critical(self, tr("Erro"), tr("Não foi possível exportar: {0}").format(e))
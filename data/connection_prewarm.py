@@ -0,0 +1,97 @@
+"""
+Pré-aquecimento das ligações ao provider LLM e ao provider de imagens.
+
+A primeira explicação de uma sessão pagava DNS + TCP + TLS ao provider LLM e
+outra vez aos hosts de imagens. Quando é provável que o utilizador peça uma
+explicação (início de um teste, ecrã de resultados, explorador de perguntas),
+ConnectionPrewarmer.trigger() abre em segundo plano ligações keep-alive a
+esses hosts e deixa-as no pool partilhado (data/http_pool.py), onde os
+pedidos, síncronos ou do cliente assíncrono, as vão procurar.
+
+As ligações inativas são descartadas ao fim de DEFAULT_IDLE_TIMEOUT; durante
+CONNECTION_PREWARM_WINDOW após o último trigger, a ligação é verificada a cada
+CONNECTION_PREWARM_INTERVAL segundos e só é aberta outra se o servidor a tiver
+fechado. Falhas (sem rede, host em baixo) são ignoradas: o pedido verdadeiro
+reporta o erro.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Iterable, List
+
+from .constants import (CONNECTION_PREWARM_INTERVAL, CONNECTION_PREWARM_TIMEOUT,
+                        CONNECTION_PREWARM_WINDOW, LLM_CONNECT_TIMEOUT)
+from .http_pool import get_pool
+from .image_enrichment import IMAGE_PROVIDERS
+from .llm_client import provider_url
+
+
+def llm_prewarm_urls(preferences) -> List[str]:
+    """Hosts do provider LLM configurado e, com o modo race ativo, dos providers de reserva."""
+    providers = [preferences.get_llm_provider()]
+    race = preferences.get_llm_race()
+    if race['enabled']:
+        providers += race['fallbacks']
+    urls = [provider_url(p) for p in providers if preferences.has_llm_access(p)]
+    return [url for url in urls if url]
+
+
+def image_prewarm_urls(image_provider: str) -> List[str]:
+    """Hosts de pesquisa e de miniaturas do provider de imagens."""
+    return list(IMAGE_PROVIDERS.get(image_provider, {}).get('hosts', ()))
+
+
+class ConnectionPrewarmer:
+    """Mantém quentes, numa thread própria, as ligações aos hosts do último trigger()."""
+
+    def __init__(self, interval: float = CONNECTION_PREWARM_INTERVAL,
+                 window: float = CONNECTION_PREWARM_WINDOW):
+        self.interval = interval
+        self.window = window
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._llm_urls: tuple = ()
+        self._image_urls: tuple = ()
+        self._until = 0.0
+        self._thread = None
+
+    def trigger(self, llm_urls: Iterable[str], image_urls: Iterable[str]) -> None:
+        """Aquece já as ligações a estes hosts e mantém-nas durante `window` segundos."""
+        with self._lock:
+            self._llm_urls = tuple(dict.fromkeys(u for u in llm_urls if u))
+            self._image_urls = tuple(dict.fromkeys(u for u in image_urls if u))
+            self._until = time.monotonic() + self.window
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="connection-prewarm", daemon=True)
+                self._thread.start()
+            else:
+                self._wake.set()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._until = 0.0
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if time.monotonic() >= self._until:
+                    self._thread = None
+                    return
+                llm_urls, image_urls = self._llm_urls, self._image_urls
+            self._wake.clear()
+            self._warm(llm_urls, image_urls)
+            self._wake.wait(self.interval)
+
+    def _warm(self, llm_urls, image_urls) -> None:
+        pool = get_pool()
+        targets = [(url, LLM_CONNECT_TIMEOUT) for url in llm_urls]
+        targets += [(url, CONNECTION_PREWARM_TIMEOUT) for url in image_urls]
+        for url, connect_timeout in targets:
+            try:
+                pool.prewarm(url, connect_timeout)
+            except Exception:
+                pass
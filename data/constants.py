@@ -16,9 +16,93 @@ MIN_QUICK_TEST_QUESTIONS = 5
 MAX_QUICK_TEST_QUESTIONS = 100
 DEFAULT_QUICK_TEST_QUESTIONS = 20
 
+# Preferências (cache em memória com escrita diferida)
+PREFERENCES_WRITE_DELAY = 0.5  # segundos de espera antes de gravar alterações
+PREFERENCES_MTIME_CHECK_INTERVAL = 2.0  # segundos entre verificações de edições externas
+
+# Cache de explicações em disco
+EXPLANATION_CACHE_MAX_BYTES = 20 * 1024 * 1024
+EXPLANATION_CACHE_TTL = 90 * 24 * 3600  # segundos; None para nunca expirar
+
+# Cache de miniaturas das imagens (data/thumbnail_cache.py)
+THUMBNAIL_CACHE_MAX_BYTES = 50 * 1024 * 1024  # em disco
+THUMBNAIL_CACHE_TTL = 90 * 24 * 3600
+THUMBNAIL_MEMORY_CACHE_BYTES = 16 * 1024 * 1024  # miniaturas mais usadas, em memória
+
 # LLM
-DEFAULT_LLM_TIMEOUT = 60
+DEFAULT_LLM_TIMEOUT = 60  # leitura, até haver latências observadas do provider
+# Tempos limite adaptativos, novas tentativas e circuit breaker (data/provider_health.py)
+LLM_CONNECT_TIMEOUT = 10  # segundos; também o máximo do tempo limite de ligação adaptativo
+MIN_LLM_CONNECT_TIMEOUT = 3
+MIN_LLM_READ_TIMEOUT = 15
+MAX_LLM_READ_TIMEOUT = 180
+LLM_LIST_TIMEOUT = 30  # leitura das listas de modelos
+LLM_TIMEOUT_FACTOR = 3  # tempo limite = fator x p95 da latência observada
+LLM_TIMEOUT_MIN_SAMPLES = 10
+LLM_LATENCY_WINDOW = 100  # latências guardadas por provider
+LLM_MAX_RETRIES = 3  # novas tentativas após 429, 5xx ou falha de ligação
+LLM_RETRY_BASE_DELAY = 0.5  # segundos; duplica a cada tentativa
+LLM_RETRY_MAX_DELAY = 8.0
+LLM_RETRY_MAX_WAIT = 20.0  # um Retry-After mais longo não é esperado: o erro segue para quem chamou
+CIRCUIT_BREAKER_THRESHOLD = 5  # falhas seguidas que "abrem" o provider
+CIRCUIT_BREAKER_COOLDOWN = 30.0  # segundos a falhar de imediato antes de um pedido de teste
+# Modelos Hugging Face a carregar (data/hf_readiness.py)
+HF_MODEL_LOAD_MAX_WAIT = 120.0  # espera máxima por um modelo a carregar (segundos)
+HF_LOADING_POLL_MIN = 2.0  # intervalo entre tentativas enquanto o modelo carrega
+HF_LOADING_POLL_MAX = 15.0
+HF_DEFAULT_LOAD_ESTIMATE = 20.0  # quando a resposta não traz estimated_time
+HF_WARM_TTL = 10 * 60  # um modelo que respondeu conta como carregado durante este tempo
+# Limite de tokens de uma resposta (multiplicado pelo nº de perguntas nos pedidos em lote)
+DEFAULT_LLM_MAX_TOKENS = 1024
+# Intervalo mínimo entre re-renderizações da explicação durante o streaming
+STREAM_RENDER_INTERVAL_MS = 100
 DEFAULT_LLM_PROVIDER = "groq"
+# Pedidos simultâneos por provider no cliente assíncrono (data/llm_async.py)
+DEFAULT_PROVIDER_CONCURRENCY = 8
+PROVIDER_CONCURRENCY = {
+    "groq": 16,
+    "gemini": 16,
+    "openrouter": 16,
+    "cloudflare": 16,
+    "mistral": 8,
+    "perplexity": 8,
+    "huggingface": 4,
+    "custom": 4,
+}
+# Threads que executam os pedidos do cliente assíncrono (cada uma com o cliente síncrono)
+ASYNC_LLM_THREADS = 64
+# Modo race (data/llm_race.py): orçamento até ao primeiro byte antes do pedido de reserva
+DEFAULT_HEDGE_DELAY_MS = 4000
+MIN_HEDGE_DELAY_MS = 500
+MAX_HEDGE_DELAY_MS = 30000
+# Explicações pré-geradas em simultâneo durante um teste (data/explanation_jobs.py)
+PREFETCH_CONCURRENCY = 2
+# Explicações geradas em simultâneo por "Explicar todas as erradas"
+BULK_EXPLANATION_CONCURRENCY = 6
+# Perguntas por pedido nas explicações em lote (data/explanation_batch.py); 1 = sem lote
+DEFAULT_EXPLANATION_BATCH_SIZE = 1
+MAX_EXPLANATION_BATCH_SIZE = 8
+# Registo HTTP (data/http_log.py)
+HTTP_LOG_LEVELS = ["off", "basic", "headers", "full"]
+DEFAULT_HTTP_LOG_LEVEL = "full"
+HTTP_LOG_MAX_BODY = 8 * 1024  # bytes de cada corpo registados no nível "full"
+HTTP_LOG_MAX_BYTES = 5 * 1024 * 1024  # tamanho a partir do qual o ficheiro roda
+HTTP_LOG_BACKUPS = 3  # versões anteriores guardadas comprimidas
+# Reutilização da explicação de uma pergunta semelhante (data/question_similarity.py)
+SIMILAR_EXPLANATION_THRESHOLD = 0.85  # semelhança de cosseno TF-IDF mínima
+SIMILAR_EXPLANATION_CANDIDATES = 5  # perguntas semelhantes procuradas na cache
+# Métricas dos pedidos LLM (data/llm_metrics.py)
+LLM_METRICS_WINDOW = 200  # amostras de latência guardadas por modelo
+LLM_METRICS_SAVE_EVERY = 20  # pedidos entre gravações de llm_metrics.json
+# Pré-aquecimento das ligações ao provider LLM e ao de imagens (data/connection_prewarm.py)
+# Segundos entre verificações da ligação (menos de metade do tempo de inatividade do pool)
+CONNECTION_PREWARM_INTERVAL = 25.0
+# Ligações mantidas quentes após o início de um teste, os resultados ou o explorador
+CONNECTION_PREWARM_WINDOW = 5 * 60
+# Ligação (DNS + TCP + TLS) aos hosts de imagens; o LLM usa LLM_CONNECT_TIMEOUT
+CONNECTION_PREWARM_TIMEOUT = 10.0
+# Validade das listas de modelos em cache (segundos); depois disso são atualizadas em segundo plano
+MODEL_CATALOG_TTL = 24 * 3600
 
 # Providers suportados
 LLM_PROVIDERS = [
@@ -28,7 +112,8 @@ LLM_PROVIDERS = [
     'mistral',
     'perplexity',
     'openrouter',
-    'cloudflare'
+    'cloudflare',
+    'custom'
 ]
 
 # Modelos padrão por provider
@@ -39,9 +124,24 @@ DEFAULT_MODELS = {
     'mistral': 'mistral-small-latest',
     'perplexity': 'sonar-pro',
     'openrouter': 'meta-llama/Meta-Llama-3.1-8B-Instruct',
-    'cloudflare': '@cf/meta/llama-3-8b-instruct'
+    'cloudflare': '@cf/meta/llama-3-8b-instruct',
+    'custom': ''
 }
 
+# Provider "custom": servidor local ou na rede compatível com a API da OpenAI
+# (llama.cpp, vLLM, Ollama...)
+DEFAULT_CUSTOM_BASE_URL = "http://localhost:8080/v1"
+DEFAULT_CUSTOM_CHAT_PATH = "/chat/completions"
+
+# Endpoints dos providers LLM
+GROQ_BASE = "https://api.groq.com/openai/v1"
+HF_MODELS_LIST = ("https://huggingface.co/api/models"
+                  "?pipeline_tag=text-generation&sort=downloads&direction=-1&limit=50")
+HF_INFER_BASE = "https://router.huggingface.co/models"
+GEMINI_LIST = "https://generativelanguage.googleapis.com/v1beta/models"
+GEMINI_GEN_TEMPLATE = GEMINI_LIST + "/{model}:generateContent?key={key}"
+GEMINI_STREAM_TEMPLATE = GEMINI_LIST + "/{model}:streamGenerateContent?alt=sse&key={key}"
+
 # Zoom
 MIN_ZOOM = 0.3
 MAX_ZOOM = 3.0
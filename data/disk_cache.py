@@ -0,0 +1,150 @@
+"""
+Cache persistente chave→bytes em disco, com evicção LRU por tamanho e TTL opcional.
+
+Cada entrada é um ficheiro comprimido (zlib) cujo nome é o hash da chave.
+O mtime do ficheiro marca o último acesso: as entradas menos usadas são
+removidas quando o tamanho total ultrapassa o limite.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+_MAGIC = b"GTC1"
+_HEADER = struct.Struct("<4sd")  # magic, timestamp de criação
+_SUFFIX = ".z"
+
+
+class DiskCache:
+    """Cache em disco segura entre threads (um diretório por cache)."""
+
+    def __init__(self, directory: Path, max_bytes: int, ttl: Optional[float] = None,
+                 compress_level: int = 6):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # 0 guarda sem comprimir (dados já comprimidos, como imagens).
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None  # calculado no primeiro set()
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}{_SUFFIX}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Retorna o valor ou None (ausente, expirado ou corrompido)."""
+        path = self._path(key)
+        try:
+            raw = path.read_bytes()
+            magic, created = _HEADER.unpack_from(raw)
+            if magic != _MAGIC:
+                raise ValueError("formato desconhecido")
+            if self.ttl is not None and time.time() - created > self.ttl:
+                self.delete(key)
+                return None
+            value = zlib.decompress(raw[_HEADER.size:])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, zlib.error):
+            self.delete(key)
+            return None
+        try:
+            # Marca como usado recentemente (LRU).
+            os.utime(path, None)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        """Guarda o valor de forma atómica; falhas de escrita são ignoradas."""
+        data = _HEADER.pack(_MAGIC, time.time()) + zlib.compress(value, self.compress_level)
+        path = self._path(key)
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                old_size = path.stat().st_size if path.exists() else 0
+                fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".cache-", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp, path)
+                except BaseException:
+                    try:
+                        os.unlink(tmp)
+                    except OSError:
+                        pass
+                    raise
+            except OSError:
+                return  # Cache opcional: sem espaço ou sem permissões, fica por guardar.
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        with self._lock:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                return
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._entries():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def _entries(self):
+        try:
+            return [p for p in self.directory.iterdir() if p.suffix == _SUFFIX]
+        except OSError:
+            return []
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict(self) -> None:
+        """Remove as entradas menos usadas até ficar em 90% do limite."""
+        entries = []
+        for path in self._entries():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
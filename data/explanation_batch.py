@@ -0,0 +1,118 @@
+"""
+Explicações em lote: várias perguntas num único pedido ao LLM.
+
+O prompt em lote leva o template (e o system prompt) uma só vez, seguido de uma
+secção delimitada por pergunta, e pede uma resposta com um delimitador antes de
+cada explicação ("=== EXPLICAÇÃO n ==="). A resposta é dividida de volta em
+explicações individuais; as que faltarem (resposta truncada ou fora do formato)
+são pedidas uma a uma com o prompt normal, pelo que o resultado é sempre uma
+explicação (ou um erro) por pergunta.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .llm_async import LLMAnswer
+from .llm_client import LLMError
+
+_QUESTION_MARK = "=== PERGUNTA {0} ==="
+_ANSWER_MARK = "=== EXPLICAÇÃO {0} ==="
+# Tolerante a variações comuns: markdown à volta, sem acentos, maiúsculas/minúsculas.
+_ANSWER_RE = re.compile(
+    r"^[ \t>*#_]*={2,}\s*EXPLICA[ÇC][ÃA]O\s+(\d+)\s*={2,}[ \t*_]*$", re.MULTILINE | re.IGNORECASE)
+_FENCE_RE = re.compile(r"^```[\w-]*\s*\n(.*?)\n```$", re.DOTALL)
+# (resposta, erro) de uma pergunta do lote.
+BatchResult = Tuple[Optional[LLMAnswer], Optional[str]]
+
+
+def question_prompt_section(question) -> str:
+    """Pergunta e opções, tal como entram no prompt de explicação."""
+    return f"Pergunta:\n{question.text}\n\nRespostas possíveis:" \
+        + "\n".join([f"- {opt['text']}" for opt in question.options])
+
+
+def build_explanation_prompt(template: str, section: str) -> str:
+    """Prompt de uma só pergunta (o mesmo da explicação interativa e da chave de cache)."""
+    return template.strip() + "\n\n" + section
+
+
+def build_batch_prompt(template: str, sections: List[str]) -> str:
+    """Prompt com várias perguntas, cada uma numa secção delimitada."""
+    parts = [
+        template.strip(),
+        f"Este pedido tem {len(sections)} perguntas. Segue as instruções acima para cada "
+        f"uma, de forma independente. Começa cada explicação por uma linha só com o delimitador "
+        f"\"{_ANSWER_MARK.format('n')}\" (n = número da pergunta), pela ordem das perguntas, "
+        f"sem texto antes do primeiro delimitador.",
+    ]
+    for i, section in enumerate(sections, 1):
+        parts.append(f"{_QUESTION_MARK.format(i)}\n{section}")
+    return "\n\n".join(parts)
+
+
+def split_batch_response(text: str, count: int) -> Dict[int, str]:
+    """Divide a resposta em lote: {nº da pergunta (1..count): explicação}.
+
+    As perguntas em falta ficam de fora.
+    """
+    marks = list(_ANSWER_RE.finditer(text or ""))
+    result: Dict[int, str] = {}
+    for i, match in enumerate(marks):
+        number = int(match.group(1))
+        if number < 1 or number > count or number in result:
+            continue
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+        body = text[match.end():end].strip()
+        fenced = _FENCE_RE.match(body)
+        if fenced:
+            body = fenced.group(1).strip()
+        if body:
+            result[number] = body
+    # Uma resposta truncada corta a última explicação a meio: só é aceite se não faltar nenhuma.
+    if count in result and len(result) < count:
+        del result[count]
+    return result
+
+
+async def generate_batch(client, template: str, sections: List[str],
+                         timeout: Optional[float] = None) -> List[BatchResult]:
+    """Gera as explicações de várias perguntas com um pedido; devolve (resposta, erro) por pergunta.
+
+    client tem a interface de AsyncLLMClient. Se a resposta não puder ser dividida,
+    as explicações em falta são pedidas uma a uma. Um erro do próprio pedido
+    (rede, HTTP) é devolvido em todas as perguntas, como aconteceria a pedidos
+    individuais. Cada LLMAnswer indica o provider e o modelo que deram aquela
+    explicação (em modo race podem variar de pergunta para pergunta).
+    """
+    if not sections:
+        return []
+    singles: List[int] = list(range(len(sections)))
+    parts: Dict[int, LLMAnswer] = {}
+    if len(sections) > 1:
+        previous = client.max_tokens
+        client.max_tokens = previous * len(sections)
+        try:
+            answer = await client.generate_answer(
+                build_batch_prompt(template, sections), None, timeout)
+        except LLMError as e:
+            return [(None, str(e))] * len(sections)
+        finally:
+            client.max_tokens = previous
+        parts = {number: answer._replace(text=text)
+                 for number, text in split_batch_response(answer.text, len(sections)).items()}
+        # Secções em falta numa resposta em lote incompleta são pedidas uma a uma.
+        singles = [i for i in range(len(sections)) if i + 1 not in parts]
+
+    results = await asyncio.gather(
+        *(client.generate_answer(build_explanation_prompt(template, sections[i]), None, timeout)
+          for i in singles),
+        return_exceptions=True)
+    output: List[BatchResult] = [(parts.get(i + 1), None) for i in range(len(sections))]
+    for i, result in zip(singles, results):
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        output[i] = (None, str(result)) if isinstance(result, BaseException) else (result, None)
+    return output
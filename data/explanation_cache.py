@@ -0,0 +1,63 @@
+"""
+Cache persistente de explicações LLM.
+
+A chave combina provider, modelo, system prompt e o hash do prompt montado,
+pelo que mudar qualquer um deles produz uma nova explicação.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from typing import Callable, Optional
+
+from .app_paths import get_cache_dir
+from .constants import (EXPLANATION_CACHE_MAX_BYTES, EXPLANATION_CACHE_TTL,
+                        SIMILAR_EXPLANATION_CANDIDATES, SIMILAR_EXPLANATION_THRESHOLD)
+from .disk_cache import DiskCache
+
+_cache: Optional[DiskCache] = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> DiskCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(
+                get_cache_dir("explanations"), EXPLANATION_CACHE_MAX_BYTES, EXPLANATION_CACHE_TTL)
+        return _cache
+
+
+def explanation_cache_key(provider: str, model: str, system_prompt: str, prompt: str) -> str:
+    prompt_hash = hashlib.sha256((prompt or "").encode("utf-8")).hexdigest()
+    return json.dumps([provider or "", model or "", system_prompt or "", prompt_hash])
+
+
+def get_cached_explanation(key: str) -> Optional[str]:
+    data = _get_cache().get(key)
+    if data is None:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def store_explanation(key: str, text: str) -> None:
+    if text and text.strip():
+        _get_cache().set(key, text.encode("utf-8"))
+
+
+def similar_cached_explanation(index, question, provider: str, model: str, system_prompt: str,
+                               build_prompt: Callable) -> Optional[tuple]:
+    """Explicação em cache de uma pergunta semelhante: (texto, pergunta, semelhança) ou None.
+
+    index é o QuestionIndex do banco; build_prompt(pergunta) monta o prompt de cada candidata.
+    """
+    candidates = index.similar(question, SIMILAR_EXPLANATION_THRESHOLD,
+                               SIMILAR_EXPLANATION_CANDIDATES)
+    for other, score in candidates:
+        key = explanation_cache_key(provider, model, system_prompt, build_prompt(other))
+        cached = get_cached_explanation(key)
+        if cached:
+            return cached, other, score
+    return None
@@ -0,0 +1,219 @@
+"""
+Geração de explicações em segundo plano: pré-geração durante um teste e
+explicação em lote das respostas erradas (data/bulk_explanations.py).
+
+ExplanationPrefetcher mantém uma fila por prioridade (respostas erradas
+primeiro) e gera até max_concurrency pedidos em simultâneo no event loop
+partilhado (data/llm_async.py), guardando as explicações na cache. Com
+batch_size > 1, cada pedido leva até batch_size perguntas
+(data/explanation_batch.py). Os pedidos passam pelo rate limiter do provider,
+como os interativos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from typing import Callable, Hashable, Optional
+
+ResultCallback = Callable[[Hashable, Optional[str], Optional[str]], None]
+
+from .constants import PREFETCH_CONCURRENCY
+from .explanation_batch import build_explanation_prompt, generate_batch, question_prompt_section
+from .explanation_cache import explanation_cache_key, get_cached_explanation, store_explanation
+from .llm_async import get_event_loop
+from .llm_race import create_llm_client
+
+# Prioridades (menor = primeiro)
+PRIORITY_WRONG = 0
+PRIORITY_UNANSWERED = 1
+PRIORITY_CORRECT = 2
+
+# Com lotes, espera curta antes de enviar, para juntar os jobs agendados de seguida.
+_BATCH_GATHER_DELAY = 0.05
+
+
+class ExplanationPrefetcher:
+    """Fila de pré-geração; os métodos públicos podem ser chamados de qualquer thread.
+
+    make_client() é chamado na thread de quem agenda (tipicamente a da UI) e deve
+    devolver um cliente com a interface de AsyncLLMClient. on_result(job_id, text,
+    error), se indicado, é chamado na thread do event loop quando cada job termina
+    (text vem da cache ou da geração; error é a mensagem em caso de falha).
+
+    Com batch_size > 1, os jobs agendados com section (a pergunta, ver
+    question_prompt_section) são agrupados num só pedido com batch_template.
+    """
+
+    def __init__(self, make_client: Callable, max_concurrency: int = PREFETCH_CONCURRENCY,
+                 on_result: Optional[ResultCallback] = None,
+                 batch_template: Optional[str] = None, batch_size: int = 1):
+        self._make_client = make_client
+        self._max_concurrency = max(1, max_concurrency)
+        self._on_result = on_result
+        self._batch_template = batch_template
+        self._batch_size = max(1, batch_size) if batch_template is not None else 1
+        self._loop = get_event_loop()
+        # Estado abaixo só é tocado na thread do event loop.
+        self._heap: list = []
+        self._jobs: dict = {}  # job_id -> (priority, order, prompt, client, section)
+        self._running: dict = {}  # task -> job_ids
+        self._done: set = set()
+        self._seq = itertools.count()
+        self._closed = False
+        self._pump_pending = False
+
+    def schedule(self, job_id: Hashable, prompt: str, priority: int = PRIORITY_UNANSWERED,
+                 order: int = 0, section: Optional[str] = None) -> None:
+        """Agenda (ou re-prioriza) a explicação de job_id."""
+        client = self._make_client()
+        self._loop.call_soon_threadsafe(
+            self._schedule, job_id, prompt, priority, order, client, section)
+
+    def set_priority(self, job_id: Hashable, priority: int) -> None:
+        self._loop.call_soon_threadsafe(self._set_priority, job_id, priority)
+
+    def cancel(self) -> None:
+        """Cancela tudo: fila e pedidos em curso (o socket é fechado)."""
+        self._loop.call_soon_threadsafe(self._cancel_all)
+
+    # --- Thread do event loop ---
+    def _schedule(self, job_id, prompt, priority, order, client, section):
+        running = any(job_id in ids for ids in self._running.values())
+        if self._closed or job_id in self._done or running:
+            return
+        self._jobs[job_id] = (priority, order, prompt, client, section)
+        heapq.heappush(self._heap, (priority, order, next(self._seq), job_id))
+        if self._batch_size > 1:
+            if not self._pump_pending:
+                self._pump_pending = True
+                self._loop.call_later(_BATCH_GATHER_DELAY, self._pump)
+        else:
+            self._pump()
+
+    def _set_priority(self, job_id, priority):
+        job = self._jobs.get(job_id)
+        if job is None or job[0] == priority:
+            return
+        self._jobs[job_id] = (priority,) + job[1:]
+        heapq.heappush(self._heap, (priority, job[1], next(self._seq), job_id))
+        self._pump()
+
+    def _pop(self, batchable: bool = False):
+        """Próximo job da fila (job_id, job), ou None; com batchable, só se tiver section."""
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            job = self._jobs.get(entry[3])
+            if job is None or job[0] != entry[0]:
+                continue  # Entrada obsoleta (já iniciada ou re-priorizada)
+            if batchable and job[4] is None:
+                heapq.heappush(self._heap, entry)
+                return None
+            return entry[3], self._jobs.pop(entry[3])
+        return None
+
+    def _pump(self):
+        self._pump_pending = False
+        while not self._closed and len(self._running) < self._max_concurrency:
+            first = self._pop()
+            if first is None:
+                return
+            batch = [first]
+            while first[1][4] is not None and len(batch) < self._batch_size:
+                other = self._pop(batchable=True)
+                if other is None:
+                    break
+                batch.append(other)
+            run = self._run_batch(batch) if len(batch) > 1 else self._run_one(*first)
+            task = self._loop.create_task(run)
+            self._running[task] = [job_id for job_id, _ in batch]
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        self._done.update(self._running.pop(task, ()))
+        self._pump()
+
+    def _report(self, job_id, text, error):
+        self._done.add(job_id)
+        if self._on_result is not None:
+            self._on_result(job_id, text, error)
+
+    def _cancel_all(self):
+        self._closed = True
+        self._heap.clear()
+        self._jobs.clear()
+        for task in list(self._running):
+            task.cancel()
+
+    async def _run_one(self, job_id, job):
+        try:
+            text = await self._run(job[2], job[3])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._report(job_id, None, str(e))
+            return
+        self._report(job_id, text, None)
+
+    async def _run_batch(self, batch):
+        client = batch[0][1][3]
+        pending = []
+        for job_id, job in batch:
+            key = explanation_cache_key(client.provider, client.model, client.system_prompt, job[2])
+            cached = await asyncio.to_thread(get_cached_explanation, key)
+            if cached:
+                self._report(job_id, cached, None)
+            else:
+                pending.append((job_id, job))
+        if len(pending) == 1:
+            await self._run_one(*pending[0])
+            return
+        results = await generate_batch(client, self._batch_template, [job[4] for _, job in pending])
+        for (job_id, job), (answer, error) in zip(pending, results):
+            if answer is not None:
+                await self._store(answer, job[2])
+            self._report(job_id, answer.text if answer is not None else None, error)
+
+    @staticmethod
+    async def _run(prompt: str, client) -> str:
+        key = explanation_cache_key(client.provider, client.model, client.system_prompt, prompt)
+        cached = await asyncio.to_thread(get_cached_explanation, key)
+        if cached:
+            return cached
+        answer = await client.generate_answer(prompt)
+        await ExplanationPrefetcher._store(answer, prompt)
+        return answer.text
+
+    @staticmethod
+    async def _store(answer, prompt: str) -> None:
+        # Em modo race a resposta pode vir de outro provider: a chave é a de quem respondeu.
+        key = explanation_cache_key(answer.provider, answer.model, answer.system_prompt, prompt)
+        await asyncio.to_thread(store_explanation, key, answer.text)
+
+
+def start_test_prefetch(prefs, questions) -> Optional[ExplanationPrefetcher]:
+    """Pré-gera as explicações das perguntas de um teste, se ativo nas preferências.
+
+    Retorna o ExplanationPrefetcher (None se desativado ou sem acesso ao provider).
+    """
+    if not prefs.get_llm_prefetch():
+        return None
+    provider = prefs.get_llm_provider()
+    if not prefs.has_llm_access(provider):
+        return None
+    template = prefs.get_llm_prompt_template()
+    prefetcher = ExplanationPrefetcher(
+        lambda: create_llm_client(prefs, provider),
+        batch_template=template, batch_size=prefs.get_llm_batch_size())
+    for order, question in enumerate(questions):
+        section = question_prompt_section(question)
+        prompt = build_explanation_prompt(template, section)
+        prefetcher.schedule(question.number, prompt, PRIORITY_UNANSWERED, order, section=section)
+    return prefetcher
+
+
+def answered_priority(question, answer) -> int:
+    """Prioridade de pré-geração depois de respondida: as erradas passam para a frente."""
+    correct = answer is not None and answer != -1 and answer == question.get_correct_answer()
+    return PRIORITY_CORRECT if correct else PRIORITY_WRONG
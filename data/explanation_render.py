@@ -0,0 +1,166 @@
+"""
+HTML das explicações na janela de explicação (main.explain_question).
+
+As páginas de espera, de erro, da resposta e da coluna de imagens, o
+comentário de depuração com a troca HTTP do LLM e o StreamRenderer, que mostra
+a resposta enquanto chega em streaming sem re-renderizar a cada delta.
+"""
+
+import json
+import re
+from typing import Callable, Optional
+
+from PySide6.QtCore import QTimer
+
+from .constants import STREAM_RENDER_INTERVAL_MS
+from .i18n import tr
+from .image_enrichment import is_html_content, split_explanation_text_and_keywords
+
+
+def loading_page_html() -> str:
+    """Conteúdo mostrado enquanto a explicação é gerada."""
+    return f"""
+        <div style='text-align:center; padding-top:50px; font-family:sans-serif; color:#666;'>
+            <h2>{tr("A gerar explicação")}...</h2>
+            <p>{tr("Aguarde enquanto o modelo processa a sua pergunta.")}.</p>
+            <p><i>{tr("Isto pode demorar alguns segundos.")}.</i></p>
+        </div>
+        """
+
+
+def error_page_html(err_msg: str) -> str:
+    """Conteúdo mostrado quando a geração falha."""
+    return f"""
+            <div style='color:red; padding:20px; font-family:sans-serif;'>
+                <h3>{tr("Erro na geração")}</h3>
+                <p>{err_msg}</p>
+            </div>
+            """
+
+
+def answer_page_html(body_html: str) -> str:
+    """Página completa (com estilo) para o painel da resposta."""
+    return f"""
+                    <!DOCTYPE html>
+                    <html>
+                    <head>
+                        <meta charset="UTF-8">
+                        <style>
+                            body {{
+                                font-family: Arial, Helvetica, sans-serif;
+                                line-height: 1.6;
+                                padding: 10px;
+                            }}
+                        </style>
+                    </head>
+                    <body>
+                        {body_html}
+                    </body>
+                    </html>
+                    """
+
+
+def images_page_html(images_html: str) -> str:
+    """Página completa (com estilo) para a coluna de imagens."""
+    return f"""
+                        <!DOCTYPE html>
+                        <html>
+                        <head>
+                            <meta charset="UTF-8">
+                            <style>
+                                body {{
+                                    font-family: Arial, Helvetica, sans-serif;
+                                    line-height: 1.3;
+                                    margin: 0;
+                                    padding: 6px;
+                                    overflow-x: hidden;
+                                    text-align: center;
+                                }}
+                                img {{
+                                    max-width: 100%;
+                                    height: auto;
+                                }}
+                            </style>
+                        </head>
+                        <body>
+                            {images_html}
+                        </body>
+                        </html>
+                        """
+
+
+def partial_answer_html(text: str) -> str:
+    """HTML de uma resposta ainda incompleta, sem os blocos IMAGE_KEYWORDS."""
+    # Ignora um comentário ainda por fechar (p.ex. IMAGE_KEYWORDS a meio).
+    text = re.sub(r'<!--(?:(?!-->).)*$', '', text, flags=re.DOTALL)
+    text_html, _, _ = split_explanation_text_and_keywords(text)
+    return text_html
+
+
+def _safe_html_comment_text(s: str) -> str:
+    if s is None:
+        return ''
+    s = str(s)
+    # Avoid invalid sequences in HTML comments.
+    s = s.replace('--', '- -')
+    s = s.replace('\x00', '')
+    return s
+
+
+def llm_debug_comment(result: str, provider: str, model: str,
+                      http_exchange: Optional[dict] = None) -> str:
+    """Comentário HTML com o pedido e a resposta HTTP do LLM (só visível no código-fonte)."""
+    try:
+        payload = {
+            'provider': provider,
+            'model': model,
+            'request': None,
+            'response': None,
+        }
+        if isinstance(http_exchange, dict):
+            payload['request'] = (http_exchange.get('request') or None)
+            payload['response'] = (http_exchange.get('response') or None)
+
+        if not is_html_content(result):
+            payload['plaintext_body'] = result
+
+        debug_json = _safe_html_comment_text(json.dumps(payload, ensure_ascii=False))
+        return f'<!-- llm_http_debug: {debug_json} -->\n'
+    except Exception:
+        return ''
+
+
+class StreamRenderer:
+    """Junta os deltas de uma resposta em streaming e entrega o HTML a render(html).
+
+    O primeiro delta é mostrado de imediato; os seguintes no máximo a cada
+    STREAM_RENDER_INTERVAL_MS.
+    """
+
+    def __init__(self, parent, render: Callable[[str], None]):
+        self.text = ""
+        self._render = render
+        self._timer = QTimer(parent)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+
+    def add(self, delta: str) -> bool:
+        """Junta delta à resposta; retorna True se foi o primeiro."""
+        first = not self.text
+        self.text += delta
+        if first:
+            self._flush()
+        elif not self._timer.isActive():
+            self._timer.start(STREAM_RENDER_INTERVAL_MS)
+        return first
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def reset(self) -> None:
+        self._timer.stop()
+        self.text = ""
+
+    def _flush(self) -> None:
+        if self.text:
+            self._render(partial_answer_html(self.text))
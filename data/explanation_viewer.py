@@ -16,6 +16,7 @@ from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkRe
 from PySide6.QtCore import QTimer
 
 from .llm_client import LLMClient
+from .thumbnail_cache import get_thumbnail, store_thumbnail
 from .i18n import tr
 from .constants import (
     LLM_PROVIDERS, DEFAULT_WINDOW_PERCENT,
@@ -149,12 +150,11 @@ class ZoomableTextBrowser(QTextBrowser):
         if type == 2 and isinstance(name, QUrl):
             url_str = name.toString()
 
-            # Serve prefetched bytes if available
+            # Serve cached thumbnails (memory, then disk) synchronously
             try:
-                from .image_enrichment import get_prefetched_image_bytes
-                prefetched = get_prefetched_image_bytes(url_str)
-                if prefetched:
-                    return QByteArray(prefetched)
+                cached = get_thumbnail(url_str)
+                if cached:
+                    return QByteArray(cached)
             except Exception:
                 pass
             
@@ -222,10 +222,9 @@ class ZoomableTextBrowser(QTextBrowser):
             if not data:
                 return
 
-            # Store in shared prefetch cache
+            # Store in the persistent thumbnail cache
             try:
-                from .image_enrichment import _put_prefetched_image_bytes
-                _put_prefetched_image_bytes(url_str, data)
+                store_thumbnail(url_str, data)
             except Exception:
                 pass
 
@@ -322,13 +321,15 @@ def show_explanation(
         metadata: dict | None = None,
         on_reexplain_callback=None,
         user_answer: str | None = None,
-        user_was_correct: bool | None = None):
+        user_was_correct: bool | None = None,
+        on_regenerate_callback=None):
     """Shows explanation in a dialog with HTML rendering support.
 
     Args:
         metadata: Dict with 'provider', 'model', 'time' keys for display.
         user_answer: The answer text given by the user (optional).
         user_was_correct: Whether the user's answer was correct (optional).
+        on_regenerate_callback: Like on_reexplain_callback, but ignoring cached explanations.
     """
     # Obtém preferências do parent (app)
     if hasattr(parent, 'preferences'):
@@ -446,10 +447,16 @@ def show_explanation(
     image_source_layout.addWidget(image_source_combo)
     left_layout.addLayout(image_source_layout)
 
-    # Explain button
+    # Explain + regenerate buttons
+    explain_row = QHBoxLayout()
     explain_btn = QPushButton(tr("Obter explicação"))
     explain_btn.setEnabled(True)  # Always enabled
-    left_layout.addWidget(explain_btn)
+    explain_row.addWidget(explain_btn, 1)
+    regenerate_btn = QPushButton(tr("Regenerar"))
+    regenerate_btn.setToolTip(tr("Gera uma nova explicação, ignorando a guardada em cache"))
+    regenerate_btn.setVisible(on_regenerate_callback is not None)
+    explain_row.addWidget(regenerate_btn)
+    left_layout.addLayout(explain_row)
 
     # Time labels
     time_row = QHBoxLayout()
@@ -494,16 +501,40 @@ def show_explanation(
     # Connect signals
     provider_combo.currentTextChanged.connect(update_model_combo)
 
+    # Atualiza apenas a lista de modelos quando a chave/modelo do provider muda nas preferências
+    if hasattr(parent, 'preferences'):
+        def _on_llm_preferences_changed(changes):
+            current_provider = provider_combo.currentText()
+            watched = (f"llm.models.{current_provider}", f"llm.api_keys.{current_provider}")
+            if any(k in watched for k in changes):
+                selected = model_combo.currentText()
+                update_model_combo()
+                model_changed = 'llm.models.' + current_provider in changes
+                if selected and model_combo.findText(selected) >= 0 and not model_changed:
+                    model_combo.setCurrentText(selected)
+
+        unsubscribe = parent.preferences.subscribe('llm', _on_llm_preferences_changed)
+        dialog.destroyed.connect(unsubscribe)
+
     # Callback for explain button
     def on_explain():
         if on_reexplain_callback:
             new_provider = provider_combo.currentText()
             new_model = model_combo.currentText()
             explain_btn.setEnabled(False)  # Disable while processing
+            regenerate_btn.setEnabled(False)
             on_reexplain_callback(new_provider, new_model)
 
     explain_btn.clicked.connect(on_explain)
 
+    def on_regenerate():
+        if on_regenerate_callback:
+            explain_btn.setEnabled(False)
+            regenerate_btn.setEnabled(False)
+            on_regenerate_callback(provider_combo.currentText(), model_combo.currentText())
+
+    regenerate_btn.clicked.connect(on_regenerate)
+
     header_layout.addWidget(left_col, 35)
 
     if question_text:
@@ -614,4 +645,5 @@ def show_explanation(
     dialog.show()
 
     # Return dialog and widgets to allow updates
-    return dialog, viewer, images_viewer, content_splitter, time_label, images_time_label, explain_btn, image_source_combo
+    return (dialog, viewer, images_viewer, content_splitter, time_label, images_time_label,
+            explain_btn, regenerate_btn, image_source_combo)
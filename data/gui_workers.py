@@ -0,0 +1,125 @@
+"""
+Workers da janela principal: geração de explicações e pesquisa de imagens sem
+bloquear a UI.
+
+LLMWorker corre a geração no event loop partilhado (data/llm_async.py) e
+entrega os sinais na thread da GUI através de GuiDispatcher; ImagesWorker
+pesquisa imagens numa QThread própria.
+"""
+
+from PySide6.QtCore import QObject, QThread, Signal
+
+from .http_pool import CancelToken, RequestCancelled
+from .llm_async import submit as submit_llm
+
+
+class GuiDispatcher(QObject):
+    """Executa funções na thread da GUI: de imediato se já estiver nela, senão em fila."""
+    call = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # AutoConnection: direta na thread deste objeto, em fila a partir das outras.
+        self.call.connect(self._run)
+
+    @staticmethod
+    def _run(fn):
+        fn()
+
+
+class LLMWorker(QObject):
+    """LLM generation on the shared asyncio loop (data/llm_async.py) to avoid blocking UI."""
+    finished = Signal(object)  # LLMAnswer: texto e provider/modelo que responderam
+    error = Signal(str)
+    # Texto novo recebido durante o streaming (apenas o delta).
+    partial = Signal(str)
+
+    def __init__(self, client, prompt, dispatch):
+        super().__init__()
+        self.client = client  # AsyncLLMClient ou RacingLLMClient
+        self.prompt = prompt
+        # Corre funções na thread da GUI (GuiDispatcher.call.emit).
+        self._dispatch = dispatch
+        self._future = None
+        # Cancelado ou já terminado: nada mais é emitido (só lido e escrito na thread da GUI).
+        self._closed = False
+        # Ensure worker is deleted when finished
+        self.finished.connect(self.deleteLater)
+        self.error.connect(self.deleteLater)
+
+    def start(self):
+        self._future = submit_llm(self.client.generate_answer(self.prompt, self._emit_partial))
+        # O callback mantém o worker vivo até a geração terminar.
+        self._future.add_done_callback(self._on_done)
+
+    def isRunning(self):
+        return self._future is not None and not self._future.done()
+
+    def cancel(self):
+        # Cancela a task no event loop: o socket é fechado de imediato.
+        self._closed = True
+        if self._future is not None:
+            self._future.cancel()
+        self.deleteLater()
+
+    def _deliver(self, name, value, last=False):
+        """Emite o sinal `name` na thread da GUI, se o worker não foi entretanto cancelado."""
+        def emit():
+            if self._closed:
+                return
+            self._closed = last
+            getattr(self, name).emit(value)
+        self._dispatch(emit)
+
+    # Chamados na thread do event loop.
+    def _emit_partial(self, delta):
+        self._deliver('partial', delta)
+
+    def _on_done(self, future):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            self._deliver('error', str(exc), last=True)
+        else:
+            self._deliver('finished', future.result(), last=True)
+
+
+class ImagesWorker(QThread):
+    """Worker thread for image search to avoid blocking UI."""
+    finished = Signal(int, object, float, str)  # job_id, groups, seconds, provider
+
+    def __init__(self, job_id: int, keywords_list: tuple[str, ...], provider: str):
+        super().__init__()
+        self.job_id = job_id
+        self.keywords_list = keywords_list
+        self.provider = provider
+        self._cancel_token = CancelToken()
+        self.finished.connect(self.deleteLater)
+
+    def cancel(self):
+        # Fecha a ligação em curso: a thread termina em milissegundos.
+        self._cancel_token.cancel()
+        # Disconnect auto-delete to handle manually
+        self.finished.disconnect(self.deleteLater)
+        if self.isRunning():
+            self.wait(200)
+        # Ensure deletion
+        self.deleteLater()
+
+    def run(self):
+        try:
+            if self._cancel_token.cancelled:
+                return
+            from .image_enrichment import fetch_image_groups
+            groups, seconds = fetch_image_groups(
+                self.keywords_list, provider=self.provider, cancel_token=self._cancel_token)
+            if not self._cancel_token.cancelled:
+                self.finished.emit(self.job_id, groups, float(seconds), self.provider)
+        except RequestCancelled:
+            pass
+        except Exception:
+            # Treat unexpected exceptions as an empty result set
+            if not self._cancel_token.cancelled:
+                empty = tuple((tuple(), 'worker_exception') for _ in self.keywords_list)
+                self.finished.emit(self.job_id, empty, 0.0, self.provider)
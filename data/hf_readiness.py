@@ -0,0 +1,65 @@
+"""
+Estado de carregamento dos modelos serverless do Hugging Face.
+
+Um modelo que não foi usado recentemente é descarregado; o primeiro pedido
+recebe 503 {"error": "Model ... is currently loading", "estimated_time": N}.
+Este módulo reconhece essas respostas e lembra, entre pedidos, que modelos
+estão quentes (responderam há menos de HF_WARM_TTL segundos) e quais estão a
+carregar e quando deverão ficar prontos, para que pedidos simultâneos esperem
+pelo mesmo carregamento e o aquecimento ao abrir uma explicação só seja feito
+quando faz falta.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .constants import HF_DEFAULT_LOAD_ESTIMATE, HF_WARM_TTL
+
+_lock = threading.Lock()
+# modelo -> ("warm", válido até) ou ("loading", pronto em), em time.monotonic()
+_models: Dict[str, Tuple[str, float]] = {}
+
+
+def model_loading_time(status: Optional[int], body) -> Optional[float]:
+    """Segundos estimados até o modelo carregar, se a resposta for "model is loading"."""
+    if status != 503 or not body:
+        return None
+    try:
+        data = json.loads(body) if isinstance(body, (str, bytes)) else body
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        estimated = data.get("estimated_time")
+        if isinstance(estimated, (int, float)) and estimated >= 0:
+            return float(estimated)
+        if "loading" in str(data.get("error", "")).lower():
+            return HF_DEFAULT_LOAD_ESTIMATE
+        return None
+    return HF_DEFAULT_LOAD_ESTIMATE if "currently loading" in str(body).lower() else None
+
+
+def mark_warm(model: str) -> None:
+    with _lock:
+        _models[model] = ("warm", time.monotonic() + HF_WARM_TTL)
+
+
+def mark_loading(model: str, estimated: float) -> None:
+    with _lock:
+        _models[model] = ("loading", time.monotonic() + estimated)
+
+
+def is_warm(model: str) -> bool:
+    with _lock:
+        state, until = _models.get(model, ("", 0.0))
+    return state == "warm" and time.monotonic() < until
+
+
+def ready_in(model: str) -> float:
+    """Segundos até o modelo, visto a carregar, dever estar pronto (0 se não está a carregar)."""
+    with _lock:
+        state, until = _models.get(model, ("", 0.0))
+    return max(0.0, until - time.monotonic()) if state == "loading" else 0.0
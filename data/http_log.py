@@ -0,0 +1,204 @@
+"""
+Registo HTTP (http_log.txt) sem custo para os pedidos.
+
+Os clientes LLM entregam cada evento (pedido, resposta, erro, exceção) a uma
+fila; uma thread em segundo plano formata-os e escreve-os em bloco num ficheiro
+mantido aberto. No nível "full" os corpos são truncados a HTTP_LOG_MAX_BODY
+bytes. O ficheiro roda ao passar HTTP_LOG_MAX_BYTES, guardando as
+HTTP_LOG_BACKUPS versões anteriores comprimidas (http_log.1.txt.gz, ...).
+
+Níveis de detalhe (HTTP_LOG_LEVELS): "off", "basic" (URL, método, estado e
+tamanhos), "headers" (+ cabeçalhos) e "full" (+ corpos). O nível inicial pode
+ser definido com a variável de ambiente GIFTTEST_HTTP_LOG.
+"""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .app_paths import get_http_log_path
+from .constants import (DEFAULT_HTTP_LOG_LEVEL, HTTP_LOG_BACKUPS, HTTP_LOG_LEVELS,
+                        HTTP_LOG_MAX_BODY, HTTP_LOG_MAX_BYTES)
+
+_RANK = {name: i for i, name in enumerate(HTTP_LOG_LEVELS)}
+_STOP = object()
+
+
+class HttpLogWriter:
+    """Escritor em segundo plano de um ficheiro de registo HTTP."""
+
+    def __init__(self, path: Path, level: str = DEFAULT_HTTP_LOG_LEVEL,
+                 max_bytes: int = HTTP_LOG_MAX_BYTES, backups: int = HTTP_LOG_BACKUPS,
+                 max_body: int = HTTP_LOG_MAX_BODY):
+        self.path = Path(path)
+        self.level = level if level in _RANK else DEFAULT_HTTP_LOG_LEVEL
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_body = max_body
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        # Primeiro erro de escrita do ficheiro (None se não houve); o registo continua a tentar.
+        self.write_error: Optional[OSError] = None
+
+    def enabled(self, level: str) -> bool:
+        """Se os eventos do nível indicado são registados."""
+        return self.level != "off" and _RANK[self.level] >= _RANK[level]
+
+    # --- Chamados nas threads dos pedidos: só enfileiram ---
+    def log_request(self, ts: str, method: str, url: str, headers: Optional[dict],
+                    body: Optional[bytes]) -> None:
+        if self.level == "off":
+            return
+        self._put(("REQUEST", ts, method, url, self._headers(headers), len(body or b""),
+                   self._body(body)))
+
+    def log_response(self, ts: str, status: int, headers: Optional[dict], body: Optional[bytes],
+                     kind: str = "RESPONSE") -> None:
+        if self.level == "off":
+            return
+        self._put((kind, ts, status, self._headers(headers), len(body or b""), self._body(body)))
+
+    def log_exception(self, ts: str, error: BaseException) -> None:
+        if self.level == "off":
+            return
+        self._put(("EXCEPTION", ts, str(error)))
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Espera (até timeout) que os eventos já enfileirados estejam no ficheiro."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout: float = 2.0) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _headers(self, headers):
+        return dict(headers) if headers is not None and self.enabled("headers") else None
+
+    def _body(self, body):
+        return body[:self.max_body + 1] if body and self.enabled("full") else None
+
+    def _put(self, item) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="http-log", daemon=True)
+                    self._thread.start()
+        self._queue.put(item)
+
+    # --- Thread do escritor ---
+    def _format(self, item) -> str:
+        kind, ts = item[0], item[1]
+        if kind == "EXCEPTION":
+            return f"[{ts}] EXCEPTION\n{item[2]}\n\n"
+        if kind == "REQUEST":
+            _, _, method, url, headers, length, body = item
+            lines = [f"[{ts}] REQUEST", f"URL: {url}", f"Method: {method}"]
+            trailer = "\n"
+        else:
+            _, _, status, headers, length, body = item
+            lines = [f"[{ts}] {kind}", f"Status: {status}"]
+            trailer = "\n\n"
+        if headers is not None:
+            lines.append(f"Headers: {json.dumps(headers)}")
+        lines.append(f"BodyLen: {length}")
+        if body is not None:
+            # O corpo chegou com max_body + 1 bytes no máximo; a nota usa o tamanho real.
+            text = body[:self.max_body].decode('utf-8', errors='replace')
+            if length > self.max_body:
+                text += f"... [truncado, {length - self.max_body} bytes omitidos]"
+            lines.append(f"Body: {text}")
+        return "\n".join(lines) + trailer
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = [item for item in items if isinstance(item, threading.Event)]
+            stop = any(item is _STOP for item in items)
+            for item in items:
+                if item is not _STOP and not isinstance(item, threading.Event):
+                    self._write(self._format(item))
+            self._flush_file()
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write(self, text: str) -> None:
+        try:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.path.open('a', encoding='utf-8')
+            self._file.write(text)
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            self._report_error(e)
+
+    def _flush_file(self) -> None:
+        try:
+            if self._file is not None:
+                self._file.flush()
+        except OSError as e:
+            self._report_error(e)
+
+    def _report_error(self, error: OSError) -> None:
+        if self.write_error is None:
+            self.write_error = error
+
+    def _backup_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{index}{self.path.suffix}.gz")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                if self._backup_path(index).exists():
+                    os.replace(self._backup_path(index), self._backup_path(index + 1))
+            with self.path.open('rb') as src, gzip.open(self._backup_path(1), 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+        self.path.unlink()
+
+
+_writer: Optional[HttpLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_http_log() -> HttpLogWriter:
+    """Escritor partilhado de http_log.txt."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            level = os.environ.get("GIFTTEST_HTTP_LOG", DEFAULT_HTTP_LOG_LEVEL)
+            _writer = HttpLogWriter(get_http_log_path(), level)
+            atexit.register(_writer.close)
+        return _writer
+
+
+def set_http_log_level(level: str) -> None:
+    if level in _RANK:
+        get_http_log().level = level
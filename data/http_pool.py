@@ -0,0 +1,470 @@
+"""
+Pool partilhado de ligações HTTP(S) persistentes (keep-alive).
+
+Evita pagar DNS + TCP + TLS em cada pedido aos providers LLM: as ligações são
+reutilizadas por host, descartadas após um período de inatividade e
+restabelecidas automaticamente quando o servidor as fechou entretanto.
+Usa apenas http.client (stdlib) e é seguro entre threads.
+
+prewarm() abre antecipadamente uma ligação a um host (DNS + TCP + TLS) e
+deixa-a inativa no pool, para o primeiro pedido a encontrar pronta.
+
+Os proxies das variáveis de ambiente (HTTP_PROXY, HTTPS_PROXY, NO_PROXY) são
+respeitados como no urllib: HTTPS por um túnel CONNECT, HTTP com o URL
+completo na linha do pedido.
+
+Um CancelToken passado aos pedidos permite cancelá-los a partir de outra
+thread: cancel() fecha de imediato os sockets em uso e a thread do pedido sai
+com RequestCancelled.
+"""
+
+from __future__ import annotations
+
+import http.client
+import select
+import socket
+import ssl
+import base64
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Optional, Tuple
+
+DEFAULT_IDLE_TIMEOUT = 60.0
+DEFAULT_MAX_IDLE_PER_HOST = 4
+MAX_REDIRECTS = 5
+
+# Erros típicos de uma ligação reutilizada que o servidor já fechou.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+def _proxy_for(scheme: str, host: str) -> Optional[str]:
+    """URL do proxy para este esquema e host (variáveis de ambiente, como no urllib), ou None."""
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    return proxy if '://' in proxy else f"http://{proxy}"
+
+
+def _proxy_headers(proxy: str) -> dict:
+    """Proxy-Authorization (Basic) se o URL do proxy tiver utilizador e palavra-passe."""
+    parts = urllib.parse.urlsplit(proxy)
+    if parts.username is None:
+        return {}
+    user = urllib.parse.unquote(parts.username)
+    password = urllib.parse.unquote(parts.password or '')
+    token = base64.b64encode(f"{user}:{password}".encode('utf-8')).decode('ascii')
+    return {'Proxy-Authorization': 'Basic ' + token}
+
+
+class RequestCancelled(BaseException):
+    """O pedido foi cancelado pelo seu CancelToken.
+
+    Deriva de BaseException (como asyncio.CancelledError) para atravessar os
+    `except Exception` de quem faz o pedido e não ficar guardado como resultado.
+    """
+
+
+def _shutdown(conn) -> None:
+    sock = getattr(conn, 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class CancelToken:
+    """Cancelamento cooperativo de pedidos, seguro entre threads."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._conns: set = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancela: os sockets em uso são fechados e as leituras bloqueadas terminam."""
+        with self._lock:
+            self._event.set()
+            conns = list(self._conns)
+        for conn in conns:
+            _shutdown(conn)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RequestCancelled()
+
+    def wait(self, timeout: float) -> bool:
+        """Espera até timeout segundos; True se entretanto foi cancelado."""
+        return self._event.wait(timeout)
+
+    def _attach(self, conn) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._conns.add(conn)
+                return
+        raise RequestCancelled()
+
+    def _detach(self, conn) -> None:
+        with self._lock:
+            self._conns.discard(conn)
+
+
+class PooledResponse:
+    """Resposta HTTP cuja ligação volta ao pool quando é lida até ao fim."""
+
+    def __init__(self, pool: 'ConnectionPool', key: tuple, conn, resp: http.client.HTTPResponse,
+                 cancel_token: Optional[CancelToken] = None, connect_time: float = 0.0):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self._cancel_token = cancel_token
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = dict(resp.getheaders())
+        # Segundos gastos a abrir a ligação (0 se reutilizada do pool).
+        self.connect_time = connect_time
+
+    def _check_cancelled(self) -> None:
+        # Com o socket fechado por cancel(), as leituras devolvem EOF ou falham.
+        if self._cancel_token is not None and self._cancel_token.cancelled:
+            self.abort()
+            raise RequestCancelled()
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        try:
+            data = self._resp.read(amt)
+        except Exception:
+            self._check_cancelled()
+            raise
+        self._check_cancelled()
+        if amt is None or not data:
+            self.close()
+        return data
+
+    def readline(self) -> bytes:
+        try:
+            line = self._resp.readline()
+        except Exception:
+            self._check_cancelled()
+            raise
+        self._check_cancelled()
+        if not line:
+            self.close()
+        return line
+
+    def close(self) -> None:
+        """Devolve a ligação ao pool (se reutilizável) ou fecha-a."""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._cancel_token is not None:
+            self._cancel_token._detach(conn)
+        if self._resp.isclosed() and not self._resp.will_close:
+            self._pool._release(self._key, conn)
+        else:
+            conn.close()
+
+    def abort(self) -> None:
+        """Fecha o socket de imediato (desbloqueia leituras noutras threads)."""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._cancel_token is not None:
+            self._cancel_token._detach(conn)
+        _shutdown(conn)
+        conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """Ligações persistentes por (esquema, host, porta, proxy), partilhadas entre threads."""
+
+    def __init__(
+            self,
+            idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+            max_idle_per_host: int = DEFAULT_MAX_IDLE_PER_HOST,
+            ssl_context: Optional[ssl.SSLContext] = None):
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_host = max_idle_per_host
+        self._ssl_context = ssl_context or ssl.create_default_context()
+        self._idle: dict[tuple, list[tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+
+    # --- Gestão das ligações ---
+    def _new_connection(self, key: tuple, connect_timeout: float):
+        scheme, host, port, proxy = key
+        if proxy is None:
+            if scheme == 'https':
+                return http.client.HTTPSConnection(host, port, timeout=connect_timeout,
+                                                   context=self._ssl_context)
+            return http.client.HTTPConnection(host, port, timeout=connect_timeout)
+        proxy_parts = urllib.parse.urlsplit(proxy)
+        proxy_host, proxy_port = proxy_parts.hostname or '', proxy_parts.port or 8080
+        if scheme == 'https':
+            # Túnel CONNECT pelo proxy; o TLS é negociado com o host de destino.
+            conn = http.client.HTTPSConnection(
+                proxy_host, proxy_port, timeout=connect_timeout, context=self._ssl_context)
+            conn.set_tunnel(host, port, headers=_proxy_headers(proxy))
+            return conn
+        return http.client.HTTPConnection(proxy_host, proxy_port, timeout=connect_timeout)
+
+    @staticmethod
+    def _is_alive(conn) -> bool:
+        """Verifica sem bloquear se o servidor fechou a ligação inativa."""
+        sock = getattr(conn, 'sock', None)
+        if sock is None:
+            return False
+        try:
+            # Numa ligação inativa, qualquer coisa para ler (EOF, close_notify
+            # ou dados inesperados) significa que já não serve.
+            readable, _, _ = select.select([sock], [], [], 0)
+            return not readable
+        except (OSError, ValueError):
+            return False
+
+    def _acquire(self, key: tuple, timeout: float, connect_timeout: float):
+        """Retorna (ligação, reutilizada)."""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                conn, last_used = idle.pop()
+            if now - last_used <= self.idle_timeout and self._is_alive(conn):
+                try:
+                    conn.sock.settimeout(timeout)
+                except (OSError, AttributeError):
+                    conn.close()
+                    continue
+                return conn, True
+            conn.close()
+        return self._new_connection(key, connect_timeout), False
+
+    def _expired(self, key: tuple, now: float) -> list:
+        """Retira do pool as ligações inativas há mais de idle_timeout (chamar com o lock)."""
+        idle = self._idle.get(key, [])
+        fresh = [(conn, last_used) for conn, last_used in idle
+                 if now - last_used <= self.idle_timeout]
+        if len(fresh) == len(idle):
+            return []
+        expired = [conn for conn, last_used in idle if now - last_used > self.idle_timeout]
+        self._idle[key] = fresh
+        return expired
+
+    def _release(self, key: tuple, conn) -> None:
+        """Devolve a ligação ao pool; se a lista ficar cheia, sai a inativa há mais tempo."""
+        now = time.monotonic()
+        with self._lock:
+            closing = self._expired(key, now)
+            idle = self._idle.setdefault(key, [])
+            idle.append((conn, now))
+            while len(idle) > self.max_idle_per_host:
+                closing.append(idle.pop(0)[0])
+        for old in closing:
+            old.close()
+
+    def prewarm(self, url: str, connect_timeout: float = 10) -> bool:
+        """Garante uma ligação inativa utilizável ao host de url no pool.
+
+        Se já houver uma que o servidor não fechou, é marcada como usada agora
+        (não expira por inatividade no pool) e não se abre outra. Retorna True
+        se abriu uma ligação.
+        """
+        key, _ = self._split_url(url)
+        now = time.monotonic()
+        with self._lock:
+            expired = self._expired(key, now)
+            idle = list(self._idle.get(key, ()))
+        for conn in expired:
+            conn.close()
+        alive = [conn for conn, _ in idle if self._is_alive(conn)]
+        dead = [conn for conn, _ in idle if conn not in alive]
+        with self._lock:
+            conns = self._idle.get(key, [])
+            conns[:] = [(conn, last_used) for conn, last_used in conns if conn not in dead]
+            for i, (conn, _) in enumerate(conns):
+                if conn in alive:
+                    conns[i] = (conn, time.monotonic())
+                    refreshed = True
+                    break
+            else:
+                refreshed = False
+        for conn in dead:
+            conn.close()
+        if refreshed:
+            return False
+        # Nenhuma serve (ou foram entretanto levadas por pedidos): abre-se outra.
+        conn = self._new_connection(key, connect_timeout)
+        try:
+            self._connect(conn, connect_timeout)
+        except BaseException:
+            conn.close()
+            raise
+        self._release(key, conn)
+        return True
+
+    def clear(self) -> None:
+        """Fecha todas as ligações inativas."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn, _ in conns:
+                conn.close()
+
+    # --- Pedidos ---
+    @staticmethod
+    def _split_url(url: str) -> Tuple[tuple, str]:
+        """(chave do pool, alvo da linha do pedido): o URL completo se for HTTP por um proxy."""
+        parts = urllib.parse.urlsplit(url)
+        scheme = (parts.scheme or 'http').lower()
+        host = parts.hostname or ''
+        port = parts.port or (443 if scheme == 'https' else 80)
+        proxy = _proxy_for(scheme, host)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        if proxy is not None and scheme == 'http':
+            path = f"http://{parts.netloc.rpartition('@')[2]}{path}"
+        return (scheme, host, port, proxy), path
+
+    def urlopen(
+            self, method: str, url: str,
+            body: Optional[bytes] = None,
+            headers: Optional[dict] = None,
+            timeout: float = 60,
+            cancel_token: Optional[CancelToken] = None,
+            connect_timeout: Optional[float] = None) -> PooledResponse:
+        """Envia o pedido e retorna a resposta sem ler o corpo (permite streaming).
+
+        timeout limita cada leitura; connect_timeout (por omissão igual) limita
+        o estabelecimento de uma ligação nova (TCP + TLS). Segue
+        redirecionamentos e repete uma vez com ligação nova se a ligação
+        reutilizada tiver sido fechada pelo servidor.
+        """
+        headers = dict(headers or {})
+        if connect_timeout is None:
+            connect_timeout = timeout
+        for _ in range(MAX_REDIRECTS + 1):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            key, path = self._split_url(url)
+            send_headers = headers
+            if key[3] is not None and key[0] == 'http':
+                send_headers = {**headers, **_proxy_headers(key[3])}
+            resp = self._send(key, method, path, body, send_headers, timeout, cancel_token,
+                              connect_timeout)
+            location = resp.headers.get('Location') or resp.headers.get('location')
+            if resp.status in (301, 302, 303, 307, 308) and location:
+                resp.read()
+                url = urllib.parse.urljoin(url, location)
+                to_get = resp.status in (301, 302) and method not in ('GET', 'HEAD')
+                if resp.status == 303 or to_get:
+                    method, body = 'GET', None
+                    headers = {k: v for k, v in headers.items()
+                               if k.lower() not in ('content-type', 'content-length')}
+                continue
+            return resp
+        raise http.client.HTTPException(f"Demasiados redirecionamentos: {url}")
+
+    @staticmethod
+    def _connect(conn, timeout: float) -> float:
+        """Abre a ligação (com o tempo limite de ligação) e passa ao de leitura."""
+        start = time.perf_counter()
+        conn.connect()
+        conn.sock.settimeout(timeout)
+        return time.perf_counter() - start
+
+    def _send(self, key, method, path, body, headers, timeout, cancel_token=None,
+              connect_timeout: Optional[float] = None) -> PooledResponse:
+        if connect_timeout is None:
+            connect_timeout = timeout
+        conn, reused = self._acquire(key, timeout, connect_timeout)
+        connect_time = 0.0
+        try:
+            if not reused:
+                connect_time = self._connect(conn, timeout)
+            resp = self._exchange(conn, method, path, body, headers, cancel_token)
+        except _STALE_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+            # A ligação inativa tinha sido fechada: repete com uma nova.
+            conn = self._new_connection(key, connect_timeout)
+            try:
+                connect_time = self._connect(conn, timeout)
+                resp = self._exchange(conn, method, path, body, headers, cancel_token)
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        return PooledResponse(self, key, conn, resp, cancel_token, connect_time)
+
+    @staticmethod
+    def _exchange(conn, method, path, body, headers, cancel_token) -> http.client.HTTPResponse:
+        if cancel_token is None:
+            conn.request(method, path, body=body, headers=headers)
+            return conn.getresponse()
+        if conn.sock is None:
+            conn.connect()
+        cancel_token._attach(conn)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+        except BaseException:
+            cancel_token._detach(conn)
+            cancel_token.raise_if_cancelled()
+            raise
+        if cancel_token.cancelled:
+            cancel_token._detach(conn)
+            raise RequestCancelled()
+        return resp
+
+    def request(
+            self, method: str, url: str,
+            body: Optional[bytes] = None,
+            headers: Optional[dict] = None,
+            timeout: float = 60,
+            cancel_token: Optional[CancelToken] = None) -> Tuple[int, dict, bytes]:
+        """Pedido completo. Retorna (status, headers, body_bytes)."""
+        resp = self.urlopen(method, url, body=body, headers=headers, timeout=timeout,
+                            cancel_token=cancel_token)
+        try:
+            data = resp.read()
+        except BaseException:
+            resp.abort()
+            raise
+        return resp.status, resp.headers, data
+
+
+_shared_pool: Optional[ConnectionPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Pool partilhado por todos os clientes (e threads) da aplicação."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool()
+        return _shared_pool
@@ -10,35 +10,44 @@ import urllib.error
 import time
 import os
 import json
+import threading
 from functools import lru_cache
 from typing import Optional
 
+from .http_pool import CancelToken, get_pool
+from .thumbnail_cache import get_thumbnail, store_thumbnail
+
 # APIs de imagens gratuitas (sem necessidade de API key)
 IMAGE_PROVIDERS = {
     'wikimedia': {
         'name': 'Wikimedia Commons',
         'description': 'Imagens da Wikipedia (pesquisa por keywords)',
-        'url_template': None  # Uses search API
+        'url_template': None,  # Uses search API
+        'hosts': ('https://commons.wikimedia.org', 'https://upload.wikimedia.org')
     },
     'openverse': {
         'name': 'Openverse',
         'description': 'Imagens CC via Openverse (pesquisa por keywords)',
-        'url_template': None  # Uses search API
+        'url_template': None,  # Uses search API
+        'hosts': ('https://api.openverse.org',)
     },
     'pexels': {
         'name': 'Pexels',
         'description': 'Imagens do Pexels (requer PEXELS_API_KEY)',
-        'url_template': None  # Uses search API
+        'url_template': None,  # Uses search API
+        'hosts': ('https://api.pexels.com', 'https://images.pexels.com')
     },
     'unsplash': {
         'name': 'Unsplash Source',
         'description': 'Imagens de alta qualidade (pode ter 503 - instável)',
-        'url_template': 'https://source.unsplash.com/300/200/?{keywords}'
+        'url_template': 'https://source.unsplash.com/300/200/?{keywords}',
+        'hosts': ('https://source.unsplash.com',)
     },
     'radiopaedia': {
         'name': 'Radiopaedia',
         'description': 'Casos radiológicos (scraping; devolve 1 imagem representativa por caso)',
-        'url_template': None
+        'url_template': None,
+        'hosts': ('https://radiopaedia.org', 'https://prod-images-static.radiopaedia.org')
     },
     'none': {
         'name': 'Sem imagens',
@@ -48,13 +57,11 @@ IMAGE_PROVIDERS = {
 }
 
 
-# ---- Optional in-memory prefetch (no files, no data URIs) ----
-_PREFETCH_CACHE: dict[str, bytes] = {}
-_PREFETCH_CACHE_MAX = 256
-
-
 _UA = 'GiftTest/1.0 (educational app)'
 
+# CancelToken da pesquisa em curso nesta thread (ver fetch_image_groups).
+_cancel_state = threading.local()
+
 
 _HTML_HEADERS = {
     'User-Agent': _UA,
@@ -63,13 +70,26 @@ _HTML_HEADERS = {
 }
 
 
+def _fetch(req: urllib.request.Request, timeout: float) -> bytes:
+    """Corpo da resposta, pelo pool de ligações partilhado (keep-alive).
+
+    Respeita o CancelToken da thread: um cancelamento fecha o socket de imediato.
+    Erros HTTP levantam urllib.error.HTTPError, como urlopen.
+    """
+    status, _headers, data = get_pool().request(
+        req.get_method(), req.full_url, body=req.data, headers=dict(req.header_items()),
+        timeout=timeout, cancel_token=getattr(_cancel_state, 'token', None))
+    if status >= 400:
+        raise urllib.error.HTTPError(req.full_url, status, f"HTTP {status}", None, None)
+    return data
+
+
 def _http_get_text(url: str, timeout: int = 15, headers: Optional[dict] = None) -> str:
     if not url:
         return ''
     h = headers or _HTML_HEADERS
     req = urllib.request.Request(url, headers=h)
-    with urllib.request.urlopen(req, timeout=timeout) as r:
-        return r.read().decode('utf-8', errors='replace')
+    return _fetch(req, timeout).decode('utf-8', errors='replace')
 
 
 def _absolutize_url(base: str, href: str) -> str:
@@ -209,28 +229,6 @@ def search_radiopaedia_images(keywords: str, max_results: int = 3) -> tuple[tupl
         return tuple()
 
 
-def get_prefetched_image_bytes(url: str) -> Optional[bytes]:
-    """Returns prefetched bytes for an image URL, if available."""
-    if not url:
-        return None
-    return _PREFETCH_CACHE.get(url)
-
-
-def _put_prefetched_image_bytes(url: str, data: bytes) -> None:
-    if not url or not data:
-        return
-    # Simple capped dict (FIFO-ish by insertion order in Py3.7+)
-    if url in _PREFETCH_CACHE:
-        return
-    _PREFETCH_CACHE[url] = data
-    if len(_PREFETCH_CACHE) > _PREFETCH_CACHE_MAX:
-        try:
-            oldest_key = next(iter(_PREFETCH_CACHE.keys()))
-            _PREFETCH_CACHE.pop(oldest_key, None)
-        except Exception:
-            _PREFETCH_CACHE.clear()
-
-
 def _media_fragment_url(file_page_url: str) -> str:
     """Converte uma página de ficheiro da Wikipedia/Commons para o fragmento #/media."""
     if not file_page_url:
@@ -270,8 +268,7 @@ def _commons_api_get_json(params: dict, timeout: int = 10) -> dict:
     url = _build_url_with_query('https://commons.wikimedia.org/w/api.php', params)
     req = urllib.request.Request(url)
     req.add_header('User-Agent', _UA)
-    with urllib.request.urlopen(req, timeout=timeout) as response:
-        return json.loads(response.read().decode('utf-8'))
+    return json.loads(_fetch(req, timeout).decode('utf-8'))
 
 
 def _commons_search_titles(srsearch: str, limit: int) -> list[str]:
@@ -576,8 +573,7 @@ def search_openverse_images(keywords: str, max_results: int = 3) -> tuple[tuple[
         api_url = f'https://api.openverse.org/v1/images/?{query}'
         req = urllib.request.Request(api_url)
         req.add_header('User-Agent', 'GiftTest/1.0 (educational app)')
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
+        data = json.loads(_fetch(req, 10).decode('utf-8'))
 
         results = data.get('results', []) or []
         out: list[tuple[str, str]] = []
@@ -649,8 +645,7 @@ def search_pexels_images(keywords: str, max_results: int = 3) -> tuple[tuple[str
         req = urllib.request.Request(url)
         req.add_header('Authorization', api_key)
         req.add_header('User-Agent', 'GiftTest/1.0 (educational app)')
-        with urllib.request.urlopen(req, timeout=12) as response:
-            data = json.loads(response.read().decode('utf-8'))
+        data = json.loads(_fetch(req, 12).decode('utf-8'))
 
         photos = data.get('photos', []) or []
         out: list[tuple[str, str]] = []
@@ -691,8 +686,7 @@ def get_wikimedia_image_url(file_title: str, width: int = 300) -> Optional[str]:
     try:
         req = urllib.request.Request(api_url)
         req.add_header('User-Agent', _UA)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = json.loads(response.read().decode('utf-8'))
+        data = json.loads(_fetch(req, 10).decode('utf-8'))
         
         pages = data.get('query', {}).get('pages', {})
         for page in pages.values():
@@ -1006,9 +1000,7 @@ def download_image(url: str, timeout: int = 10) -> Optional[bytes]:
     try:
         req = urllib.request.Request(url)
         req.add_header('User-Agent', 'Mozilla/5.0')
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            data = response.read()
-            return data
+        return _fetch(req, timeout)
     except Exception:
         return None
 
@@ -1308,9 +1300,13 @@ def fetch_image_groups(
         max_images_per_block: int = 3,
     prefetch_thumbnails: bool = False,
         thumb_width: int = 320,
+        cancel_token: Optional[CancelToken] = None,
 ) -> tuple[tuple, float]:
     """Fetches image URLs for each keywords block.
 
+    With cancel_token, cancel() closes the connection in use and this function
+    raises RequestCancelled (data/http_pool.py) within milliseconds.
+
     Returns:
         (groups, seconds) where groups is a tuple of (images, error, debug) per block:
         - images: tuple[(thumb_url, landing_url), ...]
@@ -1323,11 +1319,24 @@ def fetch_image_groups(
     if provider == 'none':
         return tuple(((tuple(), 'provider_none', {'provider': 'none', 'requests': [], 'params': {}}) for _ in keywords_list)), 0.0
 
+    previous_token = getattr(_cancel_state, 'token', None)
+    _cancel_state.token = cancel_token
+    try:
+        return _fetch_image_groups(keywords_list, provider, max_images_per_block,
+                                   prefetch_thumbnails, thumb_width, cancel_token)
+    finally:
+        _cancel_state.token = previous_token
+
+
+def _fetch_image_groups(keywords_list, provider, max_images_per_block, prefetch_thumbnails,
+                        thumb_width, cancel_token) -> tuple[tuple, float]:
     start = time.time()
     out: list[tuple[tuple[tuple[str, str], ...], str, dict]] = []
     thumbs_to_prefetch: list[str] = []
 
     for keywords in keywords_list:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         images: tuple[tuple[str, str], ...] = tuple()
         err = ''
         debug: dict = {}
@@ -1466,11 +1475,11 @@ def fetch_image_groups(
             deduped.append(u)
 
         for url in deduped[:12]:
-            if not url or url in _PREFETCH_CACHE:
+            if not url or get_thumbnail(url) is not None:
                 continue
             data = download_image(url, timeout=3)
             if data:
-                _put_prefetched_image_bytes(url, data)
+                store_thumbnail(url, data)
 
     return tuple(out), (time.time() - start)
 
@@ -0,0 +1,224 @@
+"""
+Cliente LLM assíncrono (asyncio) para cargas concorrentes.
+
+Expõe a mesma superfície que LLMClient (generate, generate_stream, list_models
+e os mesmos LLMError). Cada pedido corre o cliente síncrono numa thread de um
+executor partilhado, com uma cópia própria do cliente: usa o mesmo pool de
+ligações keep-alive (data/http_pool.py), as mesmas novas tentativas, rate
+limiting, registo HTTP e métricas, e o cancelamento da task fecha o socket em
+uso. Um semáforo por provider limita os pedidos simultâneos e pedidos
+idênticos em simultâneo (mesmo prompt e mesma configuração: provider, key,
+servidor, modelo, system prompt e opções) são feitos uma só vez
+(data/single_flight.py).
+
+A GUI usa um único event loop numa thread própria (submit()); as ferramentas
+de linha de comandos podem correr centenas de pedidos com asyncio.gather.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import copy
+import functools
+import hashlib
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Callable, List, NamedTuple, Optional
+
+from .constants import ASYNC_LLM_THREADS, DEFAULT_PROVIDER_CONCURRENCY, PROVIDER_CONCURRENCY
+from .hf_readiness import is_warm, ready_in
+from .http_pool import CancelToken
+from .llm_client import LLMClient
+from .single_flight import SingleFlight
+
+_provider_limits: dict[str, int] = dict(PROVIDER_CONCURRENCY)
+
+
+def set_provider_concurrency(provider: str, limit: int) -> None:
+    """Altera o nº máximo de pedidos simultâneos a um provider (antes de os iniciar)."""
+    _provider_limits[provider] = max(1, int(limit))
+
+
+def get_provider_concurrency(provider: str) -> int:
+    """Nº máximo de pedidos simultâneos a um provider."""
+    return _provider_limits.get(provider, DEFAULT_PROVIDER_CONCURRENCY)
+
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary())
+_single_flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SingleFlight]" = (
+    weakref.WeakKeyDictionary())
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                ASYNC_LLM_THREADS, thread_name_prefix="llm-request")
+        return _executor
+
+
+def _get_single_flight() -> SingleFlight:
+    loop = asyncio.get_running_loop()
+    flight = _single_flights.get(loop)
+    if flight is None:
+        flight = _single_flights[loop] = SingleFlight()
+    return flight
+
+
+def _get_semaphore(provider: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    per_loop = _semaphores.setdefault(loop, {})
+    sem = per_loop.get(provider)
+    if sem is None:
+        sem = per_loop[provider] = asyncio.Semaphore(get_provider_concurrency(provider))
+    return sem
+
+
+class LLMAnswer(NamedTuple):
+    """Resultado de um pedido: o texto e quem o deu (em race, pode ser um provider de reserva)."""
+    text: str
+    provider: str
+    model: str
+    system_prompt: str
+    # Troca HTTP (redigida) deste pedido, como LLMClient.last_http_exchange.
+    http_exchange: Optional[dict] = None
+
+
+# --- Cliente ---
+def _sync_property(name: str, convert: Callable = lambda v: v) -> property:
+    """Atributo lido e escrito no LLMClient síncrono (self._sync)."""
+    return property(lambda self: getattr(self._sync, name),
+                    lambda self, v: setattr(self._sync, name, convert(v)))
+
+
+class AsyncLLMClient:
+    """Equivalente assíncrono de LLMClient (mesmos providers e erros)."""
+
+    def __init__(self, provider: str, api_key: str, model: Optional[str] = None,
+                 system_prompt: Optional[str] = None):
+        self._sync = LLMClient(provider, api_key, model, system_prompt)
+
+    # Configuração partilhada com o cliente síncrono (copiado em cada pedido).
+    provider = property(lambda self: self._sync.provider)
+    model = _sync_property('model', lambda v: v or "")
+    system_prompt = _sync_property('system_prompt', lambda v: v or "")
+    max_tokens = _sync_property('max_tokens')
+    max_retries = _sync_property('max_retries')
+    wait_for_model = _sync_property('wait_for_model')
+
+    async def list_models(self, refresh: bool = False) -> List[dict]:
+        # Catálogo em cache (model_catalog); a rede, quando necessária, corre numa thread.
+        return await asyncio.to_thread(self._sync.list_models, refresh)
+
+    @asynccontextmanager
+    async def _slot(self):
+        async with _get_semaphore(self.provider):
+            yield
+
+    async def _run(self, timeout: Optional[float], call: Callable[[LLMClient], str]) -> LLMAnswer:
+        """call(cliente) numa thread do executor, depois de obter o lugar do provider.
+
+        O cliente é uma cópia de self._sync com CancelToken próprio (cancelar a
+        task fecha o socket) e timeout como tempo de leitura; a espera pelo lugar
+        não conta para o tempo limite.
+        """
+        client = copy.copy(self._sync)
+        client.cancel_token = CancelToken()
+        client.read_timeout = timeout
+        async with self._slot():
+            try:
+                text = await asyncio.get_running_loop().run_in_executor(
+                    _get_executor(), functools.partial(call, client))
+                return LLMAnswer(text, client.provider, client.model, client.system_prompt,
+                                 client.last_http_exchange)
+            except asyncio.CancelledError:
+                client.cancel_token.cancel()
+                raise
+
+    def _flight_key(self, prompt: str, timeout: Optional[float]) -> tuple:
+        """Só pedidos com a mesma configuração (key, servidor, opções) partilham a resposta."""
+        sync = self._sync
+        key_hash = hashlib.sha256((sync.api_key or "").encode("utf-8")).hexdigest()[:16]
+        endpoint = None
+        if sync.provider == "custom":
+            endpoint = (sync.custom_endpoint["base_url"], sync.custom_endpoint["path"])
+        return (sync.provider, key_hash, endpoint, sync.model, sync.system_prompt, sync.max_tokens,
+                sync.wait_for_model, timeout, prompt)
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """timeout limita cada leitura; por omissão é adaptativo (data/provider_health.py)."""
+        return (await self.generate_answer(prompt, None, timeout)).text
+
+    async def generate_stream(self, prompt: str, on_chunk: Callable[[str], None],
+                              timeout: Optional[float] = None) -> str:
+        """Como generate(), entregando cada delta a on_chunk (chamado no event loop)."""
+        return (await self.generate_answer(prompt, on_chunk, timeout)).text
+
+    async def generate_answer(self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None,
+                              timeout: Optional[float] = None) -> LLMAnswer:
+        """Como generate_stream() (generate() sem on_chunk); devolve também quem respondeu.
+
+        O provider, o modelo e a troca HTTP vêm no LLMAnswer de cada chamada.
+        """
+        # Pedidos idênticos em curso (p.ex. duplo clique em "Explicar") partilham a mesma resposta.
+        flight = _get_single_flight()
+        if on_chunk is None:
+            return await flight.run(
+                self._flight_key(prompt, timeout),
+                lambda _publish: self._run(timeout, lambda client: client.generate(prompt)))
+        return await flight.run(
+            self._flight_key(prompt, timeout),
+            lambda publish: self._generate_stream(prompt, publish, timeout), on_chunk)
+
+    async def _generate_stream(self, prompt: str, publish: Callable[[str], None],
+                               timeout: Optional[float]) -> LLMAnswer:
+        loop = asyncio.get_running_loop()
+
+        def deliver(piece: str) -> None:
+            loop.call_soon_threadsafe(publish, piece)
+
+        return await self._run(timeout, lambda client: client.generate_stream(prompt, deliver))
+
+    async def warm_up(self) -> None:
+        """Pedido mínimo para o Hugging Face carregar o modelo, se não está quente nem a carregar.
+
+        Nos outros providers não faz nada. Levanta LLMError se o pedido falhar.
+        """
+        if self.provider != "huggingface":
+            return
+        model = self._sync.hf_model()
+        if is_warm(model) or ready_in(model) > 0:
+            return
+        ping = AsyncLLMClient(self.provider, self._sync.api_key, self.model)
+        ping.max_tokens = 2  # max_new_tokens = 1
+        await ping._run(None, lambda client: client.generate("Olá"))
+
+
+# --- Ponte para código síncrono (GUI) ---
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Event loop partilhado, a correr numa thread daemon própria."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro) -> concurrent.futures.Future:
+    """Agenda a coroutine no event loop partilhado.
+
+    Cancelar o Future devolvido cancela a task e fecha o socket em uso.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
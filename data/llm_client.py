@@ -1,34 +1,105 @@
 """
 LLM client abstraction supporting Groq, Hugging Face, and Google Gemini.
-All network calls use stdlib urllib to avoid extra dependencies.
+All network calls use the stdlib (http.client via a shared keep-alive pool)
+to avoid extra dependencies.
 """
 
-from typing import List, Optional, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 import json
+import os
+import sys
 import urllib.request
 import urllib.parse
 import urllib.error
 import datetime
+import itertools
+import time
 from pathlib import Path
 
-from .app_paths import get_http_log_path
-
-GROQ_BASE = "https://api.groq.com/openai/v1"
-HF_MODELS_LIST = "https://huggingface.co/api/models?pipeline_tag=text-generation&sort=downloads&direction=-1&limit=50"
-HF_INFER_BASE = "https://router.huggingface.co/models"
-GEMINI_LIST = "https://generativelanguage.googleapis.com/v1beta/models"
-GEMINI_GEN_TEMPLATE = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={key}"
-
-
-class LLMError(Exception):
-    def __init__(self, message, status_code=None, headers=None, body=None):
-        super().__init__(message)
-        self.status_code = status_code
-        self.headers = headers
-        self.body = body
-
-
-class LLMClient:
+from .http_log import get_http_log
+from .constants import (
+    DEFAULT_CUSTOM_BASE_URL, DEFAULT_CUSTOM_CHAT_PATH, DEFAULT_LLM_MAX_TOKENS, DEFAULT_MODELS,
+    GEMINI_GEN_TEMPLATE, GEMINI_LIST, GEMINI_STREAM_TEMPLATE, GROQ_BASE, HF_INFER_BASE,
+    HF_LOADING_POLL_MAX, HF_LOADING_POLL_MIN, HF_MODEL_LOAD_MAX_WAIT, LLM_MAX_RETRIES,
+    LLM_RETRY_MAX_WAIT)
+from .hf_readiness import mark_loading, mark_warm, model_loading_time, ready_in
+from .http_pool import CancelToken, RequestCancelled, get_pool
+from .llm_metrics import record_request
+from .llm_model_lists import ModelListsMixin
+from .llm_responses import (
+    LLMError, SSEDecoder, body_usage, cloudflare_delta, cloudflare_text, event_usage,
+    gemini_response_text, gemini_text, groq_chat_text, hf_text, openai_chat_text, openai_delta)
+from .provider_health import (
+    RETRYABLE_STATUS, ProviderHealth, backoff_delay, get_provider_health, is_retryable_error)
+from .rate_limiter import estimate_tokens, get_rate_limiter
+
+# Endpoint alternativo para todos os providers (ex.: util/mock_llm_server.py).
+LLM_ENDPOINT_ENV = "GIFTTEST_LLM_ENDPOINT"
+# Mesmo User-Agent que o urllib enviava (alguns providers filtram pedidos sem UA).
+_USER_AGENT = f"Python-urllib/{sys.version_info.major}.{sys.version_info.minor}"
+# Servidor do provider "custom" (preferências llm.custom), usado pelos clientes criados a seguir.
+_custom_endpoint = {
+    "base_url": DEFAULT_CUSTOM_BASE_URL, "path": DEFAULT_CUSTOM_CHAT_PATH, "headers": {}}
+
+
+def custom_endpoint_config(base_url: str, path: str = DEFAULT_CUSTOM_CHAT_PATH,
+                           headers: Optional[dict] = None) -> dict:
+    """Configuração normalizada de um servidor OpenAI-compatível (llama.cpp, vLLM, Ollama...):
+    base_url (ex.: http://localhost:8080/v1), caminho do chat e cabeçalhos extra."""
+    path = (path or "").strip() or DEFAULT_CUSTOM_CHAT_PATH
+    return {
+        "base_url": (base_url or "").strip().rstrip("/"),
+        "path": "/" + path.lstrip("/"),
+        "headers": dict(headers or {}),
+    }
+
+
+def set_custom_endpoint(base_url: str, path: str = DEFAULT_CUSTOM_CHAT_PATH,
+                        headers: Optional[dict] = None) -> None:
+    """Define o servidor do provider "custom" para os clientes criados a seguir."""
+    global _custom_endpoint
+    _custom_endpoint = custom_endpoint_config(base_url, path, headers)
+
+
+# Host a que são enviados os pedidos de geração de cada provider.
+_PROVIDER_ORIGINS = {
+    "groq": GROQ_BASE,
+    "huggingface": HF_INFER_BASE,
+    "gemini": GEMINI_LIST,
+    "mistral": "https://api.mistral.ai",
+    "perplexity": "https://api.perplexity.ai",
+    "openrouter": "https://openrouter.ai",
+    "cloudflare": "https://api.cloudflare.com",
+}
+
+
+def provider_url(provider: str) -> str:
+    """URL do host de geração do provider (só o host conta; '' se desconhecido).
+
+    Com GIFTTEST_LLM_ENDPOINT aplicado, como nos pedidos.
+    """
+    if provider == "custom":
+        url = _custom_endpoint["base_url"]
+    else:
+        url = _PROVIDER_ORIGINS.get(provider, "")
+    return target_url(url) if url else ""
+
+
+def target_url(url: str) -> str:
+    """URL a que o pedido é enviado: com GIFTTEST_LLM_ENDPOINT definido (ex.:
+    http://127.0.0.1:8765), o esquema e o host são substituídos e o caminho e a
+    query do provider mantêm-se."""
+    endpoint = os.environ.get(LLM_ENDPOINT_ENV)
+    if not endpoint:
+        return url
+    target = urllib.parse.urlsplit(endpoint)
+    parts = urllib.parse.urlsplit(url)
+    path = target.path.rstrip('/') + parts.path
+    return urllib.parse.urlunsplit(
+        (target.scheme, target.netloc, path, parts.query, parts.fragment))
+
+
+class LLMClient(ModelListsMixin):
     def __init__(self, provider: str, api_key: str, model: Optional[str] = None, system_prompt: Optional[str] = None):
         self.provider = provider
         # Sanitize API key: remove leading/trailing spaces and any control chars
@@ -36,10 +107,20 @@ class LLMClient:
         self.api_key = "".join(ch for ch in raw_key if 32 <= ord(ch) <= 126)
         self.model = model or ""
         self.system_prompt = system_prompt or ""
-        # Log file in a writable per-user location (Android and packaged apps).
-        self._log_file = get_http_log_path()
+        # Limite de tokens da resposta (aumentado nos pedidos em lote).
+        self.max_tokens = DEFAULT_LLM_MAX_TOKENS
+        # Novas tentativas após erros transitórios (429, 5xx, ligação cortada).
+        self.max_retries = LLM_MAX_RETRIES
+        # Hugging Face: esperar (até HF_MODEL_LOAD_MAX_WAIT) por um modelo a carregar, sem falhar.
+        self.wait_for_model = True
+        # Tempo limite de leitura fixo (segundos); None = adaptativo (data/provider_health.py).
+        self.read_timeout: Optional[float] = None
+        # Se definido, cancel() interrompe o pedido em curso (RequestCancelled).
+        self.cancel_token: Optional[CancelToken] = None
         # Last HTTP exchange (redacted) for embedding in the UI as an HTML comment.
         self.last_http_exchange: Optional[dict] = None
+        # Provider "custom": servidor em uso (as Configurações testam valores ainda por gravar).
+        self.custom_endpoint = dict(_custom_endpoint)
 
     def _redact_headers(self, headers: dict) -> dict:
         if not headers:
@@ -48,7 +129,10 @@ class LLMClient:
         for k, v in headers.items():
             key = str(k)
             lower = key.lower()
-            if lower in {"authorization", "x-api-key", "api-key", "x-auth-token"}:
+            secret = {"authorization", "x-api-key", "api-key", "x-auth-token"}
+            if self.provider == "custom":
+                secret |= {h.lower() for h in self.custom_endpoint["headers"]}
+            if lower in secret:
                 redacted[key] = "<REDACTED>"
                 continue
             redacted[key] = v
@@ -72,121 +156,313 @@ class LLMClient:
             return url
 
     # --- Logging + HTTP helper ---
+    # O registo em http_log.txt é feito em segundo plano (data/http_log.py).
+    @staticmethod
+    def _log_exception(ts: str, error: BaseException) -> None:
+        get_http_log().log_exception(ts, error)
+
+    def _log_request(self, ts: str, req: urllib.request.Request, body: Optional[bytes]) -> None:
+        """Log the request and capture it (redacted) as the last exchange."""
+        req_headers = dict(req.headers) if hasattr(req, 'headers') else {}
+        req_body_str = body.decode('utf-8', errors='replace') if body else ""
+
+        # Capture last exchange for UI (redacted).
+        try:
+            self.last_http_exchange = {
+                'timestamp': ts,
+                'request': {
+                    'url': self._redact_url(getattr(req, 'full_url', getattr(req, 'url', ''))),
+                    'method': getattr(req, 'method', 'POST' if body is not None else 'GET'),
+                    'headers': self._redact_headers(req_headers),
+                    'body': req_body_str,
+                },
+                'response': None,
+            }
+        except Exception:
+            self.last_http_exchange = None
+        get_http_log().log_request(
+            ts,
+            getattr(req, 'method', 'POST' if body is not None else 'GET'),
+            getattr(req, 'full_url', getattr(req, 'url', '')),
+            req_headers, body)
+
+    def _record_response(self, status: int, headers: dict) -> None:
+        try:
+            if isinstance(self.last_http_exchange, dict):
+                self.last_http_exchange['response'] = {
+                    'status': status,
+                    'headers': self._redact_headers(headers),
+                }
+        except Exception:
+            pass
+
+    @staticmethod
+    def _log_response(ts: str, status: int, headers: dict, body: bytes) -> None:
+        get_http_log().log_response(ts, status, headers, body)
+
+    def _http_error(self, ts: str, status: int, err_headers: dict, err_body: bytes) -> LLMError:
+        """Log an HTTP error response and build the matching LLMError."""
+        err_body_str = err_body.decode('utf-8', errors='replace')
+        self._record_response(status, err_headers)
+        get_http_log().log_response(ts, status, err_headers, err_body, kind="ERROR")
+
+        # Avoid dumping very large HTML error pages into the UI; full body remains in http_log.txt.
+        preview = err_body_str
+        if len(preview) > 800:
+            preview = preview[:800] + "..."
+
+        lower_body = err_body_str.lower()
+        if status == 401 and ("cloudflare" in lower_body or "authorization required" in lower_body):
+            preview = (
+                "401 Authorization Required (Perplexity). "
+                "Verifica a API key e se o teu utilizador está associado a um API Group. "
+                "Detalhes completos em http_log.txt.\n\n" + preview
+            )
+
+        return LLMError(f"HTTP {status}: {preview}", status_code=status, headers=err_headers,
+                        body=err_body_str)
+
+    def _record_metrics(self, req: urllib.request.Request, started: float, connect_time: float,
+                        ttfb: float, size: int,
+                        usage: Tuple[Optional[int], Optional[int]] = (None, None),
+                        ok: bool = True) -> None:
+        """Regista o pedido em llm_metrics (só gerações: as listas de modelos são GET).
+
+        Com GIFTTEST_LLM_ENDPOINT (mock) nada é registado: os tempos não seriam do provider."""
+        if req.get_method() == "POST" and not os.environ.get(LLM_ENDPOINT_ENV):
+            record_request(self.provider, self.model or "(padrão)", connect_time, ttfb,
+                           time.perf_counter() - started, size, usage, ok)
+
+    @staticmethod
+    def _send_headers(req: urllib.request.Request) -> dict:
+        headers = dict(req.header_items())
+        headers.setdefault('User-Agent', _USER_AGENT)
+        return headers
+
+    # --- Tempos limite, novas tentativas e circuit breaker (data/provider_health.py) ---
+    def _timeouts(self, stream: bool, timeout: Optional[float] = None) -> Tuple[float, float]:
+        """(ligação, leitura); timeout (ou read_timeout), se indicado, substitui a leitura."""
+        health = get_provider_health(self.provider)
+        connect, read = health.timeouts(stream, self.max_tokens / DEFAULT_LLM_MAX_TOKENS)
+        if timeout is None:
+            timeout = self.read_timeout
+        return connect, read if timeout is None else timeout
+
+    def _check_circuit(self, health: ProviderHealth, error: Optional[Exception] = None) -> None:
+        """Falha de imediato se o provider está em baixo (com o último erro, se houver)."""
+        wait = health.check()
+        if wait is None:
+            return
+        if error is not None:
+            raise error
+        raise LLMError(f"{self.provider} indisponível (várias falhas seguidas); "
+                       f"nova tentativa dentro de {wait:.0f}s.")
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Espera antes de repetir um pedido que falhou com error (None: não repetir)."""
+        if isinstance(error, LLMError):
+            # Um modelo Hugging Face a carregar tem espera própria (_model_loading_delay).
+            retryable = (error.status_code in RETRYABLE_STATUS
+                         and model_loading_time(error.status_code, error.body) is None)
+        else:
+            retryable = is_retryable_error(error)
+        if not retryable or attempt >= self.max_retries:
+            return None
+        delay = backoff_delay(attempt)
+        # Um Retry-After longo (quota esgotada) não é esperado: o erro segue para quem chamou.
+        if get_rate_limiter(self.provider).snapshot()["blocked_for"] + delay > LLM_RETRY_MAX_WAIT:
+            return None
+        return delay
+
+    def _with_retries(self, health: ProviderHealth, send: Callable):
+        """send(), repetido nos erros transitórios com espera exponencial (jitter)."""
+        error = None
+        for attempt in itertools.count():
+            self._check_circuit(health, error)
+            try:
+                return send()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                error = e
+            except BaseException:
+                health.record_cancelled()
+                raise
+            try:
+                self._sleep(delay)
+            except RequestCancelled:
+                health.record_cancelled()
+                raise
+
+    def _sleep(self, delay: float) -> None:
+        """Espera delay segundos; sai com RequestCancelled se o cancel_token for cancelado."""
+        if self.cancel_token is None:
+            time.sleep(delay)
+        elif self.cancel_token.wait(delay):
+            raise RequestCancelled()
+
+    @staticmethod
+    def _record_status(health: ProviderHealth, status: int, body: bytes = b"") -> None:
+        # 5xx: o provider está com problemas; 4xx ou um modelo a carregar: respondeu, está
+        # disponível.
+        if status >= 500 and model_loading_time(status, body) is None:
+            health.record_failure()
+        else:
+            health.record_success()
+
     def _http_request(
             self, req: urllib.request.Request,
             body: Optional[bytes] = None,
-            timeout: int = 60) -> Tuple[int, dict, bytes]:
+            timeout: Optional[float] = None) -> Tuple[int, dict, bytes]:
         """Perform HTTP request with detailed logging.
 
         Returns (status, headers, body_bytes).
         Logs request method, URL, headers, payload size and response
-        details to http_log.txt.
+        details to http_log.txt. timeout limits each read (default: adaptive,
+        from the provider's observed latency); transient errors are retried.
         """
+        health = get_provider_health(self.provider)
+        connect_timeout, timeout = self._timeouts(False, timeout)
+        return self._with_retries(
+            health, lambda: self._http_request_once(req, body, timeout, connect_timeout, health))
+
+    def _http_request_once(
+            self, req: urllib.request.Request, body: Optional[bytes], timeout: float,
+            connect_timeout: float, health: ProviderHealth) -> Tuple[int, dict, bytes]:
+        # Espera pela vez no ritmo do provider (Retry-After / x-ratelimit-*).
+        limiter = get_rate_limiter(self.provider)
+        reservation = limiter.acquire(estimate_tokens(req.data), self.cancel_token)
         ts = datetime.datetime.utcnow().isoformat() + "Z"
+        started = time.perf_counter()
         try:
-            # Request log
-            req_headers = dict(req.headers) if hasattr(req, 'headers') else {}
-            req_body_str = body.decode('utf-8', errors='replace') if body else ""
+            self._log_request(ts, req, body)
 
-            # Capture last exchange for UI (redacted).
+            # Execute (ligação persistente partilhada: sem DNS/TCP/TLS por pedido)
+            status, resp_headers = None, None
             try:
-                self.last_http_exchange = {
-                    'timestamp': ts,
-                    'request': {
-                        'url': self._redact_url(getattr(req, 'full_url', getattr(req, 'url', ''))),
-                        'method': getattr(req, 'method', 'POST' if body is not None else 'GET'),
-                        'headers': self._redact_headers(req_headers),
-                        'body': req_body_str,
-                    },
-                    'response': None,
-                }
-            except Exception:
-                self.last_http_exchange = None
-            log_req = [
-                f"[{ts}] REQUEST",
-                f"URL: {getattr(req, 'full_url', getattr(req, 'url', ''))}",
-                f"Method: {getattr(req, 'method', 'POST' if body is not None else 'GET')}",
-                f"Headers: {json.dumps(req_headers)}",
-                f"BodyLen: {0 if body is None else len(body)}",
-                f"Body: {req_body_str}",
-            ]
-            with self._log_file.open('a', encoding='utf-8') as f:
-                f.write("\n".join(log_req) + "\n")
-
-            # Execute
-            with urllib.request.urlopen(req, timeout=timeout) as resp:
-                resp_body = resp.read()
-                status = getattr(resp, 'status', getattr(resp, 'code', 0))
-                resp_headers = dict(resp.headers.items()) if hasattr(resp, 'headers') else {}
-
-            try:
-                if isinstance(self.last_http_exchange, dict):
-                    self.last_http_exchange['response'] = {
-                        'status': status,
-                        'headers': self._redact_headers(resp_headers),
-                    }
-            except Exception:
-                pass
-
-            # Response log
-            resp_body_str = resp_body.decode('utf-8', errors='replace')
-            log_resp = [
-                f"[{ts}] RESPONSE",
-                f"Status: {status}",
-                f"Headers: {json.dumps(resp_headers)}",
-                f"BodyLen: {len(resp_body)}",
-                f"Body: {resp_body_str}",
-            ]
-            with self._log_file.open('a', encoding='utf-8') as f:
-                f.write("\n".join(log_resp) + "\n\n")
-
+                resp = get_pool().urlopen(
+                    req.get_method(), target_url(req.full_url),
+                    body=req.data, headers=self._send_headers(req), timeout=timeout,
+                    cancel_token=self.cancel_token, connect_timeout=connect_timeout)
+                status, resp_headers = resp.status, resp.headers
+                ttfb = time.perf_counter() - started
+                try:
+                    resp_body = resp.read()
+                except BaseException:
+                    resp.abort()
+                    raise
+            finally:
+                limiter.release(reservation, status, resp_headers)
+            if status >= 400:
+                self._record_metrics(req, started, resp.connect_time, ttfb, len(resp_body),
+                                    ok=False)
+                self._record_status(health, status, resp_body)
+                raise self._http_error(ts, status, resp_headers, resp_body)
+
+            health.record_success(ttfb, resp.connect_time)
+            self._record_metrics(req, started, resp.connect_time, ttfb, len(resp_body),
+                                body_usage(resp_body))
+            self._record_response(status, resp_headers)
+            self._log_response(ts, status, resp_headers, resp_body)
             return status, resp_headers, resp_body
-        except urllib.error.HTTPError as e:
-            # Read error body
-            try:
-                err_body = e.read() or b""
-            except Exception:
-                err_body = b""
-            status = getattr(e, 'code', 0)
-            err_headers = dict(getattr(e, 'headers', {}).items()) if getattr(e, 'headers', None) else {}
-            err_body_str = err_body.decode('utf-8', errors='replace')
+        except LLMError:
+            raise
+        except Exception as e:
+            health.record_failure()
+            self._record_metrics(req, started, 0.0, 0.0, 0, ok=False)
+            self._log_exception(ts, e)
+            raise
 
+    def _open_stream(
+            self, req: urllib.request.Request, body: Optional[bytes], timeout: float,
+            connect_timeout: float, health: ProviderHealth):
+        """Envia o pedido de streaming; devolve (ts, início, resposta, TTFB) com estado < 400."""
+        limiter = get_rate_limiter(self.provider)
+        reservation = limiter.acquire(estimate_tokens(req.data), self.cancel_token)
+        ts = datetime.datetime.utcnow().isoformat() + "Z"
+        started = time.perf_counter()
+        resp = None
+        try:
+            self._log_request(ts, req, body)
+            resp = get_pool().urlopen(
+                req.get_method(), target_url(req.full_url),
+                body=req.data, headers=self._send_headers(req), timeout=timeout,
+                cancel_token=self.cancel_token, connect_timeout=connect_timeout)
+        except Exception as e:
+            health.record_failure()
+            self._record_metrics(req, started, 0.0, 0.0, 0, ok=False)
+            self._log_exception(ts, e)
+            raise
+        finally:
+            limiter.release(reservation, resp and resp.status, resp and resp.headers)
+        ttfb = time.perf_counter() - started
+        if resp.status >= 400:
             try:
-                if isinstance(self.last_http_exchange, dict):
-                    self.last_http_exchange['response'] = {
-                        'status': status,
-                        'headers': self._redact_headers(err_headers),
-                    }
-            except Exception:
-                pass
-            log_err = [
-                f"[{ts}] ERROR",
-                f"Status: {status}",
-                f"Headers: {json.dumps(err_headers)}",
-                f"BodyLen: {len(err_body)}",
-                f"Body: {err_body_str}",
-            ]
-            with self._log_file.open('a', encoding='utf-8') as f:
-                f.write("\n".join(log_err) + "\n\n")
-
-            # Avoid dumping very large HTML error pages into the UI; full body remains in http_log.txt.
-            preview = err_body_str
-            if len(preview) > 800:
-                preview = preview[:800] + "..."
-
-            if status == 401 and ("cloudflare" in err_body_str.lower() or "authorization required" in err_body_str.lower()):
-                preview = (
-                    "401 Authorization Required (Perplexity). "
-                    "Verifica a API key e se o teu utilizador está associado a um API Group. "
-                    "Detalhes completos em http_log.txt.\n\n" + preview
-                )
-
-            raise LLMError(f"HTTP {status}: {preview}", status_code=status, headers=err_headers, body=err_body_str)
+                err_body = resp.read()
+            except BaseException:
+                resp.abort()
+                raise
+            self._record_metrics(req, started, resp.connect_time, ttfb, len(err_body), ok=False)
+            self._record_status(health, resp.status, err_body)
+            raise self._http_error(ts, resp.status, resp.headers, err_body)
+        health.record_success(ttfb, resp.connect_time, stream=True)
+        self._record_response(resp.status, resp.headers)
+        return ts, started, resp, ttfb
+
+    def _http_stream(
+            self, req: urllib.request.Request,
+            body: Optional[bytes] = None,
+            timeout: Optional[float] = None) -> Iterator[str]:
+        """Perform a Server-Sent Events request, yielding each event's data field.
+
+        Logging, timeouts and retries match _http_request (retries only happen
+        before the first event); the logged body is the raw event stream.
+        """
+        health = get_provider_health(self.provider)
+        connect_timeout, timeout = self._timeouts(True, timeout)
+        ts, started, resp, ttfb = self._with_retries(
+            health, lambda: self._open_stream(req, body, timeout, connect_timeout, health))
+
+        raw: List[bytes] = []
+        usage: Tuple[Optional[int], Optional[int]] = (None, None)
+        completed = False
+        try:
+            decoder = SSEDecoder()
+            while not decoder.done:
+                line = resp.readline()
+                if not line:
+                    break
+                raw.append(line)
+                data = decoder.feed(line.decode('utf-8', errors='replace'))
+                if data is not None:
+                    if '"usage' in data:
+                        usage = event_usage(data, usage)
+                    yield data
+            if decoder.done:
+                raw.append(resp.read())
+            else:
+                data = decoder.close()
+                if data is not None:
+                    if '"usage' in data:
+                        usage = event_usage(data, usage)
+                    yield data
+            completed = True
         except Exception as e:
-            log_exc = [f"[{ts}] EXCEPTION", str(e)]
-            with self._log_file.open('a', encoding='utf-8') as f:
-                f.write("\n".join(log_exc) + "\n\n")
+            health.record_failure()
+            self._record_metrics(req, started, resp.connect_time, ttfb, sum(map(len, raw)),
+                                ok=False)
+            self._log_exception(ts, e)
             raise
+        finally:
+            if completed:
+                resp.close()
+                self._record_metrics(req, started, resp.connect_time, ttfb, sum(map(len, raw)),
+                                    usage)
+                self._log_response(ts, resp.status, resp.headers, b"".join(raw))
+            else:
+                # Interrompido a meio: a ligação não pode voltar ao pool.
+                resp.abort()
 
     def _normalize_perplexity_model(self, model: str) -> str:
         """Normalize Perplexity model names to the current Sonar catalog.
@@ -223,241 +499,13 @@ class LLMClient:
             return "sonar-deep-research"
         return "sonar-pro"
 
-    # --- Listing models ---
-    def list_models(self) -> List[dict]:
-        """Returns list of dicts: {'id': str, 'description': str}."""
-        if self.provider == "groq":
-            return self._groq_list_models()
-        if self.provider == "huggingface":
-            return self._hf_list_models()
-        if self.provider == "gemini":
-            return self._gemini_list_models()
-        if self.provider == "mistral":
-            return self._mistral_list_models()
-        if self.provider == "perplexity":
-            return self._perplexity_list_models()
-        if self.provider == "openrouter":
-            return self._openrouter_list_models()
-        if self.provider == "cloudflare":
-            return self._cloudflare_list_models()
-        return []
-
-    def _groq_list_models(self) -> List[dict]:
-        url = f"{GROQ_BASE}/models"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Accept": "application/json",
-            "User-Agent": "GIFT-Practice/1.0 (+https://example.local)"
-        }
-        req = urllib.request.Request(url, headers=headers)
-        try:
-            status, resp_headers, resp_body = self._http_request(req, None, timeout=30)
-            data = json.loads(resp_body.decode("utf-8"))
-            models = []
-            for m in data.get("data", []):
-                if m.get("id"):
-                    models.append({
-                        'id': m.get("id"),
-                        'description': f"Owner: {m.get('owned_by', '?')}"
-                    })
-
-            # Fallback if API returns unexpected content
-            if not models:
-                fallback = [
-                    "llama-3.3-70b-versatile",
-                    "llama-3.1-70b-versatile",
-                    "llama-3.1-8b-instant",
-                    "mixtral-8x7b-32768",
-                    "gemma2-9b-it",
-                ]
-                models = [{'id': m, 'description': 'Fallback default'} for m in fallback]
-            return models
-        except urllib.error.HTTPError as e:
-            try:
-                err_body = e.read().decode("utf-8")
-            except Exception:
-                err_body = str(e)
-            raise LLMError(f"Groq /models falhou ({e.code}): {err_body}")
-        except Exception as e:
-            raise LLMError(f"Falha ao obter modelos Groq: {e}")
-
-    def _hf_list_models(self) -> List[dict]:
-        req = urllib.request.Request(HF_MODELS_LIST, headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {})
-        try:
-            _, _, resp_body = self._http_request(req, None, timeout=30)
-            data = json.loads(resp_body.decode("utf-8"))
-            models = []
-            for m in data:
-                if m.get("pipeline_tag") == "text-generation" or True:
-                    desc = f"Downloads: {m.get('downloads', 0)} | Likes: {m.get('likes', 0)}"
-                    models.append({'id': m.get("modelId"), 'description': desc})
-            return models
-        except Exception as e:
-            raise LLMError(f"Falha ao obter modelos HuggingFace: {e}")
-
-    def _gemini_list_models(self) -> List[dict]:
-        if not self.api_key:
-            # Public listing might require key; return common defaults
-            return [{'id': "gemini-1.5-flash", 'description': 'Fast and versatile'},
-                    {'id': "gemini-1.5-pro", 'description': 'High performance'}]
-        url = f"{GEMINI_LIST}?key={urllib.parse.quote(self.api_key)}"
-        req = urllib.request.Request(url)
-        try:
-            _, _, resp_body = self._http_request(req, None, timeout=30)
-            data = json.loads(resp_body.decode("utf-8"))
-            models = []
-            for m in data.get("models", []):
-                if "generateContent" in m.get("supportedGenerationMethods", []):
-                    models.append({
-                        'id': m.get("name", ""),
-                        'description': m.get("description", "")
-                    })
-            # Fallback to known working models if none found
-            if not models:
-                models = [
-                    {'id': "gemini-1.5-flash", 'description': 'Fast and versatile'},
-                    {'id': "gemini-1.5-pro", 'description': 'High performance'}
-                ]
-            return models
-        except Exception as e:
-            # Return fallback models on error
-            return [
-                {'id': "gemini-1.5-flash", 'description': 'Fast and versatile'},
-                {'id': "gemini-1.5-pro", 'description': 'High performance'}
-            ]
-
-    def _mistral_list_models(self) -> List[dict]:
-        """List available Mistral models via API."""
-        fallback = [
-            "mistral-large-latest", "mistral-medium-latest",
-            "mistral-small-latest", "codestral-latest", "open-mixtral-8x7b"
-        ]
-        fallback_dicts = [
-            {'id': m, 'description': 'Mistral Model'} for m in fallback
-        ]
-
-        if not self.api_key:
-            return fallback_dicts
-        url = "https://api.mistral.ai/v1/models"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Accept": "application/json",
-            "User-Agent": "GIFT-Practice/1.0"
-        }
-        req = urllib.request.Request(url, headers=headers)
-        try:
-            _, _, resp_body = self._http_request(req, None, timeout=30)
-            data = json.loads(resp_body.decode("utf-8"))
-            models = []
-            for m in data.get("data", []):
-                if m.get("id"):
-                    models.append({'id': m.get("id"), 'description': f"Owned by {m.get('owned_by', '?')}"})
-            return models if models else fallback_dicts
-        except Exception:
-            return fallback_dicts
-
-    def _perplexity_list_models(self) -> List[dict]:
-        """Return curated list of Perplexity models (no public API endpoint)."""
-        # Perplexity does not provide a public model listing endpoint.
-        # Keep this list aligned with the official API reference.
-        models = [
-            "sonar",
-            "sonar-pro",
-            "sonar-deep-research",
-            "sonar-reasoning-pro",
-        ]
-        return [{'id': m, 'description': 'Perplexity Sonar Model'} for m in models]
-
-    def _openrouter_list_models(self) -> List[dict]:
-        """List available OpenRouter models (public endpoint)."""
-        fallback = [
-            "meta-llama/llama-3.1-8b-instruct",
-            "mistralai/mixtral-8x7b-instruct",
-            "google/gemma-2-9b-it"
-        ]
-        fallback_dicts = [{'id': m, 'description': 'OpenRouter Model'} for m in fallback]
-
-        url = "https://openrouter.ai/api/v1/models"
-        headers = {
-            "Accept": "application/json",
-            "User-Agent": "GIFT-Practice/1.0"
-        }
+    def _custom_headers(self, accept: str = "application/json") -> dict:
+        """Cabeçalhos do servidor "custom": API key opcional e cabeçalhos extra das preferências."""
+        headers = {"Accept": accept, "User-Agent": "GIFT-Practice/1.0"}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
-        req = urllib.request.Request(url, headers=headers)
-        try:
-            _, _, resp_body = self._http_request(req, None, timeout=30)
-            data = json.loads(resp_body.decode("utf-8"))
-            models = []
-            for m in data.get("data", []):
-                if m.get("id"):
-                    models.append({
-                        'id': m.get("id"),
-                        'description': m.get("description") or f"Context: {m.get('context_length', '?')}"
-                    })
-            # Limit to first 100 to avoid overwhelming the UI
-            return models[:100] if models else fallback_dicts
-        except Exception:
-            return fallback_dicts
-
-    def _cloudflare_list_models(self) -> List[dict]:
-        """List available Cloudflare Workers AI text generation models.
-
-        Uses the Cloudflare API if credentials are available (ACCOUNT_ID:API_TOKEN format).
-        """
-        fallback = [
-            "@cf/meta/llama-3-8b-instruct",
-            "@cf/meta/llama-3.1-8b-instruct",
-            "@cf/meta/llama-3.2-3b-instruct",
-            "@cf/mistral/mistral-7b-instruct-v0.1",
-            "@cf/microsoft/phi-2",
-            "@cf/qwen/qwen1.5-7b-chat-awq",
-            "@cf/google/gemma-7b-it-lora"
-        ]
-        fallback_dicts = [{'id': m, 'description': 'Cloudflare Model'} for m in fallback]
-
-        if not self.api_key or ":" not in self.api_key:
-            return fallback_dicts
-
-        # Parse ACCOUNT_ID:API_TOKEN
-        account_id, api_token = self.api_key.split(":", 1)
-        account_id = account_id.strip()
-        api_token = api_token.strip()
-
-        if not account_id or not api_token:
-            return fallback_dicts
-
-        # Fetch models from Cloudflare API
-        url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/models/search"
-        headers = {
-            "Authorization": f"Bearer {api_token}",
-            "Accept": "application/json",
-            "User-Agent": "GIFT-Practice/1.0"
-        }
-        req = urllib.request.Request(url, headers=headers)
-        try:
-            _, _, resp_body = self._http_request(req, None, timeout=30)
-            data = json.loads(resp_body.decode("utf-8"))
-
-            if not data.get("success", False):
-                return fallback_dicts
-
-            # Filter for text generation models
-            models = []
-            for m in data.get("result", []):
-                model_name = m.get("name", "")
-                task = m.get("task", {})
-                task_name = task.get("name", "") if isinstance(task, dict) else ""
-                # Include text generation models
-                if task_name in ("Text Generation", "Text-to-Text") or "instruct" in model_name.lower():
-                    models.append({
-                        'id': model_name,
-                        'description': m.get("description", "")
-                    })
-
-            return models if models else fallback_dicts
-        except Exception:
-            return fallback_dicts
+        headers.update(self.custom_endpoint["headers"])
+        return headers
 
     # --- Generation ---
     def generate(self, prompt: str) -> str:
@@ -469,13 +517,73 @@ class LLMClient:
             return self._hf_generate(prompt)
         if self.provider == "gemini":
             return self._gemini_generate(prompt)
-        if self.provider in {"mistral", "perplexity", "openrouter"}:
+        if self.provider in {"mistral", "perplexity", "openrouter", "custom"}:
             return self._generic_openai_chat(prompt)
         if self.provider == "cloudflare":
             return self._cloudflare_generate(prompt)
         raise LLMError(f"Provedor desconhecido: {self.provider}")
 
-    def _generic_openai_chat(self, prompt: str) -> str:
+    def generate_stream(self, prompt: str, on_chunk: Callable[[str], None]) -> str:
+        """Like generate(), but delivers text to on_chunk(delta) as it arrives.
+
+        Returns the full text. Providers without streaming support deliver
+        the whole answer as a single chunk.
+        """
+        if not prompt.strip():
+            raise LLMError("Prompt vazio.")
+        request = self._generation_request(prompt, stream=True)
+        if request is None:
+            text = self.generate(prompt)
+            on_chunk(text)
+            return text
+        req, extract = request
+
+        parts: List[str] = []
+        try:
+            for data in self._http_stream(req, req.data):
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+                piece = extract(event)
+                if piece:
+                    parts.append(piece)
+                    on_chunk(piece)
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(f"Falha na geração {self.provider}: {e}")
+        text = "".join(parts)
+        if not text:
+            raise LLMError(f"{self.provider} devolveu resposta sem texto.")
+        return text
+
+    def _generation_request(
+            self, prompt: str,
+            stream: bool = False) -> Optional[Tuple[urllib.request.Request, Callable]]:
+        """Build the generation request for the current provider.
+
+        Returns (request, parse): parse(data) extracts the text from the decoded
+        JSON response, or the text delta from one event when stream=True.
+        Returns None if the provider cannot stream.
+        """
+        if self.provider == "groq":
+            req, _ = self._groq_request(prompt, stream)
+            return req, (openai_delta if stream else groq_chat_text)
+        if self.provider in {"mistral", "perplexity", "openrouter", "custom"}:
+            return (self._generic_openai_request(prompt, stream),
+                    openai_delta if stream else openai_chat_text)
+        if self.provider == "gemini":
+            return (self._gemini_request(prompt, stream),
+                    gemini_text if stream else gemini_response_text)
+        if self.provider == "cloudflare":
+            return (self._cloudflare_request(prompt, stream),
+                    cloudflare_delta if stream else cloudflare_text)
+        if self.provider == "huggingface":
+            return None if stream else (self._hf_request(prompt), hf_text)
+        raise LLMError(f"Provedor desconhecido: {self.provider}")
+
+    def _generic_openai_request(self, prompt: str, stream: bool = False) -> urllib.request.Request:
         model = self.model
         if not model:
             models = self.list_models()
@@ -486,45 +594,56 @@ class LLMClient:
         if self.provider == "perplexity":
             model = self._normalize_perplexity_model(model)
 
-        if not self.api_key:
+        if self.provider == "custom":
+            if not self.custom_endpoint["base_url"]:
+                raise LLMError("URL do servidor em falta nas definições do provider custom.")
+        elif not self.api_key:
             raise LLMError(f"API key em falta para {self.provider}.")
         base_map = {
             "mistral": "https://api.mistral.ai/v1/chat/completions",
             "perplexity": "https://api.perplexity.ai/chat/completions",
             "openrouter": "https://openrouter.ai/api/v1/chat/completions",
+            "custom": self.custom_endpoint["base_url"] + self.custom_endpoint["path"],
         }
         url = base_map[self.provider]
         messages = [{"role": "user", "content": prompt}]
-        if self.provider == "perplexity" and self.system_prompt:
+        if self.provider in {"perplexity", "custom"} and self.system_prompt:
             messages.insert(0, {"role": "system", "content": self.system_prompt})
         payload = {
             "model": model,
             "messages": messages,
             "temperature": 0.2,
-            "max_tokens": 1024
+            "max_tokens": self.max_tokens
         }
+        if stream:
+            payload["stream"] = True
         body = json.dumps(payload).encode("utf-8")
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-            "Accept": "application/json",
-            "User-Agent": "GIFT-Practice/1.0"
-        }
-        req = urllib.request.Request(url, data=body, headers=headers)
+        accept = "text/event-stream" if stream else "application/json"
+        if self.provider == "custom":
+            headers = {"Content-Type": "application/json", **self._custom_headers(accept)}
+        else:
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}",
+                "Accept": accept,
+                "User-Agent": "GIFT-Practice/1.0"
+            }
+        return urllib.request.Request(url, data=body, headers=headers)
+
+    def _generic_openai_chat(self, prompt: str) -> str:
+        req = self._generic_openai_request(prompt)
         try:
-            _, _, resp_body = self._http_request(req, body, timeout=60)
-            data = json.loads(resp_body.decode("utf-8"))
-            msg = data.get("choices", [{}])[0].get("message", {}).get("content")
-            if not msg:
-                raise LLMError(f"Resposta sem conteúdo válido: {json.dumps(data)[:400]}")
-            return msg
+            _, _, resp_body = self._http_request(req, req.data)
+            return openai_chat_text(json.loads(resp_body.decode("utf-8")))
         except Exception as e:
             if isinstance(e, LLMError):
                 raise
             error_msg = f"Falha na geração {self.provider}: {e}"
             raise LLMError(error_msg)
 
-    def _groq_generate(self, prompt: str) -> str:
+    def _groq_request(self, prompt: str,
+                      stream: bool = False) -> Tuple[urllib.request.Request, str]:
+        """Build the chat/completions request. Returns (request, model)."""
         # Basic validation
         if not self.api_key:
             raise LLMError("Groq API key em falta nas definições.")
@@ -532,7 +651,7 @@ class LLMClient:
         model = (self.model or "").strip()
         if not model:
             try:
-                models = self._groq_list_models()
+                models = self.list_models()
                 if models:
                     first = models[0]
                     model = first['id'] if isinstance(first, dict) else first
@@ -547,23 +666,26 @@ class LLMClient:
                 {"role": "user", "content": prompt}
             ],
             "temperature": 0.2,
-            "max_tokens": 1024
+            "max_tokens": self.max_tokens
         }
+        if stream:
+            payload["stream"] = True
         body = json.dumps(payload).encode("utf-8")
         headers = {
             "Content-Type": "application/json",
-            "Accept": "application/json",
+            "Accept": "text/event-stream" if stream else "application/json",
             "Authorization": f"Bearer {self.api_key}",
             "User-Agent": "GIFT-Practice/1.0 (+https://example.local)"
         }
-        req = urllib.request.Request(url, data=body, headers=headers)
+        return urllib.request.Request(url, data=body, headers=headers), model
+
+    def _groq_generate(self, prompt: str) -> str:
+        req, model = self._groq_request(prompt)
+        url = req.full_url
+        headers = dict(req.header_items())
         try:
-            _, _, resp_body = self._http_request(req, body, timeout=60)
-            data = json.loads(resp_body.decode("utf-8"))
-            msg = data.get("choices", [{}])[0].get("message", {}).get("content")
-            if not msg:
-                raise LLMError(f"Groq respondeu sem conteúdo válido: {json.dumps(data)[:500]}")
-            return msg
+            _, _, resp_body = self._http_request(req, req.data)
+            return groq_chat_text(json.loads(resp_body.decode("utf-8")))
         except urllib.error.HTTPError as e:
             # Fallback to /completions if chat endpoint rejects payload (some deployments)
             try:
@@ -577,11 +699,11 @@ class LLMClient:
                         "model": model,
                         "prompt": prompt,
                         "temperature": 0.2,
-                        "max_tokens": 1024,
+                        "max_tokens": self.max_tokens,
                     }
                     body2 = json.dumps(payload2).encode("utf-8")
                     req2 = urllib.request.Request(url2, data=body2, headers=headers)
-                    _, _, resp_body2 = self._http_request(req2, body2, timeout=60)
+                    _, _, resp_body2 = self._http_request(req2, body2)
                     data2 = json.loads(resp_body2.decode("utf-8"))
                     text = data2.get("choices", [{}])[0].get("text")
                     if text:
@@ -600,93 +722,116 @@ class LLMClient:
             if not err_body:
                 err_body = "<corpo de erro vazio>"
             raise LLMError(f"Groq chat/completions falhou ({e.code}). {' | '.join(details)}\nResposta: {err_body}")
+        except LLMError:
+            raise
         except Exception as e:
             raise LLMError(f"Falha na geração Groq: {e}")
 
-    def _hf_generate(self, prompt: str) -> str:
-        model = (self.model or "meta-llama/Llama-3.1-8B-Instruct").strip()
+    # --- Hugging Face: modelos a carregar (data/hf_readiness.py) ---
+    def hf_model(self) -> str:
+        return (self.model or DEFAULT_MODELS['huggingface']).strip()
+
+    def _hf_initial_wait(self) -> float:
+        """Espera inicial se outro pedido já viu o modelo a carregar (0 sem wait_for_model)."""
+        if not self.wait_for_model:
+            return 0.0
+        return min(ready_in(self.hf_model()), HF_MODEL_LOAD_MAX_WAIT)
+
+    def _model_loading_delay(self, error: Exception, waited: float) -> Optional[float]:
+        """Espera até nova tentativa se error é um 503 "model is loading" do Hugging Face.
+
+        None se é outro erro. Sem wait_for_model, ou esgotados HF_MODEL_LOAD_MAX_WAIT
+        segundos, levanta um LLMError com a estimativa de carregamento.
+        """
+        if self.provider != "huggingface" or not isinstance(error, LLMError):
+            return None
+        estimated = model_loading_time(error.status_code, error.body)
+        if estimated is None:
+            return None
+        model = self.hf_model()
+        mark_loading(model, estimated)
+        remaining = HF_MODEL_LOAD_MAX_WAIT - waited
+        if not self.wait_for_model or remaining <= 0:
+            raise LLMError(
+                f"O modelo {model} ainda está a carregar no Hugging Face "
+                f"(faltam cerca de {estimated:.0f}s). "
+                f"Tenta de novo dentro de momentos.",
+                status_code=error.status_code, headers=error.headers, body=error.body)
+        return min(max(estimated, HF_LOADING_POLL_MIN), HF_LOADING_POLL_MAX, remaining)
+
+    def _hf_send(self, send: Callable):
+        """send(), repetido enquanto o modelo Hugging Face está a carregar."""
+        waited = self._hf_initial_wait()
+        if waited:
+            self._sleep(waited)
+        while True:
+            try:
+                result = send()
+            except LLMError as e:
+                delay = self._model_loading_delay(e, waited)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                waited += delay
+                continue
+            mark_warm(self.hf_model())
+            return result
+
+    def _hf_request(self, prompt: str) -> urllib.request.Request:
+        model = self.hf_model()
         if self.system_prompt:
             prompt = self.system_prompt + "\n\n" + prompt
         url = f"{HF_INFER_BASE}/{urllib.parse.quote(model)}"
         payload = {
             "inputs": prompt,
-            "parameters": {"max_new_tokens": 512, "return_full_text": False}
+            "parameters": {"max_new_tokens": self.max_tokens // 2, "return_full_text": False}
         }
         headers = {"Content-Type": "application/json"}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
         body = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=body, headers=headers)
+        return urllib.request.Request(url, data=body, headers=headers)
+
+    def _hf_generate(self, prompt: str) -> str:
+        req = self._hf_request(prompt)
         try:
-            _, _, resp_body = self._http_request(req, body, timeout=60)
-            data = json.loads(resp_body.decode("utf-8"))
-            # HF can return list or dict
-            if isinstance(data, list) and data:
-                item = data[0]
-                if isinstance(item, dict):
-                    return item.get("generated_text") or item.get("summary_text") or json.dumps(item)
-            if isinstance(data, dict):
-                return data.get("generated_text") or data.get("summary_text") or json.dumps(data)
-            return str(data)
+            _, _, resp_body = self._hf_send(lambda: self._http_request(req, req.data))
+            return hf_text(json.loads(resp_body.decode("utf-8")))
+        except LLMError:
+            raise
         except Exception as e:
             raise LLMError(f"Falha na geração HuggingFace: {e}")
 
-    def _gemini_generate(self, prompt: str) -> str:
+    def _gemini_request(self, prompt: str, stream: bool = False) -> urllib.request.Request:
         model = self.model or "gemini-1.5-flash"
         # Gemini endpoint expects raw model id (e.g., "gemini-1.5-flash"), template adds "models/".
         model_id = model.replace("models/", "")
-        url = GEMINI_GEN_TEMPLATE.format(model=urllib.parse.quote(model_id), key=urllib.parse.quote(self.api_key))
+        template = GEMINI_STREAM_TEMPLATE if stream else GEMINI_GEN_TEMPLATE
+        url = template.format(model=urllib.parse.quote(model_id),
+                              key=urllib.parse.quote(self.api_key))
         if self.system_prompt:
             prompt = self.system_prompt + "\n\n" + prompt
         payload = {
             "contents": [
                 {"role": "user", "parts": [{"text": prompt}]}
             ],
-            "generationConfig": {"temperature": 0.2, "maxOutputTokens": 1024}
+            "generationConfig": {"temperature": 0.2, "maxOutputTokens": self.max_tokens}
         }
         body = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        return urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+
+    def _gemini_generate(self, prompt: str) -> str:
+        req = self._gemini_request(prompt)
         try:
-            status, _, resp_body = self._http_request(req, body, timeout=60)
-            data = json.loads(resp_body.decode("utf-8"))
-            # Surface error details if present
-            err = data.get("error") if isinstance(data, dict) else None
-            if err:
-                code = err.get("code", status)
-                msg = err.get("message", "")
-                raise LLMError(f"Gemini erro ({code}): {msg}")
-            # Extract text from candidates
-            cands = data.get("candidates", [])
-            if cands and isinstance(cands, list):
-                content = cands[0].get("content", {})
-                parts = content.get("parts", [])
-                if parts and isinstance(parts, list):
-                    text_parts: list[str] = []
-                    for part in parts:
-                        if isinstance(part, dict):
-                            piece = part.get("text", "")
-                        elif isinstance(part, str):
-                            piece = part
-                        else:
-                            piece = ""
-                        if piece:
-                            text_parts.append(piece)
-                    text = "".join(text_parts)
-                    if text:
-                        return text
-                # Some Gemini payloads include `content.text` directly
-                fallback_text = content.get("text") if isinstance(content, dict) else None
-                if isinstance(fallback_text, str) and fallback_text.strip():
-                    return fallback_text
-            # If no text found, raise error with raw response preview
-            raise LLMError(f"Gemini devolveu resposta sem texto: {json.dumps(data)[:300]}")
+            _, _, resp_body = self._http_request(req, req.data)
+            return gemini_response_text(json.loads(resp_body.decode("utf-8")))
         except LLMError:
             raise
         except Exception as e:
             raise LLMError(f"Falha na geração Gemini: {e}")
 
-    def _cloudflare_generate(self, prompt: str) -> str:
-        """Generate text using Cloudflare Workers AI.
+    def _cloudflare_request(self, prompt: str, stream: bool = False) -> urllib.request.Request:
+        """Build a Cloudflare Workers AI run request.
 
         API key format: ACCOUNT_ID:API_TOKEN (separated by colon).
         """
@@ -712,29 +857,25 @@ class LLMClient:
                 {"role": "user", "content": prompt}
             ]
         }
+        if self.max_tokens != DEFAULT_LLM_MAX_TOKENS:
+            payload["max_tokens"] = self.max_tokens
+        if stream:
+            payload["stream"] = True
         body = json.dumps(payload).encode("utf-8")
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_token}",
-            "Accept": "application/json",
+            "Accept": "text/event-stream" if stream else "application/json",
             "User-Agent": "GIFT-Practice/1.0"
         }
-        req = urllib.request.Request(url, data=body, headers=headers)
+        return urllib.request.Request(url, data=body, headers=headers)
+
+    def _cloudflare_generate(self, prompt: str) -> str:
+        """Generate text using Cloudflare Workers AI."""
+        req = self._cloudflare_request(prompt)
         try:
-            _, _, resp_body = self._http_request(req, body, timeout=60)
-            data = json.loads(resp_body.decode("utf-8"))
-
-            # Cloudflare returns {success: bool, result: {response: "..."}, errors: [...]}
-            if not data.get("success", False):
-                errors = data.get("errors", [])
-                err_msg = errors[0].get("message", "Erro desconhecido") if errors else "Erro desconhecido"
-                raise LLMError(f"Cloudflare erro: {err_msg}")
-
-            result = data.get("result", {})
-            response = result.get("response", "")
-            if not response:
-                raise LLMError(f"Cloudflare devolveu resposta sem texto: {json.dumps(data)[:300]}")
-            return response
+            _, _, resp_body = self._http_request(req, req.data)
+            return cloudflare_text(json.loads(resp_body.decode("utf-8")))
         except LLMError:
             raise
         except Exception as e:
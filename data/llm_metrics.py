@@ -0,0 +1,157 @@
+"""
+Métricas dos pedidos de geração LLM, por provider e modelo.
+
+Cada pedido regista o tempo de ligação (0 numa ligação reutilizada), o tempo
+até aos cabeçalhos da resposta (TTFB), a latência total, o tamanho da resposta
+e os tokens indicados pelo provider (usage). Guardam-se as últimas
+LLM_METRICS_WINDOW amostras de cada modelo em llm_metrics.json (app data dir),
+gravado a cada LLM_METRICS_SAVE_EVERY pedidos e à saída. As Configurações
+mostram o resumo (get_model_stats): p50/p95 da latência e tokens/s.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from .app_paths import get_llm_metrics_path
+from .constants import LLM_METRICS_SAVE_EVERY, LLM_METRICS_WINDOW
+
+# Campos de cada amostra (lista compacta no JSON).
+_FIELDS = ("ts", "connect_ms", "ttfb_ms", "total_ms", "bytes", "prompt_tokens",
+           "completion_tokens", "ok")
+
+_lock = threading.Lock()
+_samples: Optional[Dict[str, deque]] = None  # "provider|modelo" -> amostras
+_unsaved = 0
+
+
+def extract_usage(data) -> Tuple[Optional[int], Optional[int]]:
+    """(tokens do prompt, tokens da resposta) de uma resposta ou evento JSON, se indicados."""
+    if not isinstance(data, dict):
+        return None, None
+    usage = data.get("usage") or (data.get("x_groq") or {}).get("usage")
+    if usage is None and isinstance(data.get("result"), dict):
+        usage = data["result"].get("usage")  # Cloudflare
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+    meta = data.get("usageMetadata")  # Gemini
+    if isinstance(meta, dict):
+        return meta.get("promptTokenCount"), meta.get("candidatesTokenCount")
+    return None, None
+
+
+def _key(provider: str, model: str) -> str:
+    return f"{provider}|{model}"
+
+
+def _load() -> Dict[str, deque]:
+    global _samples
+    if _samples is None:
+        try:
+            with get_llm_metrics_path().open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            models = data.get("models", {}) if isinstance(data, dict) else {}
+            _samples = {key: deque(rows, maxlen=LLM_METRICS_WINDOW) for key, rows in models.items()}
+        except (OSError, ValueError, TypeError):
+            _samples = {}
+    return _samples
+
+
+def save_metrics() -> None:
+    """Grava as amostras em llm_metrics.json (escrita atómica)."""
+    global _unsaved
+    with _lock:
+        if _samples is None:
+            return
+        models = {k: list(v) for k, v in _samples.items()}
+        payload = json.dumps({"fields": _FIELDS, "models": models}, separators=(",", ":"))
+        _unsaved = 0
+    path = get_llm_metrics_path()
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".llm_metrics-", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Métricas opcionais: ficam em memória até à próxima gravação.
+
+
+def _save_pending() -> None:
+    if _unsaved:
+        save_metrics()
+
+
+atexit.register(_save_pending)
+
+
+def record_request(provider: str, model: str, connect_time: float, ttfb: float, total: float,
+                   size: int, usage: Tuple[Optional[int], Optional[int]] = (None, None),
+                   ok: bool = True) -> None:
+    """Regista um pedido (tempos em segundos, size em bytes)."""
+    global _unsaved
+    row = [round(time.time()), round(connect_time * 1000, 1), round(ttfb * 1000, 1),
+           round(total * 1000, 1), size, usage[0], usage[1], 1 if ok else 0]
+    with _lock:
+        samples = _load()
+        key = _key(provider, model)
+        if key not in samples:
+            samples[key] = deque(maxlen=LLM_METRICS_WINDOW)
+        samples[key].append(row)
+        _unsaved += 1
+        due = _unsaved >= LLM_METRICS_SAVE_EVERY
+    if due:
+        save_metrics()
+
+
+def _percentile(values: List[float], pct: int) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+def get_model_stats() -> List[dict]:
+    """Resumo por modelo, do mais rápido (p50) para o mais lento.
+
+    Cada entrada: provider, model, requests, errors, p50_ms, p95_ms, ttfb_ms
+    (mediana), connect_ms (média das ligações novas) e tokens_per_s (tokens da
+    resposta por segundo de latência, só nos pedidos com usage)."""
+    with _lock:
+        snapshot = {key: list(rows) for key, rows in _load().items()}
+    stats = []
+    for key, rows in snapshot.items():
+        provider, _, model = key.partition("|")
+        ok_rows = [row for row in rows if row[7]]
+        totals = [row[3] for row in ok_rows]
+        connects = [row[1] for row in ok_rows if row[1]]
+        with_tokens = [row for row in ok_rows if row[6] and row[3] > 0]
+        token_time = sum(row[3] for row in with_tokens) / 1000
+        stats.append({
+            "provider": provider,
+            "model": model,
+            "requests": len(rows),
+            "errors": len(rows) - len(ok_rows),
+            "p50_ms": _percentile(totals, 50),
+            "p95_ms": _percentile(totals, 95),
+            "ttfb_ms": _percentile([row[2] for row in ok_rows], 50),
+            "connect_ms": statistics.fmean(connects) if connects else None,
+            "tokens_per_s": sum(row[6] for row in with_tokens) / token_time if token_time else None,
+        })
+    stats.sort(key=lambda s: (s["p50_ms"] is None, s["p50_ms"] or 0))
+    return stats
+
+
+def clear_metrics() -> None:
+    global _samples
+    with _lock:
+        _samples = {}
+    save_metrics()
@@ -0,0 +1,232 @@
+"""
+Listas de modelos dos providers LLM.
+
+ModelListsMixin junta ao LLMClient (data/llm_client.py) list_models() e os
+pedidos de listagem de cada provider; usa o _http_request do cliente, com as
+mesmas novas tentativas, registo HTTP e circuit breaker da geração.
+
+Os pedidos de listagem levantam LLMError quando falham; as listas de recurso de
+FALLBACK_MODELS são então devolvidas por get_models() sem ficarem na cache,
+exceto num refresh forçado e na Groq, que só as usa quando a lista vem vazia.
+"""
+
+import json
+import urllib.parse
+import urllib.request
+from typing import List
+
+from .constants import GEMINI_LIST, GROQ_BASE, HF_MODELS_LIST, LLM_LIST_TIMEOUT
+from .llm_responses import LLMError
+from .model_catalog import get_models
+
+# Modelos conhecidos, usados quando a listagem vem vazia ou falha fora de um refresh forçado.
+FALLBACK_MODELS = {
+    "groq": [{'id': m, 'description': 'Fallback default'} for m in (
+        "llama-3.3-70b-versatile", "llama-3.1-70b-versatile", "llama-3.1-8b-instant",
+        "mixtral-8x7b-32768", "gemma2-9b-it")],
+    "gemini": [{'id': "gemini-1.5-flash", 'description': 'Fast and versatile'},
+               {'id': "gemini-1.5-pro", 'description': 'High performance'}],
+    "mistral": [{'id': m, 'description': 'Mistral Model'} for m in (
+        "mistral-large-latest", "mistral-medium-latest", "mistral-small-latest",
+        "codestral-latest", "open-mixtral-8x7b")],
+    "openrouter": [{'id': m, 'description': 'OpenRouter Model'} for m in (
+        "meta-llama/llama-3.1-8b-instruct", "mistralai/mixtral-8x7b-instruct",
+        "google/gemma-2-9b-it")],
+    "cloudflare": [{'id': m, 'description': 'Cloudflare Model'} for m in (
+        "@cf/meta/llama-3-8b-instruct", "@cf/meta/llama-3.1-8b-instruct",
+        "@cf/meta/llama-3.2-3b-instruct", "@cf/mistral/mistral-7b-instruct-v0.1",
+        "@cf/microsoft/phi-2", "@cf/qwen/qwen1.5-7b-chat-awq", "@cf/google/gemma-7b-it-lora")],
+}
+
+
+class ModelListsMixin:
+    """list_models() do LLMClient (usa provider, api_key, custom_endpoint e _http_request)."""
+
+    def list_models(self, refresh: bool = False) -> List[dict]:
+        """Returns list of dicts: {'id': str, 'description': str}.
+
+        Served from the persistent model catalog cache; refresh=True forces a
+        network fetch (stale entries are otherwise refreshed in the background).
+        """
+        key = self.api_key
+        if self.provider == "custom":
+            # Cada servidor tem os seus modelos.
+            key = f"{self.custom_endpoint['base_url']}|{key}"
+        # A Groq mostra o erro da listagem (p.ex. key inválida) em vez dos modelos de recurso.
+        return get_models(self.provider, key, self._fetch_models, force_refresh=refresh,
+                          fallback=FALLBACK_MODELS.get(self.provider),
+                          fallback_on_error=self.provider != "groq")
+
+    def _fetch_models(self) -> List[dict]:
+        """Modelos do provider ([] sem credenciais para os listar); LLMError se o pedido falhar."""
+        if self.provider == "groq":
+            return self._groq_list_models()
+        if self.provider == "huggingface":
+            return self._hf_list_models()
+        if self.provider == "gemini":
+            return self._gemini_list_models()
+        if self.provider == "mistral":
+            return self._mistral_list_models()
+        if self.provider == "perplexity":
+            return self._perplexity_list_models()
+        if self.provider == "openrouter":
+            return self._openrouter_list_models()
+        if self.provider == "cloudflare":
+            return self._cloudflare_list_models()
+        if self.provider == "custom":
+            return self._custom_list_models()
+        return []
+
+    def _get_json(self, req: urllib.request.Request, label: str):
+        """Resposta JSON de um pedido de listagem; LLMError se falhar."""
+        try:
+            _, _, resp_body = self._http_request(req, None, timeout=LLM_LIST_TIMEOUT)
+            return json.loads(resp_body.decode("utf-8"))
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(f"Falha ao obter modelos {label}: {e}")
+
+    def _groq_list_models(self) -> List[dict]:
+        url = f"{GROQ_BASE}/models"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Accept": "application/json",
+            "User-Agent": "GIFT-Practice/1.0 (+https://example.local)"
+        }
+        req = urllib.request.Request(url, headers=headers)
+        data = self._get_json(req, "Groq")
+        models = []
+        for m in data.get("data", []):
+            if m.get("id"):
+                models.append({
+                    'id': m.get("id"),
+                    'description': f"Owner: {m.get('owned_by', '?')}"
+                })
+        return models
+
+    def _hf_list_models(self) -> List[dict]:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        req = urllib.request.Request(HF_MODELS_LIST, headers=headers)
+        data = self._get_json(req, "HuggingFace")
+        models = []
+        for m in data:
+            if m.get("pipeline_tag") == "text-generation" or True:
+                desc = f"Downloads: {m.get('downloads', 0)} | Likes: {m.get('likes', 0)}"
+                models.append({'id': m.get("modelId"), 'description': desc})
+        return models
+
+    def _gemini_list_models(self) -> List[dict]:
+        if not self.api_key:
+            # Public listing might require key; use the fallback defaults
+            return []
+        url = f"{GEMINI_LIST}?key={urllib.parse.quote(self.api_key)}"
+        data = self._get_json(urllib.request.Request(url), "Gemini")
+        models = []
+        for m in data.get("models", []):
+            if "generateContent" in m.get("supportedGenerationMethods", []):
+                models.append({
+                    'id': m.get("name", ""),
+                    'description': m.get("description", "")
+                })
+        return models
+
+    def _mistral_list_models(self) -> List[dict]:
+        """List available Mistral models via API."""
+        if not self.api_key:
+            return []
+        url = "https://api.mistral.ai/v1/models"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Accept": "application/json",
+            "User-Agent": "GIFT-Practice/1.0"
+        }
+        data = self._get_json(urllib.request.Request(url, headers=headers), "Mistral")
+        return [{'id': m.get("id"), 'description': f"Owned by {m.get('owned_by', '?')}"}
+                for m in data.get("data", []) if m.get("id")]
+
+    def _perplexity_list_models(self) -> List[dict]:
+        """Return curated list of Perplexity models (no public API endpoint)."""
+        # Perplexity does not provide a public model listing endpoint.
+        # Keep this list aligned with the official API reference.
+        models = [
+            "sonar",
+            "sonar-pro",
+            "sonar-deep-research",
+            "sonar-reasoning-pro",
+        ]
+        return [{'id': m, 'description': 'Perplexity Sonar Model'} for m in models]
+
+    def _openrouter_list_models(self) -> List[dict]:
+        """List available OpenRouter models (public endpoint)."""
+        url = "https://openrouter.ai/api/v1/models"
+        headers = {
+            "Accept": "application/json",
+            "User-Agent": "GIFT-Practice/1.0"
+        }
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        data = self._get_json(urllib.request.Request(url, headers=headers), "OpenRouter")
+        models = []
+        for m in data.get("data", []):
+            if m.get("id"):
+                models.append({
+                    'id': m.get("id"),
+                    'description': (m.get("description")
+                                    or f"Context: {m.get('context_length', '?')}")
+                })
+        # Limit to first 100 to avoid overwhelming the UI
+        return models[:100]
+
+    def _custom_list_models(self) -> List[dict]:
+        """List the models served by the custom endpoint (GET {base_url}/models)."""
+        base_url = self.custom_endpoint["base_url"]
+        if not base_url:
+            return []
+        req = urllib.request.Request(f"{base_url}/models", headers=self._custom_headers())
+        data = self._get_json(req, "custom")
+        entries = data.get("data", []) if isinstance(data, dict) else []
+        return [{'id': m["id"], 'description': f"Owned by {m.get('owned_by', '?')}"}
+                for m in entries if isinstance(m, dict) and m.get("id")]
+
+    def _cloudflare_list_models(self) -> List[dict]:
+        """List available Cloudflare Workers AI text generation models.
+
+        Uses the Cloudflare API if credentials are available (ACCOUNT_ID:API_TOKEN format).
+        """
+        if not self.api_key or ":" not in self.api_key:
+            return []
+
+        # Parse ACCOUNT_ID:API_TOKEN
+        account_id, api_token = self.api_key.split(":", 1)
+        account_id = account_id.strip()
+        api_token = api_token.strip()
+
+        if not account_id or not api_token:
+            return []
+
+        # Fetch models from Cloudflare API
+        url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/models/search"
+        headers = {
+            "Authorization": f"Bearer {api_token}",
+            "Accept": "application/json",
+            "User-Agent": "GIFT-Practice/1.0"
+        }
+        data = self._get_json(urllib.request.Request(url, headers=headers), "Cloudflare")
+        if not data.get("success", False):
+            errors = data.get('errors') or 'success=false'
+            raise LLMError(f"Falha ao obter modelos Cloudflare: {errors}")
+
+        # Filter for text generation models
+        models = []
+        for m in data.get("result", []):
+            model_name = m.get("name", "")
+            task = m.get("task", {})
+            task_name = task.get("name", "") if isinstance(task, dict) else ""
+            # Include text generation models
+            if task_name in ("Text Generation", "Text-to-Text") or "instruct" in model_name.lower():
+                models.append({
+                    'id': model_name,
+                    'description': m.get("description", "")
+                })
+        return models
@@ -0,0 +1,166 @@
+"""
+Pedidos com hedging e failover entre providers LLM.
+
+RacingLLMClient envia o pedido ao provider principal; se não chegar o primeiro
+byte dentro do orçamento de latência (hedge_delay), envia o mesmo pedido ao
+seguinte da lista. O primeiro a responder ganha e os outros são cancelados
+(o socket é fechado). Um erro antes do primeiro byte passa de imediato ao
+provider seguinte (failover), pela ordem configurada: só o último repete os
+erros transitórios.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Callable, List, Optional
+
+from .constants import DEFAULT_HEDGE_DELAY_MS
+from .llm_async import AsyncLLMClient, LLMAnswer
+from .llm_client import LLMError
+
+
+class RacingLLMClient:
+    """Mesma superfície que AsyncLLMClient, sobre uma lista ordenada de clientes."""
+
+    def __init__(self, clients: List[AsyncLLMClient],
+                 hedge_delay: float = DEFAULT_HEDGE_DELAY_MS / 1000):
+        if not clients:
+            raise ValueError("RacingLLMClient precisa de pelo menos um cliente")
+        self.clients = list(clients)
+        self.hedge_delay = hedge_delay
+        for client in self.clients[:-1]:
+            client.max_retries = 0  # O failover substitui as novas tentativas.
+
+    # Configuração do provider principal; quem respondeu a cada pedido vem no LLMAnswer.
+    provider = property(lambda self: self.clients[0].provider)
+    model = property(lambda self: self.clients[0].model)
+    system_prompt = property(lambda self: self.clients[0].system_prompt)
+
+    @property
+    def max_tokens(self) -> int:
+        return self.clients[0].max_tokens
+
+    @max_tokens.setter
+    def max_tokens(self, value: int) -> None:
+        for client in self.clients:
+            client.max_tokens = value
+
+    async def list_models(self, refresh: bool = False) -> List[dict]:
+        return await self.clients[0].list_models(refresh)
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        return (await self.generate_answer(prompt, None, timeout)).text
+
+    async def generate_stream(self, prompt: str, on_chunk: Callable[[str], None],
+                              timeout: Optional[float] = None) -> str:
+        return (await self.generate_answer(prompt, on_chunk, timeout)).text
+
+    async def generate_answer(self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None,
+                              timeout: Optional[float] = None) -> LLMAnswer:
+        """Resposta do primeiro cliente a responder (o vencedor é só deste pedido)."""
+        winner: Optional[AsyncLLMClient] = None
+        pending: dict = {}  # task -> cliente
+        errors: List[tuple] = []
+        next_index = 0
+
+        def make_on_chunk(client):
+            def deliver(delta):
+                nonlocal winner
+                if winner is None:
+                    # Primeiro byte: este cliente ganha; os restantes são cancelados.
+                    winner = client
+                    for task, other in pending.items():
+                        if other is not client:
+                            task.cancel()
+                if winner is client and on_chunk is not None:
+                    on_chunk(delta)
+            return deliver
+
+        def launch():
+            nonlocal next_index
+            client = self.clients[next_index]
+            next_index += 1
+            task = asyncio.ensure_future(
+                client.generate_answer(prompt, make_on_chunk(client), timeout))
+            pending[task] = client
+
+        launch()
+        try:
+            while True:
+                # Só há hedge enquanto ninguém respondeu e apenas um pedido está em curso.
+                hedge = winner is None and len(pending) == 1 and next_index < len(self.clients)
+                done, _ = await asyncio.wait(
+                    set(pending), timeout=self.hedge_delay if hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if winner is None:
+                        launch()
+                    continue
+                for task in done:
+                    client = pending.pop(task)
+                    if task.cancelled():
+                        continue
+                    exc = task.exception()
+                    if exc is None:
+                        for other in pending:
+                            other.cancel()
+                        return task.result()
+                    if winner is client:
+                        raise exc  # Falhou a meio da resposta: o texto parcial já foi entregue.
+                    errors.append((client.provider, exc))
+                if winner is None and not pending:
+                    if next_index < len(self.clients):
+                        launch()  # Failover
+                    else:
+                        raise self._combined_error(errors)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _combined_error(errors: List[tuple]) -> LLMError:
+        if len(errors) == 1:
+            exc = errors[0][1]
+            return exc if isinstance(exc, LLMError) else LLMError(str(exc))
+        lines = "\n".join(f"- {provider}: {exc}" for provider, exc in errors)
+        first = errors[0][1]
+        return LLMError(
+            f"Todos os providers falharam:\n{lines}",
+            status_code=getattr(first, 'status_code', None),
+            headers=getattr(first, 'headers', None),
+            body=getattr(first, 'body', None))
+
+
+def create_llm_client(preferences, provider: Optional[str] = None, model: Optional[str] = None,
+                      system_prompt: Optional[str] = None):
+    """Cliente assíncrono para as preferências atuais.
+
+    Com o modo race ativo (llm.race), devolve um RacingLLMClient com o provider
+    pedido à cabeça, seguido dos providers de reserva que têm API key.
+    """
+    provider = provider or preferences.get_llm_provider()
+    if model is None:
+        model = preferences.get_llm_model(provider)
+    if system_prompt is None:
+        system_prompt = preferences.get_llm_system_prompt()
+    wait_for_model = preferences.get_llm_hf_wait_for_model()
+
+    def make(name, key, name_model):
+        client = AsyncLLMClient(name, key, name_model, system_prompt)
+        client.wait_for_model = wait_for_model
+        return client
+
+    primary = make(provider, preferences.get_llm_api_key(provider), model)
+
+    race = preferences.get_llm_race()
+    if not race['enabled']:
+        return primary
+    clients = [primary]
+    for fallback in race['fallbacks']:
+        if fallback == provider or not preferences.has_llm_access(fallback):
+            continue
+        clients.append(make(fallback, preferences.get_llm_api_key(fallback),
+                            preferences.get_llm_model(fallback)))
+    if len(clients) == 1:
+        return primary
+    return RacingLLMClient(clients, race['hedge_delay_ms'] / 1000)
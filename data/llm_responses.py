@@ -0,0 +1,166 @@
+"""
+Respostas dos providers LLM: erros, eventos Server-Sent Events e extração do
+texto (resposta completa ou delta de streaming) e do consumo de tokens.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import List, Optional, Tuple
+
+from .llm_metrics import extract_usage
+
+# (prompt_tokens, completion_tokens), None quando o provider não os indica.
+Usage = Tuple[Optional[int], Optional[int]]
+
+
+class LLMError(Exception):
+    def __init__(self, message, status_code=None, headers=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+class SSEDecoder:
+    """Accumulates Server-Sent Events lines and returns each complete event's data."""
+
+    def __init__(self):
+        self._data_lines: List[str] = []
+        self.done = False  # set after the OpenAI-style "[DONE]" sentinel
+
+    def feed(self, line: str) -> Optional[str]:
+        line = line.rstrip('\r\n')
+        if line.startswith('data:'):
+            self._data_lines.append(line[5:].lstrip())
+            return None
+        if line or not self._data_lines:
+            return None
+        # Linha vazia: fim do evento.
+        return self._flush()
+
+    def close(self) -> Optional[str]:
+        return self._flush() if self._data_lines else None
+
+    def _flush(self) -> Optional[str]:
+        data = "\n".join(self._data_lines)
+        self._data_lines = []
+        if data.strip() == '[DONE]':
+            self.done = True
+            return None
+        return data
+
+
+def body_usage(body) -> Usage:
+    try:
+        return extract_usage(json.loads(body))
+    except ValueError:
+        return None, None
+
+
+def event_usage(data: str, previous: Usage) -> Usage:
+    """Usage de um evento SSE, ou o anterior (os providers enviam-no nos últimos eventos)."""
+    usage = body_usage(data)
+    return usage if usage[1] is not None else previous
+
+
+def gemini_text(data) -> str:
+    """Extract text from a Gemini (stream or full) response; raise on API errors."""
+    if not isinstance(data, dict):
+        return ""
+    # Surface error details if present
+    err = data.get("error")
+    if err:
+        code = err.get("code", "?")
+        msg = err.get("message", "")
+        raise LLMError(f"Gemini erro ({code}): {msg}")
+    # Extract text from candidates
+    cands = data.get("candidates", [])
+    if cands and isinstance(cands, list):
+        content = cands[0].get("content", {})
+        parts = content.get("parts", []) if isinstance(content, dict) else []
+        if parts and isinstance(parts, list):
+            text_parts: list[str] = []
+            for part in parts:
+                if isinstance(part, dict):
+                    piece = part.get("text", "")
+                elif isinstance(part, str):
+                    piece = part
+                else:
+                    piece = ""
+                if piece:
+                    text_parts.append(piece)
+            text = "".join(text_parts)
+            if text:
+                return text
+        # Some Gemini payloads include `content.text` directly
+        fallback_text = content.get("text") if isinstance(content, dict) else None
+        if isinstance(fallback_text, str) and fallback_text.strip():
+            return fallback_text
+    return ""
+
+
+def openai_delta(data) -> str:
+    """Text delta from an OpenAI-compatible streaming chunk."""
+    if not isinstance(data, dict):
+        return ""
+    err = data.get("error")
+    if err:
+        msg = err.get("message", "") if isinstance(err, dict) else str(err)
+        raise LLMError(f"Erro no streaming: {msg}")
+    choices = data.get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+def cloudflare_delta(data) -> str:
+    """Text delta from a Cloudflare Workers AI streaming event."""
+    if not isinstance(data, dict):
+        return ""
+    return data.get("response") or ""
+
+
+def openai_chat_text(data) -> str:
+    msg = data.get("choices", [{}])[0].get("message", {}).get("content")
+    if not msg:
+        raise LLMError(f"Resposta sem conteúdo válido: {json.dumps(data)[:400]}")
+    return msg
+
+
+def groq_chat_text(data) -> str:
+    msg = data.get("choices", [{}])[0].get("message", {}).get("content")
+    if not msg:
+        raise LLMError(f"Groq respondeu sem conteúdo válido: {json.dumps(data)[:500]}")
+    return msg
+
+
+def hf_text(data) -> str:
+    # HF can return list or dict
+    if isinstance(data, list) and data:
+        item = data[0]
+        if isinstance(item, dict):
+            return item.get("generated_text") or item.get("summary_text") or json.dumps(item)
+    if isinstance(data, dict):
+        return data.get("generated_text") or data.get("summary_text") or json.dumps(data)
+    return str(data)
+
+
+def gemini_response_text(data) -> str:
+    text = gemini_text(data)
+    if text:
+        return text
+    # If no text found, raise error with raw response preview
+    raise LLMError(f"Gemini devolveu resposta sem texto: {json.dumps(data)[:300]}")
+
+
+def cloudflare_text(data) -> str:
+    # Cloudflare returns {success: bool, result: {response: "..."}, errors: [...]}
+    if not data.get("success", False):
+        errors = data.get("errors", [])
+        err_msg = errors[0].get("message", "Erro desconhecido") if errors else "Erro desconhecido"
+        raise LLMError(f"Cloudflare erro: {err_msg}")
+
+    result = data.get("result", {})
+    response = result.get("response", "")
+    if not response:
+        raise LLMError(f"Cloudflare devolveu resposta sem texto: {json.dumps(data)[:300]}")
+    return response
@@ -0,0 +1,117 @@
+"""
+Cache persistente dos catálogos de modelos por provider.
+
+As listas são guardadas em model_catalog.json (app data dir), por provider e
+hash da API key. Leituras devolvem sempre o que está em cache; se a entrada
+já expirou, é atualizada numa thread em segundo plano (stale-while-revalidate).
+Só a primeira leitura de um provider, ou um refresh forçado, usa a rede; as
+listas de recurso usadas quando a rede falha não são guardadas. Num refresh
+forçado (o "Obter Modelos" das definições) o erro segue sempre para quem chamou.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .app_paths import get_model_catalog_path
+from .constants import MODEL_CATALOG_TTL
+
+_lock = threading.Lock()
+_entries: Optional[dict] = None
+_refreshing: set[str] = set()
+
+
+def _entry_key(provider: str, api_key: str) -> str:
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return f"{provider}:{key_hash}"
+
+
+def _load() -> dict:
+    global _entries
+    if _entries is None:
+        try:
+            with get_model_catalog_path().open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            _entries = data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+
+def _save() -> None:
+    path = get_model_catalog_path()
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".model_catalog-", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(_entries, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Fica só em memória; volta a ser gravado na próxima atualização.
+
+
+def _store(key: str, models: List[dict]) -> None:
+    with _lock:
+        _load()[key] = {"fetched_at": time.time(), "models": models}
+        _save()
+
+
+def _refresh_in_background(key: str, fetch: Callable[[], List[dict]]) -> None:
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            models = fetch()
+            if models:
+                _store(key, models)
+        except Exception:
+            pass  # Mantém a lista antiga; nova tentativa na próxima leitura.
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name="model-catalog-refresh", daemon=True).start()
+
+
+def get_models(
+        provider: str, api_key: str,
+        fetch: Callable[[], List[dict]],
+        force_refresh: bool = False,
+        ttl: float = MODEL_CATALOG_TTL,
+        fallback: Optional[List[dict]] = None,
+        fallback_on_error: bool = True) -> List[dict]:
+    """Lista de modelos do provider, servida da cache sempre que possível.
+
+    fetch() obtém a lista da rede; só é chamado diretamente quando não há
+    cache para este provider/key ou quando force_refresh=True. Se não devolver
+    modelos, é devolvido fallback (os modelos conhecidos do provider), que nunca
+    é guardado. Se falhar, o erro segue para quem chamou, exceto fora de um
+    refresh forçado com fallback e fallback_on_error, em que vale o fallback.
+    """
+    key = _entry_key(provider, api_key)
+    if not force_refresh:
+        with _lock:
+            entry = _load().get(key)
+        if entry and entry.get("models"):
+            if time.time() - entry.get("fetched_at", 0) > ttl:
+                _refresh_in_background(key, fetch)
+            return list(entry["models"])
+
+    try:
+        models = fetch()
+    except Exception:
+        if force_refresh or not fallback or not fallback_on_error:
+            raise
+        return list(fallback)
+    if not models:
+        return list(fallback or [])
+    _store(key, models)
+    return models
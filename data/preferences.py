@@ -1,18 +1,48 @@
 """
 Gestor de preferências da aplicação.
+
+As preferências são lidas uma vez para memória; as alterações são gravadas
+em diferido (debounce) e de forma atómica. Edições externas ao ficheiro são
+detetadas pelo mtime, verificado no máximo a cada poucos segundos.
+
+Widgets abertos podem subscrever alterações por caminho de chave
+(ex.: 'llm.provider', 'ui.quick_test_questions') com subscribe().
 """
 
+import atexit
+import copy
 import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from .constants import (
     MIN_WINDOW_PERCENT, MAX_WINDOW_PERCENT, DEFAULT_WINDOW_PERCENT,
     MIN_QUICK_TEST_QUESTIONS, MAX_QUICK_TEST_QUESTIONS, DEFAULT_QUICK_TEST_QUESTIONS,
-    DEFAULT_LLM_PROVIDER, LLM_PROVIDERS
+    DEFAULT_LLM_PROVIDER, LLM_PROVIDERS, DEFAULT_CUSTOM_BASE_URL, DEFAULT_CUSTOM_CHAT_PATH,
+    DEFAULT_HEDGE_DELAY_MS, MIN_HEDGE_DELAY_MS, MAX_HEDGE_DELAY_MS,
+    DEFAULT_EXPLANATION_BATCH_SIZE, MAX_EXPLANATION_BATCH_SIZE,
+    DEFAULT_HTTP_LOG_LEVEL, HTTP_LOG_LEVELS,
+    PREFERENCES_WRITE_DELAY, PREFERENCES_MTIME_CHECK_INTERVAL
 )
 
 
+def _flatten(prefs: dict, prefix: str = '') -> dict:
+    """Converte {'llm': {'provider': 'groq'}} em {'llm.provider': 'groq'}."""
+    flat = {}
+    for key, value in prefs.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(_flatten(value, path + '.'))
+        else:
+            flat[path] = value
+    return flat
+
+
 class Preferences:
     """Gere preferências persistentes da aplicação."""
 
@@ -32,6 +62,24 @@ class Preferences:
 
         self.pref_file.parent.mkdir(parents=True, exist_ok=True)
 
+        # Estado em memória (ver _read_preferences / _write_preferences)
+        self._lock = threading.RLock()
+        self._cache: Optional[dict] = None
+        self._file_stamp = None
+        self._last_stamp_check = 0.0
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        # Erro da última gravação falhada (None depois de uma gravação bem-sucedida)
+        self.write_error: Optional[OSError] = None
+        self._batch_depth = 0
+        # Subscrições (key_path, callback) e último estado notificado
+        self._subscribers: list[tuple[str, Callable[[dict], None]]] = []
+        self._published: Optional[dict] = None
+        # Entrega das notificações (ver set_dispatcher); None = na thread da alteração
+        self._dispatch: Optional[Callable[[Callable[[], None]], None]] = None
+        # Garante que alterações pendentes não se perdem ao sair
+        atexit.register(self.flush)
+
         # Cria ficheiro com valores padrão se não existir
         if not self.pref_file.exists():
             self._write_preferences({
@@ -55,7 +103,8 @@ class Preferences:
                         'mistral': '',
                         'perplexity': '',
                         'openrouter': '',
-                        'cloudflare': ''
+                        'cloudflare': '',
+                        'custom': ''
                     },
                     'models': {
                         'groq': 'llama-3.3-70b-versatile',
@@ -64,7 +113,8 @@ class Preferences:
                         'mistral': 'mistral-small-latest',
                         'perplexity': 'llama-3.1-sonar-small',
                         'openrouter': 'meta-llama/Meta-Llama-3.1-8B-Instruct',
-                        'cloudflare': '@cf/meta/llama-3-8b-instruct'
+                        'cloudflare': '@cf/meta/llama-3-8b-instruct',
+                        'custom': ''
                     },
                     'prompt_template': (
                         "Por favor explica, com rigor, a resposta certa e as respostas erradas da pergunta em baixo.\n"
@@ -78,6 +128,7 @@ class Preferences:
                     'image_provider': 'wikimedia'
                 }
             })
+            self.flush()
 
     def get_last_gift_file(self) -> Optional[str]:
         """Retorna o último ficheiro GIFT usado."""
@@ -126,6 +177,17 @@ class Preferences:
         llm.setdefault('api_keys', {})[provider] = key
         self._write_preferences(prefs)
 
+    def has_llm_access(self, provider: str) -> bool:
+        """O provider pode ser usado: tem API key ou, no "custom", um servidor gravado.
+
+        No "custom" a key é opcional e o URL por omissão (localhost) não conta: pode não
+        haver servidor nenhum.
+        """
+        if provider == 'custom':
+            base_url = self._read_preferences().get('llm', {}).get('custom', {}).get('base_url')
+            return isinstance(base_url, str) and bool(base_url.strip())
+        return bool(self.get_llm_api_key(provider))
+
     def get_llm_model(self, provider: str) -> str:
         prefs = self._read_preferences()
         return prefs.get('llm', {}).get('models', {}).get(provider, '')
@@ -162,6 +224,112 @@ class Preferences:
         prefs.setdefault('llm', {})['system_prompt'] = prompt
         self._write_preferences(prefs)
 
+    def get_llm_race(self) -> dict:
+        """Modo race (validado): {'enabled': bool, 'hedge_delay_ms': int, 'fallbacks': [...]}."""
+        prefs = self._read_preferences()
+        race = prefs.get('llm', {}).get('race', {})
+        delay = race.get('hedge_delay_ms', DEFAULT_HEDGE_DELAY_MS)
+        if not isinstance(delay, int) or delay < MIN_HEDGE_DELAY_MS or delay > MAX_HEDGE_DELAY_MS:
+            delay = DEFAULT_HEDGE_DELAY_MS
+        fallbacks = race.get('fallbacks', [])
+        if not isinstance(fallbacks, list):
+            fallbacks = []
+        return {
+            'enabled': bool(race.get('enabled', False)),
+            'hedge_delay_ms': delay,
+            'fallbacks': [p for p in fallbacks if p in LLM_PROVIDERS],
+        }
+
+    def set_llm_race(self, enabled: bool, hedge_delay_ms: int, fallbacks: list):
+        """Guarda o modo race (providers de reserva por ordem de preferência)."""
+        prefs = self._read_preferences()
+        prefs.setdefault('llm', {})['race'] = {
+            'enabled': bool(enabled),
+            'hedge_delay_ms': int(hedge_delay_ms),
+            'fallbacks': list(fallbacks),
+        }
+        self._write_preferences(prefs)
+
+    def get_llm_prefetch(self) -> bool:
+        """Pré-gerar explicações durante os testes (desligado por omissão: gasta quota)."""
+        prefs = self._read_preferences()
+        return bool(prefs.get('llm', {}).get('prefetch', False))
+
+    def set_llm_prefetch(self, enabled: bool):
+        prefs = self._read_preferences()
+        prefs.setdefault('llm', {})['prefetch'] = bool(enabled)
+        self._write_preferences(prefs)
+
+    def get_llm_hf_wait_for_model(self) -> bool:
+        """Hugging Face: esperar por um modelo a carregar em vez de devolver logo o erro."""
+        prefs = self._read_preferences()
+        return bool(prefs.get('llm', {}).get('hf_wait_for_model', True))
+
+    def set_llm_hf_wait_for_model(self, enabled: bool):
+        prefs = self._read_preferences()
+        prefs.setdefault('llm', {})['hf_wait_for_model'] = bool(enabled)
+        self._write_preferences(prefs)
+
+    def get_llm_hf_warmup(self) -> bool:
+        """Hugging Face: aquecer o modelo ao abrir uma explicação já em cache."""
+        prefs = self._read_preferences()
+        return bool(prefs.get('llm', {}).get('hf_warmup', True))
+
+    def set_llm_hf_warmup(self, enabled: bool):
+        prefs = self._read_preferences()
+        prefs.setdefault('llm', {})['hf_warmup'] = bool(enabled)
+        self._write_preferences(prefs)
+
+    def get_llm_custom_endpoint(self) -> dict:
+        """Servidor do "custom": {'base_url': str, 'path': str, 'headers': {nome: valor}}."""
+        prefs = self._read_preferences()
+        custom = prefs.get('llm', {}).get('custom', {})
+        base_url = custom.get('base_url', DEFAULT_CUSTOM_BASE_URL)
+        path = custom.get('path', DEFAULT_CUSTOM_CHAT_PATH)
+        headers = custom.get('headers', {})
+        if not isinstance(headers, dict):
+            headers = {}
+        if not isinstance(path, str) or not path.strip():
+            path = DEFAULT_CUSTOM_CHAT_PATH
+        return {
+            'base_url': base_url.strip() if isinstance(base_url, str) else DEFAULT_CUSTOM_BASE_URL,
+            'path': path.strip(),
+            'headers': {str(k): str(v) for k, v in headers.items()},
+        }
+
+    def set_llm_custom_endpoint(self, base_url: str, path: str, headers: dict):
+        prefs = self._read_preferences()
+        prefs.setdefault('llm', {})['custom'] = {
+            'base_url': base_url.strip(),
+            'path': path.strip() or DEFAULT_CUSTOM_CHAT_PATH,
+            'headers': dict(headers),
+        }
+        self._write_preferences(prefs)
+
+    def get_llm_batch_size(self) -> int:
+        """Perguntas por pedido nas explicações em segundo plano e em lote (1 = uma por pedido)."""
+        prefs = self._read_preferences()
+        size = prefs.get('llm', {}).get('batch_size', DEFAULT_EXPLANATION_BATCH_SIZE)
+        if not isinstance(size, int) or size < 1 or size > MAX_EXPLANATION_BATCH_SIZE:
+            return DEFAULT_EXPLANATION_BATCH_SIZE
+        return size
+
+    def set_llm_batch_size(self, size: int):
+        prefs = self._read_preferences()
+        prefs.setdefault('llm', {})['batch_size'] = int(size)
+        self._write_preferences(prefs)
+
+    def get_http_log_level(self) -> str:
+        """Detalhe do registo HTTP: 'off', 'basic', 'headers' ou 'full' (ver data/http_log.py)."""
+        prefs = self._read_preferences()
+        level = prefs.get('llm', {}).get('http_log_level', DEFAULT_HTTP_LOG_LEVEL)
+        return level if level in HTTP_LOG_LEVELS else DEFAULT_HTTP_LOG_LEVEL
+
+    def set_http_log_level(self, level: str):
+        prefs = self._read_preferences()
+        prefs.setdefault('llm', {})['http_log_level'] = level
+        self._write_preferences(prefs)
+
     def get_image_provider(self) -> str:
         """Retorna o provider de imagens ('wikimedia', 'openverse', 'pexels', 'unsplash', 'radiopaedia', 'none')."""
         prefs = self._read_preferences()
@@ -271,15 +439,194 @@ class Preferences:
         prefs['language'] = language
         self._write_preferences(prefs)
 
-    def _read_preferences(self) -> dict:
+    @contextmanager
+    def batch(self):
+        """Agrupa várias alterações numa única gravação atómica.
+
+        O bloco corre com o lock das preferências: outras threads só leem ou
+        alteram quando ele termina. Se um bloco (mesmo aninhado) terminar com
+        exceção, as alterações feitas nele são descartadas.
+
+        Exemplo::
+
+            with prefs.batch():
+                prefs.set_llm_provider('groq')
+                prefs.set_llm_model('groq', 'llama-3.3-70b-versatile')
+        """
+        with self._lock:
+            snapshot = (copy.deepcopy(self._read_preferences()), self._dirty)
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._cache, self._dirty = snapshot
+                raise
+            finally:
+                self._batch_depth -= 1
+            outermost = self._batch_depth == 0
+        if outermost:
+            self.flush()
+            self._notify_changes()
+
+    def subscribe(self, key_path: str, callback: Callable[[dict], None]) -> Callable[[], None]:
+        """Regista `callback` para alterações em `key_path` ou em chaves abaixo dele.
+
+        O callback recebe um dict {caminho: novo_valor} apenas com as chaves
+        alteradas (valor None se a chave foi removida) e é chamado uma vez por
+        alteração, ou uma vez no fim de um batch(), na thread que fez a alteração
+        (ou que detetou a edição externa), exceto com set_dispatcher().
+
+        Retorna uma função que cancela a subscrição, por exemplo para ligar a
+        `widget.destroyed`.
+        """
+        entry = (key_path, callback)
+        with self._lock:
+            if self._published is None:
+                self._published = _flatten(self._read_preferences())
+            self._subscribers.append(entry)
+
+        def unsubscribe(*_args):
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def set_dispatcher(self, dispatch: Optional[Callable[[Callable[[], None]], None]]) -> None:
+        """Os subscritores passam a ser chamados dentro de dispatch(fn).
+
+        A GUI usa-o para os callbacks correrem sempre na thread da GUI, mesmo
+        quando a alteração (ou a releitura após uma edição externa) acontece
+        noutra thread.
+        """
+        with self._lock:
+            self._dispatch = dispatch
+
+    def _notify_changes(self):
+        """Compara com o último estado notificado e chama os subscritores afetados."""
+        with self._lock:
+            if self._batch_depth or self._cache is None:
+                return
+            if not self._subscribers:
+                self._published = None
+                return
+            current = _flatten(self._cache)
+            previous = self._published or {}
+            self._published = current
+            changed = {
+                k: current.get(k)
+                for k in set(previous) | set(current)
+                if previous.get(k) != current.get(k)
+            }
+            subscribers = list(self._subscribers)
+            dispatch = self._dispatch
+        if not changed:
+            return
+
+        def deliver():
+            for key_path, callback in subscribers:
+                relevant = {
+                    k: v for k, v in changed.items()
+                    if k == key_path or k.startswith(key_path + '.')
+                }
+                if not relevant:
+                    continue
+                try:
+                    callback(relevant)
+                except Exception:
+                    # Widget já destruído ou erro no callback: não afeta os restantes.
+                    pass
+
+        if dispatch is None:
+            deliver()
+        else:
+            dispatch(deliver)
+
+    def flush(self):
+        """Grava imediatamente as alterações pendentes (escrita atómica).
+
+        Retorna False se não foi possível gravar; o erro fica em write_error e
+        as alterações continuam pendentes para o próximo flush.
+        """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty or self._cache is None or self._batch_depth:
+                return True
+            data = json.dumps(self._cache, ensure_ascii=False, indent=2)
+            try:
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=str(self.pref_file.parent), prefix='.preferences-', suffix='.tmp'
+                )
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.pref_file)
+                except BaseException:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+            except OSError as e:
+                self.write_error = e
+                return False
+            self.write_error = None
+            self._dirty = False
+            self._file_stamp = self._stat_file()
+            self._last_stamp_check = time.monotonic()
+            return True
+
+    def _stat_file(self):
+        """Assinatura (mtime, tamanho) do ficheiro, ou None se não existir."""
+        try:
+            st = os.stat(self.pref_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_from_disk(self) -> dict:
         """Lê as preferências do ficheiro."""
         try:
             with open(self.pref_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, OSError):
             return {}
 
+    def _read_preferences(self) -> dict:
+        """Devolve as preferências em memória, recarregando-as se o ficheiro mudou."""
+        reloaded = False
+        with self._lock:
+            now = time.monotonic()
+            # Com alterações pendentes (ou dentro de batch()) a memória é a fonte de verdade.
+            check_due = now - self._last_stamp_check >= PREFERENCES_MTIME_CHECK_INTERVAL
+            if self._cache is None or (not self._dirty and not self._batch_depth and check_due):
+                self._last_stamp_check = now
+                stamp = self._stat_file()
+                if self._cache is None or stamp != self._file_stamp:
+                    reloaded = self._cache is not None
+                    self._cache = self._load_from_disk()
+                    self._file_stamp = stamp
+            prefs = self._cache
+        if reloaded:
+            # Edição externa: notifica o que mudou
+            self._notify_changes()
+        return prefs
+
     def _write_preferences(self, prefs: dict):
-        """Guarda as preferências no ficheiro."""
-        with open(self.pref_file, 'w', encoding='utf-8') as f:
-            json.dump(prefs, f, ensure_ascii=False, indent=2)
+        """Atualiza as preferências em memória e agenda a gravação no ficheiro."""
+        with self._lock:
+            self._cache = prefs
+            self._dirty = True
+            if self._batch_depth:
+                # Gravado (e notificado) uma única vez no fim do batch()
+                return
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+            self._flush_timer = threading.Timer(PREFERENCES_WRITE_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+        self._notify_changes()
@@ -0,0 +1,145 @@
+"""
+Saúde de cada provider LLM: tempos limite adaptativos, novas tentativas e circuit breaker.
+
+Os tempos limite deixam de ser fixos: cada provider guarda as últimas
+LLM_LATENCY_WINDOW latências observadas (tempo de ligação e tempo até aos
+cabeçalhos da resposta, em separado para pedidos com e sem streaming) e o
+tempo limite é LLM_TIMEOUT_FACTOR vezes o p95, entre um mínimo e um máximo.
+Até haver LLM_TIMEOUT_MIN_SAMPLES amostras usam-se os valores por omissão.
+
+Os erros transitórios (429, 5xx, ligação recusada ou cortada) são repetidos
+com espera exponencial com jitter (backoff_delay). Após
+CIRCUIT_BREAKER_THRESHOLD falhas seguidas o provider fica "aberto": os pedidos
+falham de imediato durante CIRCUIT_BREAKER_COOLDOWN segundos; depois segue um
+único pedido de teste, que fecha o circuito se tiver sucesso.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+from .constants import (
+    CIRCUIT_BREAKER_COOLDOWN, CIRCUIT_BREAKER_THRESHOLD, DEFAULT_LLM_TIMEOUT, LLM_CONNECT_TIMEOUT,
+    LLM_LATENCY_WINDOW, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_TIMEOUT_FACTOR,
+    LLM_TIMEOUT_MIN_SAMPLES, MAX_LLM_READ_TIMEOUT, MIN_LLM_CONNECT_TIMEOUT, MIN_LLM_READ_TIMEOUT)
+
+# Estados HTTP que justificam repetir o pedido.
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Erro de rede transitório (ligação recusada, cortada ou fechada pelo servidor)."""
+    return isinstance(error, ConnectionError)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Espera antes da tentativa attempt + 1: exponencial, com metade aleatória (jitter)."""
+    delay = min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _p95(values) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class ProviderHealth:
+    """Latências observadas e estado do circuit breaker de um provider (seguro entre threads)."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._connect = deque(maxlen=LLM_LATENCY_WINDOW)
+        self._ttfb = {stream: deque(maxlen=LLM_LATENCY_WINDOW) for stream in (False, True)}
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    # --- Tempos limite ---
+    def timeouts(self, stream: bool = False, scale: float = 1.0) -> Tuple[float, float]:
+        """(ligação, leitura) em segundos. scale alarga a leitura (respostas maiores, em lote)."""
+        with self._lock:
+            connects = list(self._connect)
+            ttfbs = list(self._ttfb[stream])
+        connect = LLM_CONNECT_TIMEOUT
+        if len(connects) >= LLM_TIMEOUT_MIN_SAMPLES:
+            connect = min(LLM_CONNECT_TIMEOUT,
+                          max(MIN_LLM_CONNECT_TIMEOUT, LLM_TIMEOUT_FACTOR * _p95(connects)))
+        read = DEFAULT_LLM_TIMEOUT
+        if len(ttfbs) >= LLM_TIMEOUT_MIN_SAMPLES:
+            read = min(MAX_LLM_READ_TIMEOUT,
+                       max(MIN_LLM_READ_TIMEOUT, LLM_TIMEOUT_FACTOR * _p95(ttfbs)))
+        return connect, read * max(1.0, scale)
+
+    # --- Circuit breaker ---
+    def check(self) -> Optional[float]:
+        """None se o pedido pode seguir; senão, segundos até o provider voltar a ser tentado."""
+        with self._lock:
+            if self._failures < CIRCUIT_BREAKER_THRESHOLD:
+                return None
+            now = time.monotonic()
+            if now < self._open_until:
+                return self._open_until - now
+            if self._probing:
+                return 1.0
+            # Fim da espera: este pedido testa o provider; os outros continuam a falhar.
+            self._probing = True
+            return None
+
+    def record_success(self, ttfb: Optional[float] = None, connect_time: float = 0.0,
+                       stream: bool = False) -> None:
+        """O provider respondeu (também um 4xx: está disponível). ttfb só nas respostas válidas."""
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if ttfb is not None:
+                self._ttfb[stream].append(ttfb)
+            if connect_time:
+                self._connect.append(connect_time)
+
+    def record_failure(self) -> None:
+        """Erro 5xx, tempo esgotado ou falha de rede."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= CIRCUIT_BREAKER_THRESHOLD:
+                self._failures = max(self._failures, CIRCUIT_BREAKER_THRESHOLD)
+                self._open_until = time.monotonic() + CIRCUIT_BREAKER_COOLDOWN
+            self._probing = False
+
+    def record_cancelled(self) -> None:
+        """Pedido cancelado antes da resposta: não conta, mas liberta o pedido de teste."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        """Estado atual (diagnóstico)."""
+        connect, read = self.timeouts()
+        with self._lock:
+            return {
+                "connect_timeout": connect,
+                "read_timeout": read,
+                "failures": self._failures,
+                "open_for": max(0.0, self._open_until - time.monotonic()),
+            }
+
+
+_health: dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+
+def get_provider_health(provider: str) -> ProviderHealth:
+    with _health_lock:
+        health = _health.get(provider)
+        if health is None:
+            health = _health[provider] = ProviderHealth(provider)
+        return health
+
+
+def reset_provider_health() -> None:
+    """Esquece latências e falhas de todos os providers (benchmarks e testes)."""
+    with _health_lock:
+        _health.clear()
@@ -144,6 +144,7 @@ class QuestionScreen:
             if self.app.answer_var != -1:
                 question = self.app.selected_questions[self.app.current_question_index]
                 self.app.user_answers[question.number] = self.app.answer_var
+                self.app.on_question_answered(question, self.app.answer_var)
                 # Include current question in results
                 self.app.selected_questions = self.app.selected_questions[:self.app.current_question_index + 1]
             else:
@@ -171,6 +172,7 @@ class QuestionScreen:
 
         question = self.app.selected_questions[self.app.current_question_index]
         self.app.user_answers[question.number] = answer
+        self.app.on_question_answered(question, answer)
 
         # Se ativado e a resposta estiver errada, mostra diálogo de correção antes de avançar
         if getattr(self.app, 'correct_me_if_wrong', False):
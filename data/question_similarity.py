@@ -0,0 +1,77 @@
+"""
+Índice de semelhança entre perguntas (TF-IDF, sem rede).
+
+Bancos grandes têm muitas variantes parafraseadas da mesma pergunta. O índice
+representa cada pergunta (enunciado + opções) por um vetor TF-IDF de palavras
+e pares de palavras normalizados (minúsculas, sem acentos) e encontra as mais
+próximas pela semelhança de cosseno, com um índice invertido por termo. Só são
+consideradas semelhantes perguntas com a mesma resposta correta, para que a
+explicação de uma sirva para a outra.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _terms(text: str) -> List[str]:
+    words = [w for w in _WORD_RE.findall(_normalize(text)) if len(w) > 1]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _question_text(question) -> str:
+    return "\n".join([question.text] + [opt['text'] for opt in question.options])
+
+
+def _correct_answer(question) -> str:
+    correct = [opt['text'] for opt in question.options if opt.get('is_correct')]
+    return " ".join(_WORD_RE.findall(_normalize(" ".join(correct))))
+
+
+class QuestionIndex:
+    """Índice TF-IDF das perguntas de um banco (construído uma vez, só leitura)."""
+
+    def __init__(self, questions: Sequence):
+        self._questions = list(questions)
+        counts = [Counter(_terms(_question_text(q))) for q in self._questions]
+        document_freq: Counter = Counter()
+        for terms in counts:
+            document_freq.update(terms.keys())
+        total = len(self._questions)
+        self._idf = {term: math.log((1 + total) / (1 + df)) + 1
+                     for term, df in document_freq.items()}
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        self._answers = [_correct_answer(q) for q in self._questions]
+        self._positions = {id(q): i for i, q in enumerate(self._questions)}
+        for i, terms in enumerate(counts):
+            for term, weight in self._vector(terms).items():
+                self._postings[term].append((i, weight))
+
+    def _vector(self, terms: Counter) -> Dict[str, float]:
+        vector = {t: (1 + math.log(n)) * self._idf.get(t, 0.0) for t, n in terms.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return {t: w / norm for t, w in vector.items() if w} if norm else {}
+
+    def similar(self, question, threshold: float, limit: int = 5) -> List[Tuple[object, float]]:
+        """Perguntas semelhantes a question (score >= threshold), da mais para a menos próxima."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in self._vector(Counter(_terms(_question_text(question)))).items():
+            for i, other_weight in self._postings.get(term, ()):
+                scores[i] += weight * other_weight
+        own = self._positions.get(id(question))
+        answer = _correct_answer(question)
+        matches = [(i, score) for i, score in scores.items()
+                   if i != own and score >= threshold and self._answers[i] == answer]
+        matches.sort(key=lambda m: -m[1])
+        return [(self._questions[i], min(score, 1.0)) for i, score in matches[:limit]]
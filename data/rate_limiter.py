@@ -0,0 +1,265 @@
+"""
+Limitação de ritmo por provider, guiada pelos cabeçalhos de rate limit.
+
+Cada provider tem dois token buckets (pedidos e tokens) cuja capacidade,
+saldo e ritmo de reposição são sincronizados a partir dos cabeçalhos
+x-ratelimit-limit/remaining/reset-* de cada resposta; Retry-After (ou um 429)
+bloqueia o provider até ao instante indicado. Antes de cada pedido, o cliente
+reserva um pedido e uma estimativa de tokens e espera o tempo necessário, pelo
+que todos os chamadores partilham o mesmo ritmo.
+
+O primeiro pedido a um provider segue sozinho; enquanto o provider não devolver
+cabeçalhos de limites, os seguintes não esperam.
+"""
+
+from __future__ import annotations
+
+import email.utils
+import re
+import threading
+import time
+from typing import Optional, Tuple
+
+from .http_pool import CancelToken
+
+# Espera por omissão após um 429 sem Retry-After nem reset conhecido (segundos).
+DEFAULT_RETRY_AFTER = 2.0
+# As esperas longas são feitas em passos, para reavaliar com cabeçalhos mais recentes.
+_MAX_WAIT_STEP = 1.0
+# Até à primeira resposta os limites são desconhecidos: só um pedido em curso.
+_PROBE_WAIT = 0.05
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def estimate_tokens(body: Optional[bytes]) -> int:
+    """Estimativa grosseira dos tokens de um pedido (~4 bytes por token)."""
+    return max(1, len(body or b"") // 4)
+
+
+def _header(headers: Optional[dict], *names: str) -> Optional[str]:
+    """Valor do primeiro cabeçalho de names presente e não vazio."""
+    if not headers:
+        return None
+    values = {str(k).lower(): str(v).strip() for k, v in headers.items()}
+    for name in names:
+        if values.get(name.lower()):
+            return values[name.lower()]
+    return None
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _parse_duration(value: Optional[str], now: float) -> Optional[float]:
+    """Segundos até ao reset: "7.66s", "2m59.56s", "20ms", "30", ou um instante epoch."""
+    if not value:
+        return None
+    number = _parse_number(value)
+    if number is not None:
+        if number > 1e12:  # epoch em milissegundos (OpenRouter)
+            return max(0.0, number / 1000 - now)
+        if number > 1e9:  # epoch em segundos
+            return max(0.0, number - now)
+        return max(0.0, number)
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(n) * scale[unit] for n, unit in parts)
+
+
+def _parse_retry_after(headers: Optional[dict], now: float) -> Optional[float]:
+    ms = _parse_number(_header(headers, "retry-after-ms"))
+    if ms is not None:
+        return max(0.0, ms / 1000)
+    value = _header(headers, "retry-after")
+    if not value:
+        return None
+    seconds = _parse_number(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    """Token bucket sincronizado com o limite/saldo/reset anunciados pelo servidor."""
+
+    def __init__(self):
+        self.capacity: Optional[float] = None  # desconhecida até ao primeiro cabeçalho
+        self.available = 0.0
+        self.rate: Optional[float] = None  # reposição por segundo
+        self.reset_at = 0.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.capacity is None:
+            return
+        if self.rate:
+            self.available = min(self.capacity, self.available + self.rate * (now - self.updated))
+        elif now >= self.reset_at:
+            self.available = self.capacity
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.capacity is None:
+            return 0.0
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        if self.rate:
+            return (amount - self.available) / self.rate
+        return max(self.reset_at - now, 0.0) or DEFAULT_RETRY_AFTER
+
+    def consume(self, amount: float) -> None:
+        if self.capacity is not None:
+            self.available -= amount
+
+    def observe(self, limit: Optional[float], remaining: Optional[float],
+                reset: Optional[float], in_flight: float, latest: bool, now: float) -> None:
+        if remaining is None:
+            return
+        if limit is not None and limit > 0:
+            self.capacity = limit
+        elif self.capacity is None or remaining > self.capacity:
+            self.capacity = remaining
+        if reset is not None:
+            self.reset_at = now + reset
+            # "remaining" vem arredondado para baixo: o défice real pode ser até 1 menor,
+            # pelo que cada observação dá um mínimo do ritmo real; fica o maior.
+            deficit = self.capacity - remaining - 1
+            if reset > 0 and deficit > 0:
+                self.rate = max(self.rate or 0.0, deficit / reset)
+        # As respostas podem chegar fora de ordem: só a do pedido mais recente é a
+        # referência; uma atrasada apenas pode baixar o saldo local.
+        if latest:
+            self.available = remaining - in_flight
+        else:
+            self.available = min(self.available, remaining - in_flight)
+        self.updated = now
+
+
+class RateLimiter:
+    """Ritmo partilhado (entre threads e event loops) de um provider."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._requests = _Bucket()
+        self._tokens = _Bucket()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._in_flight_tokens = 0
+        self._observed = False
+        self._next_seq = 0
+        self._latest_seq = -1
+
+    def _reserve(self, tokens: int) -> Tuple[float, int]:
+        """Reserva um pedido se possível: (0, nº de ordem) ou (tempo a esperar, -1)."""
+        with self._lock:
+            if not self._observed and self._in_flight:
+                return _PROBE_WAIT, -1
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            wait = max(self._blocked_until - now,
+                       self._requests.wait_time(1, now),
+                       self._tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait, -1
+            self._requests.consume(1)
+            self._tokens.consume(tokens)
+            self._in_flight += 1
+            self._in_flight_tokens += tokens
+            self._next_seq += 1
+            return 0.0, self._next_seq
+
+    def acquire(self, tokens: int = 1,
+                cancel_token: Optional[CancelToken] = None) -> Tuple[int, int]:
+        """Bloqueia até o pedido poder ser enviado. Devolve a reserva para release()."""
+        while True:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            wait, seq = self._reserve(tokens)
+            if wait <= 0:
+                return seq, tokens
+            if cancel_token is not None:
+                cancel_token.wait(min(wait, _MAX_WAIT_STEP))
+            else:
+                time.sleep(min(wait, _MAX_WAIT_STEP))
+
+    def release(self, reservation: Tuple[int, int],
+                status: Optional[int] = None, headers: Optional[dict] = None) -> None:
+        """Fecha a reserva e atualiza os buckets com os cabeçalhos da resposta (se houver)."""
+        seq, tokens = reservation
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._in_flight_tokens = max(0, self._in_flight_tokens - tokens)
+            if status is not None:
+                self._observed = True
+            if not headers:
+                return
+            now = time.monotonic()
+            wall = time.time()
+            latest = seq > self._latest_seq
+            self._latest_seq = max(self._latest_seq, seq)
+            reset_requests = _parse_duration(
+                _header(headers, "x-ratelimit-reset-requests", "x-ratelimit-reset"), wall)
+            reset_tokens = _parse_duration(_header(headers, "x-ratelimit-reset-tokens"), wall)
+            self._requests.observe(
+                _parse_number(_header(headers, "x-ratelimit-limit-requests", "x-ratelimit-limit")),
+                _parse_number(_header(headers, "x-ratelimit-remaining-requests",
+                                      "x-ratelimit-remaining")),
+                reset_requests, self._in_flight, latest, now)
+            self._tokens.observe(
+                _parse_number(_header(headers, "x-ratelimit-limit-tokens")),
+                _parse_number(_header(headers, "x-ratelimit-remaining-tokens")),
+                reset_tokens, self._in_flight_tokens, latest, now)
+
+            retry_after = _parse_retry_after(headers, wall)
+            if retry_after is None and status == 429:
+                buckets = ((self._requests, reset_requests), (self._tokens, reset_tokens))
+                exhausted = [reset for bucket, reset in buckets
+                             if reset is not None and bucket.capacity is not None
+                             and bucket.available <= 0]
+                retry_after = max(exhausted) if exhausted else DEFAULT_RETRY_AFTER
+            if retry_after is not None and status is not None and status >= 400:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def snapshot(self) -> dict:
+        """Estado atual (diagnóstico)."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "blocked_for": max(0.0, self._blocked_until - now),
+                "requests_available": (self._requests.available
+                                       if self._requests.capacity is not None else None),
+                "tokens_available": (self._tokens.available
+                                     if self._tokens.capacity is not None else None),
+                "in_flight": self._in_flight,
+            }
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = RateLimiter(provider)
+        return limiter
+
+
+def reset_rate_limiters() -> None:
+    """Esquece o estado de todos os providers (benchmarks e testes)."""
+    with _limiters_lock:
+        _limiters.clear()
@@ -58,7 +58,7 @@ class ResultsScreen:
             self._show_wrong_answers(main_layout, wrong_details)
 
         # Botões
-        self._create_buttons(main_layout)
+        self._create_buttons(main_layout, wrong_details)
 
     def _calculate_results(self):
         """Calcula resultados do teste."""
@@ -206,7 +206,15 @@ class ResultsScreen:
             from PySide6.QtWidgets import QMessageBox
             QMessageBox.warning(self.app, tr("Aviso"), tr("Nenhum ficheiro carregado."))
 
-    def _create_buttons(self, layout):
+    def _explain_all_wrong(self, wrong_details):
+        """Gera as explicações de todas as erradas em paralelo (diálogo próprio)."""
+        from .bulk_explanations import BulkExplanationDialog
+        # O lote cobre as mesmas perguntas: evita pedidos em duplicado.
+        self.app._stop_explanation_prefetch()
+        dialog = BulkExplanationDialog(self.app, self.app.selected_questions, wrong_details)
+        dialog.show()
+
+    def _create_buttons(self, layout, wrong_details):
         """Cria botões de ação."""
         button_widget = QWidget()
         button_layout = QHBoxLayout(button_widget)
@@ -216,5 +224,10 @@ class ResultsScreen:
         back_btn.clicked.connect(self.app.show_selection_screen)
         button_layout.addWidget(back_btn)
 
+        if wrong_details:
+            explain_all_btn = QPushButton(tr("Explicar todas as erradas"))
+            explain_all_btn.clicked.connect(lambda: self._explain_all_wrong(wrong_details))
+            button_layout.addWidget(explain_all_btn)
+
         button_layout.addStretch()
         layout.addWidget(button_widget)
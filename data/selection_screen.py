@@ -83,7 +83,17 @@ class SelectionScreen:
         grp_layout.addWidget(QLabel(tr("Ficheiro:") + f" {current_file}"))
 
         # Modelo
-        grp_layout.addWidget(QLabel(tr("Modelo:") + f" {provider} / {model}"))
+        model_label = QLabel(tr("Modelo:") + f" {provider} / {model}")
+        grp_layout.addWidget(model_label)
+
+        def _on_llm_changed(_changes):
+            prefs = self.app.preferences
+            new_provider = prefs.get_llm_provider()
+            new_model = prefs.get_llm_model(new_provider) or tr("(modelo não definido)")
+            model_label.setText(tr("Modelo:") + f" {new_provider} / {new_model}")
+
+        unsubscribe = self.app.preferences.subscribe('llm', _on_llm_changed)
+        model_label.destroyed.connect(unsubscribe)
 
         # Botão Configurar
         config_btn = QPushButton(tr("Configurar"))
@@ -159,6 +169,8 @@ class SelectionScreen:
         if reply == QMessageBox.StandardButton.Yes:
             # Guardar a nova linguagem
             self.app.preferences.set_language(language_code)
+            # A nova instância lê o ficheiro: grava já a alteração pendente
+            self.app.preferences.flush()
             
             # Reiniciar a aplicação usando QProcess
             QProcess.startDetached(sys.executable, sys.argv)
@@ -317,7 +329,7 @@ class SelectionScreen:
 
         # Botão Teste Rápido
         quick_test_count = self.app.preferences.get_quick_test_questions()
-        quick_test_btn = QPushButton(tr("Teste Rápido") + f" ({quick_test_count} " + tr("perguntas") + ")")
+        quick_test_btn = QPushButton()
         quick_test_btn.clicked.connect(self.app.start_quick_test)
         quick_test_btn.setEnabled(has_questions)
         quick_test_btn.setStyleSheet("""
@@ -333,9 +345,19 @@ class SelectionScreen:
                 background-color: #45a049;
             }
         """)
-        quick_test_btn.setToolTip(
-            tr("Inicia imediatamente um teste com") + f" {quick_test_count} " + tr("perguntas aleatórias de todas as categorias.")
+        def _set_quick_test_texts(count):
+            quick_test_btn.setText(tr("Teste Rápido") + f" ({count} " + tr("perguntas") + ")")
+            quick_test_btn.setToolTip(
+                tr("Inicia imediatamente um teste com") + f" {count} "
+                + tr("perguntas aleatórias de todas as categorias.")
+            )
+
+        _set_quick_test_texts(quick_test_count)
+        unsubscribe = self.app.preferences.subscribe(
+            'ui.quick_test_questions',
+            lambda _changes: _set_quick_test_texts(self.app.preferences.get_quick_test_questions())
         )
+        quick_test_btn.destroyed.connect(unsubscribe)
         test_layout.addWidget(quick_test_btn)
 
         # Adiciona stretches para centralizar
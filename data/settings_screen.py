@@ -7,19 +7,36 @@ import webbrowser
 
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
                                QLineEdit, QComboBox, QTextEdit, QTabWidget, QGroupBox,
-                               QFileDialog, QMessageBox, QSpinBox)
+                               QFileDialog, QMessageBox, QSpinBox, QCheckBox, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QAbstractItemView)
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
-from .llm_client import LLMClient, LLMError
+from .llm_client import LLMClient, LLMError, custom_endpoint_config
+from .llm_metrics import get_model_stats, clear_metrics
 from .constants import (
     MIN_WINDOW_PERCENT, MAX_WINDOW_PERCENT,
     MIN_QUICK_TEST_QUESTIONS, MAX_QUICK_TEST_QUESTIONS,
-    LLM_PROVIDERS
+    MIN_HEDGE_DELAY_MS, MAX_HEDGE_DELAY_MS,
+    MAX_EXPLANATION_BATCH_SIZE, LLM_PROVIDERS, DEFAULT_CUSTOM_BASE_URL
 )
 from .i18n import tr, get_current_language, change_language
 
 
+def _format_headers(headers: dict) -> str:
+    return "; ".join(f"{name}: {value}" for name, value in headers.items())
+
+
+def _parse_headers(text: str) -> dict:
+    """"Nome: valor; Outro: valor" -> {nome: valor} (entradas sem ':' são ignoradas)."""
+    headers = {}
+    for item in text.split(";"):
+        name, sep, value = item.partition(":")
+        if sep and name.strip():
+            headers[name.strip()] = value.strip()
+    return headers
+
+
 class SettingsScreen:
     def __init__(self, app):
         self.app = app
@@ -45,11 +62,14 @@ class SettingsScreen:
 
         tab_general = QWidget()
         tab_llm = QWidget()
+        tab_metrics = QWidget()
         tabs.addTab(tab_general, tr("Settings"))
         tabs.addTab(tab_llm, tr("LLM"))
+        tabs.addTab(tab_metrics, tr("Desempenho"))
 
         self._build_general(tab_general)
         self._build_llm(tab_llm)
+        self._build_metrics(tab_metrics)
 
         main_layout.addWidget(tabs)
 
@@ -263,6 +283,8 @@ class SettingsScreen:
         if reply == QMessageBox.StandardButton.Yes:
             # Guardar a nova linguagem
             self.app.preferences.set_language(language_code)
+            # A nova instância lê o ficheiro: grava já a alteração pendente
+            self.app.preferences.flush()
             
             # Reiniciar a aplicação usando QProcess para ser mais elegante
             from PySide6.QtCore import QProcess
@@ -340,6 +362,109 @@ class SettingsScreen:
         layout.addWidget(model_grp)
         layout.addSpacing(10)
 
+        # Custom provider: servidor OpenAI-compatível local ou na rede
+        custom = prefs.get_llm_custom_endpoint()
+        self.custom_grp = QGroupBox(tr("Servidor OpenAI-compatível (custom)"))
+        custom_layout = QHBoxLayout()
+        custom_layout.addWidget(QLabel(tr("URL base:")))
+        # Vazio até o utilizador gravar um servidor (o URL por omissão fica só como sugestão).
+        self.custom_url_entry = QLineEdit(
+            custom['base_url'] if prefs.has_llm_access('custom') else "")
+        self.custom_url_entry.setPlaceholderText(DEFAULT_CUSTOM_BASE_URL)
+        self.custom_url_entry.setToolTip(
+            tr("llama.cpp, vLLM, Ollama (http://localhost:11434/v1)... "
+               "A lista de modelos vem de <URL base>/models."))
+        custom_layout.addWidget(self.custom_url_entry, 2)
+        custom_layout.addWidget(QLabel(tr("Caminho:")))
+        self.custom_path_entry = QLineEdit(custom['path'])
+        custom_layout.addWidget(self.custom_path_entry, 1)
+        custom_layout.addWidget(QLabel(tr("Cabeçalhos:")))
+        self.custom_headers_entry = QLineEdit(_format_headers(custom['headers']))
+        self.custom_headers_entry.setPlaceholderText("X-Api-Key: ...; X-Outro: ...")
+        custom_layout.addWidget(self.custom_headers_entry, 2)
+        self.custom_grp.setLayout(custom_layout)
+        self.custom_grp.setVisible(self.provider_combo.currentText() == "custom")
+        layout.addWidget(self.custom_grp)
+
+        # Race mode (hedging + failover)
+        race = prefs.get_llm_race()
+        race_grp = QGroupBox(tr("Providers de reserva"))
+        race_layout = QHBoxLayout()
+
+        self.race_check = QCheckBox(tr("Ativar"))
+        self.race_check.setChecked(race['enabled'])
+        self.race_check.setToolTip(
+            tr("Se o provider não responder a tempo ou falhar, o pedido segue para os de "
+               "reserva; fica a primeira resposta."))
+        race_layout.addWidget(self.race_check)
+
+        race_layout.addWidget(QLabel(tr("Ordem:")))
+        self.race_fallbacks_entry = QLineEdit(", ".join(race['fallbacks']))
+        self.race_fallbacks_entry.setPlaceholderText("gemini, openrouter")
+        self.race_fallbacks_entry.setToolTip(
+            tr("Providers separados por vírgulas, pela ordem a tentar: {0}").format(
+                ", ".join(LLM_PROVIDERS)))
+        race_layout.addWidget(self.race_fallbacks_entry)
+
+        race_layout.addWidget(QLabel(tr("Esperar até:")))
+        self.race_delay_spin = QSpinBox()
+        self.race_delay_spin.setRange(MIN_HEDGE_DELAY_MS, MAX_HEDGE_DELAY_MS)
+        self.race_delay_spin.setSingleStep(500)
+        self.race_delay_spin.setSuffix(" ms")
+        self.race_delay_spin.setValue(race['hedge_delay_ms'])
+        race_layout.addWidget(self.race_delay_spin)
+
+        race_grp.setLayout(race_layout)
+        layout.addWidget(race_grp)
+
+        self.prefetch_check = QCheckBox(tr("Pré-gerar explicações durante os testes"))
+        self.prefetch_check.setChecked(prefs.get_llm_prefetch())
+        self.prefetch_check.setToolTip(
+            tr("As explicações das perguntas do teste (erradas primeiro) são geradas em "
+               "segundo plano e abrem de imediato nos resultados."))
+        layout.addWidget(self.prefetch_check)
+
+        hf_layout = QHBoxLayout()
+        hf_layout.addWidget(QLabel("Hugging Face:"))
+        self.hf_wait_check = QCheckBox(tr("Esperar que o modelo carregue"))
+        self.hf_wait_check.setChecked(prefs.get_llm_hf_wait_for_model())
+        self.hf_wait_check.setToolTip(
+            tr("Modelos pouco usados são descarregados; o pedido espera (até 2 minutos) "
+               "que voltem a carregar em vez de falhar."))
+        hf_layout.addWidget(self.hf_wait_check)
+        self.hf_warmup_check = QCheckBox(tr("Aquecer o modelo ao abrir uma explicação"))
+        self.hf_warmup_check.setChecked(prefs.get_llm_hf_warmup())
+        self.hf_warmup_check.setToolTip(
+            tr("Com a explicação em cache, um pedido mínimo carrega o modelo para que "
+               "\"Regenerar\" responda depressa."))
+        hf_layout.addWidget(self.hf_warmup_check)
+        hf_layout.addStretch()
+        layout.addLayout(hf_layout)
+
+        batch_layout = QHBoxLayout()
+        batch_layout.addWidget(QLabel(tr("Perguntas por pedido (em segundo plano):")))
+        self.batch_size_spin = QSpinBox()
+        self.batch_size_spin.setRange(1, MAX_EXPLANATION_BATCH_SIZE)
+        self.batch_size_spin.setValue(prefs.get_llm_batch_size())
+        self.batch_size_spin.setToolTip(
+            tr("As explicações pré-geradas e as de \"Explicar todas as erradas\" são pedidas "
+               "em grupos, com menos pedidos e tokens; 1 = uma por pedido."))
+        batch_layout.addWidget(self.batch_size_spin)
+        batch_layout.addSpacing(15)
+        batch_layout.addWidget(QLabel(tr("Registo HTTP:")))
+        self.http_log_combo = QComboBox()
+        for level, label in (("off", tr("Desligado")), ("basic", tr("Básico")),
+                             ("headers", tr("Cabeçalhos")), ("full", tr("Completo"))):
+            self.http_log_combo.addItem(label, level)
+        self.http_log_combo.setCurrentIndex(
+            max(0, self.http_log_combo.findData(prefs.get_http_log_level())))
+        self.http_log_combo.setToolTip(
+            tr("Detalhe de http_log.txt (pedidos e respostas aos providers)."))
+        batch_layout.addWidget(self.http_log_combo)
+        batch_layout.addStretch()
+        layout.addLayout(batch_layout)
+        layout.addSpacing(10)
+
         # Prompt template
         prompt_grp = QGroupBox(tr("Prompt"))
         prompt_layout = QVBoxLayout()
@@ -414,6 +539,65 @@ class SettingsScreen:
 
         layout.addStretch()
 
+    # ---- Desempenho ----
+    def _build_metrics(self, parent):
+        layout = QVBoxLayout(parent)
+
+        info = QLabel(tr("Tempos dos últimos pedidos de cada modelo, do mais rápido para o "
+                         "mais lento. Tokens/s só conta as respostas em que o provider indica "
+                         "os tokens."))
+        info.setWordWrap(True)
+        layout.addWidget(info)
+
+        headers = [tr("Provedor"), tr("Modelo"), tr("Pedidos"), tr("Erros"),
+                   "p50", "p95", tr("1º byte"), tr("Ligação"), tr("Tokens/s")]
+        self.metrics_table = QTableWidget(0, len(headers))
+        self.metrics_table.setHorizontalHeaderLabels(headers)
+        self.metrics_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.horizontalHeader().setSectionResizeMode(
+            1, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.metrics_table)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        refresh_btn = QPushButton(tr("Atualizar"))
+        refresh_btn.clicked.connect(self._refresh_metrics)
+        btn_layout.addWidget(refresh_btn)
+        clear_btn = QPushButton(tr("Limpar"))
+        clear_btn.clicked.connect(self._clear_metrics)
+        btn_layout.addWidget(clear_btn)
+        layout.addLayout(btn_layout)
+
+        self._refresh_metrics()
+
+    def _refresh_metrics(self):
+        def ms(value):
+            return "—" if value is None else f"{value:.0f} ms"
+
+        stats = get_model_stats()
+        self.metrics_table.setRowCount(len(stats))
+        for row, entry in enumerate(stats):
+            tokens_per_s = entry['tokens_per_s']
+            values = [entry['provider'], entry['model'], str(entry['requests']),
+                      str(entry['errors']), ms(entry['p50_ms']), ms(entry['p95_ms']),
+                      ms(entry['ttfb_ms']), ms(entry['connect_ms']),
+                      "—" if tokens_per_s is None else f"{tokens_per_s:.0f}"]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col >= 2:
+                    item.setTextAlignment(
+                        Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.metrics_table.setItem(row, col, item)
+        self.metrics_table.resizeColumnsToContents()
+
+    def _clear_metrics(self):
+        reply = QMessageBox.question(self.app, tr("Limpar"),
+                                     tr("Apagar as métricas de todos os modelos?"))
+        if reply == QMessageBox.StandardButton.Yes:
+            clear_metrics()
+            self._refresh_metrics()
+
     def _open_api_key_instructions(self):
         provider = self.provider_combo.currentText()
         query = f"Como obter API key para o {provider}"
@@ -424,19 +608,34 @@ class SettingsScreen:
         """Return appropriate label for API key field based on provider."""
         if provider == "cloudflare":
             return "ACCOUNT_ID:API_TOKEN:"
+        if provider == "custom":
+            return tr("API Key (opcional):")
         return "API Key:"
 
+    def _llm_client(self, provider, key, model=None):
+        """Cliente para testes e listas de modelos.
+
+        No "custom" usa o servidor do formulário, ainda por gravar.
+        """
+        client = LLMClient(provider, key, model)
+        if provider == "custom" and hasattr(self, 'custom_url_entry'):
+            client.custom_endpoint = custom_endpoint_config(
+                self.custom_url_entry.text(), self.custom_path_entry.text(),
+                _parse_headers(self.custom_headers_entry.text()))
+        return client
+
     def _on_provider_change(self, provider):
         """Update key, model, label and fetch models when provider changes."""
         prefs = self.app.preferences
         self.key_label.setText(self._get_key_label(provider))
         self.key_entry.setText(prefs.get_llm_api_key(provider))
+        self.custom_grp.setVisible(provider == "custom")
 
         # Fetch models for the new provider and restore saved selection
         saved_model = prefs.get_llm_model(provider)
         key = self.key_entry.text().strip()
         try:
-            client = LLMClient(provider, key)
+            client = self._llm_client(provider, key)
             models = client.list_models()
             self.models_combo.clear()
             if models:
@@ -482,8 +681,8 @@ class SettingsScreen:
         try:
             # Save current selection before clearing
             current = self.models_combo.currentText()
-            client = LLMClient(prov, key)
-            models = client.list_models()
+            client = self._llm_client(prov, key)
+            models = client.list_models(refresh=True)
             if not models:
                 QMessageBox.warning(self.app, tr("Aviso"), tr("Nenhum modelo encontrado para este provedor."))
                 return
@@ -521,7 +720,7 @@ class SettingsScreen:
         key = self.key_entry.text().strip()
         model = self.models_combo.currentText().strip()
         try:
-            client = LLMClient(prov, key, model)
+            client = self._llm_client(prov, key, model)
             text = client.generate("Diz 'OK' se estás a funcionar.")
             QMessageBox.information(self.app, tr("LLM OK"), tr("Resposta: {0}...").format(text[:300]))
         except Exception as e:
@@ -529,68 +728,109 @@ class SettingsScreen:
 
     def _save(self):
         prefs = self.app.preferences
-        
-        # Language
-        if hasattr(self, 'language_combo'):
-            new_language = self.language_combo.currentData()
-            old_language = prefs.get_language()
-            
-            if new_language == 'system':
-                from .i18n import get_default_language
-                new_language_resolved = get_default_language()
-            else:
-                new_language_resolved = new_language
-            
-            if old_language != new_language:
-                prefs.set_language(new_language)
-                if old_language != 'system':
+        language_changed_to = None
+
+        fallbacks = []
+        if hasattr(self, 'race_check'):
+            fallbacks = [p.strip().lower() for p in self.race_fallbacks_entry.text().split(",")
+                         if p.strip()]
+            unknown = [p for p in fallbacks if p not in LLM_PROVIDERS]
+            if unknown:
+                QMessageBox.warning(
+                    self.app, tr("Aviso"),
+                    tr("Providers de reserva desconhecidos: {0}\nDisponíveis: {1}").format(
+                        ", ".join(unknown), ", ".join(LLM_PROVIDERS)))
+                return
+
+        # Todas as alterações numa única gravação atómica
+        with prefs.batch():
+            # Language
+            if hasattr(self, 'language_combo'):
+                new_language = self.language_combo.currentData()
+                old_language = prefs.get_language()
+
+                if new_language == 'system':
                     from .i18n import get_default_language
-                    old_language_resolved = get_default_language() if old_language == 'system' else old_language
+                    new_language_resolved = get_default_language()
                 else:
-                    old_language_resolved = get_default_language()
-                
-                if old_language_resolved != new_language_resolved:
-                    change_language(self.app, new_language_resolved)
-                    QMessageBox.information(
-                        self.app, 
-                        tr("Settings"),
-                        tr("Language changed. Restart to apply.")
-                    )
-        
-        # File
-        if hasattr(self, 'file_path_entry') and self.file_path_entry.text():
-            prefs.set_last_gift_file(self.file_path_entry.text())
-        # UI
-        if hasattr(self, 'main_width_spin'):
-            prefs.set_main_window_size_percent(
-                self.main_width_spin.value(),
-                self.main_height_spin.value()
-            )
-        if hasattr(self, 'expl_width_spin'):
-            prefs.set_explanation_window_size_percent(
-                self.expl_width_spin.value(),
-                self.expl_height_spin.value()
+                    new_language_resolved = new_language
+
+                if old_language != new_language:
+                    prefs.set_language(new_language)
+                    if old_language != 'system':
+                        from .i18n import get_default_language
+                        old_language_resolved = (get_default_language() if old_language == 'system'
+                                                 else old_language)
+                    else:
+                        old_language_resolved = get_default_language()
+
+                    if old_language_resolved != new_language_resolved:
+                        language_changed_to = new_language_resolved
+
+            # File
+            if hasattr(self, 'file_path_entry') and self.file_path_entry.text():
+                prefs.set_last_gift_file(self.file_path_entry.text())
+            # UI
+            if hasattr(self, 'main_width_spin'):
+                prefs.set_main_window_size_percent(
+                    self.main_width_spin.value(),
+                    self.main_height_spin.value()
+                )
+            if hasattr(self, 'expl_width_spin'):
+                prefs.set_explanation_window_size_percent(
+                    self.expl_width_spin.value(),
+                    self.expl_height_spin.value()
+                )
+            if hasattr(self, 'quick_test_spin'):
+                prefs.set_quick_test_questions(self.quick_test_spin.value())
+            # LLM
+            prov = self.provider_combo.currentText()
+            key = self.key_entry.text().strip()
+            model = self.models_combo.currentText().strip()
+            prefs.set_llm_provider(prov)
+            prefs.set_llm_api_key(prov, key)
+            if model:
+                prefs.set_llm_model(prov, model)
+            if hasattr(self, 'custom_url_entry'):
+                prefs.set_llm_custom_endpoint(
+                    self.custom_url_entry.text(), self.custom_path_entry.text(),
+                    _parse_headers(self.custom_headers_entry.text()))
+            if hasattr(self, 'prefetch_check'):
+                prefs.set_llm_prefetch(self.prefetch_check.isChecked())
+            if hasattr(self, 'batch_size_spin'):
+                prefs.set_llm_batch_size(self.batch_size_spin.value())
+            if hasattr(self, 'hf_wait_check'):
+                prefs.set_llm_hf_wait_for_model(self.hf_wait_check.isChecked())
+                prefs.set_llm_hf_warmup(self.hf_warmup_check.isChecked())
+            if hasattr(self, 'http_log_combo'):
+                prefs.set_http_log_level(self.http_log_combo.currentData())
+            if hasattr(self, 'race_check'):
+                prefs.set_llm_race(self.race_check.isChecked(), self.race_delay_spin.value(),
+                                   fallbacks)
+            # Prompt
+            prompt = self.prompt_text.toPlainText().strip()
+            if prompt:
+                prefs.set_llm_prompt_template(prompt)
+            # System prompt
+            system_prompt = self.system_prompt_text.toPlainText().strip()
+            if system_prompt:
+                prefs.set_llm_system_prompt(system_prompt)
+            # Image provider
+            if hasattr(self, 'image_provider_combo'):
+                image_provider = self.image_provider_combo.currentData()
+                prefs.set_image_provider(image_provider)
+
+        if prefs.write_error is not None:
+            QMessageBox.critical(
+                self.app, tr("Erro"),
+                tr("Não foi possível gravar as configurações:\n{0}").format(prefs.write_error))
+            return
+
+        if language_changed_to:
+            change_language(self.app, language_changed_to)
+            QMessageBox.information(
+                self.app,
+                tr("Settings"),
+                tr("Language changed. Restart to apply.")
             )
-        if hasattr(self, 'quick_test_spin'):
-            prefs.set_quick_test_questions(self.quick_test_spin.value())
-        # LLM
-        prov = self.provider_combo.currentText()
-        key = self.key_entry.text().strip()
-        model = self.models_combo.currentText().strip()
-        prefs.set_llm_provider(prov)
-        prefs.set_llm_api_key(prov, key)
-        if model:
-            prefs.set_llm_model(prov, model)
-        # Prompt
-        prompt = self.prompt_text.toPlainText().strip()
-        if prompt:
-            prefs.set_llm_prompt_template(prompt)
-        # System prompt
-        system_prompt = self.system_prompt_text.toPlainText().strip()
-        if system_prompt:
-            prefs.set_llm_system_prompt(system_prompt)
-        # Image provider
-        if hasattr(self, 'image_provider_combo'):
-            image_provider = self.image_provider_combo.currentData()
-            prefs.set_image_provider(image_provider)
         QMessageBox.information(self.app, tr("Guardado"), tr("Configurações guardadas com sucesso."))
@@ -0,0 +1,79 @@
+"""
+Single-flight: pedidos idênticos em simultâneo partilham uma só execução.
+
+SingleFlight.run(key, start) executa start() como uma task; quem chamar run()
+com a mesma chave enquanto essa task não termina junta-se a ela e recebe o
+mesmo resultado (ou a mesma exceção). Em streaming, cada participante recebe
+os deltas através do seu on_chunk; quem chega a meio recebe primeiro o texto já
+recebido, num só delta.
+
+Cancelar um participante não afeta os outros: a task só é cancelada (e o
+socket fechado) quando o último participante desiste. Não é seguro entre
+threads: cada event loop tem a sua instância.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class _Flight:
+    def __init__(self, streaming: bool):
+        self.task: Optional[asyncio.Task] = None
+        self.streaming = streaming
+        self.parts: List[str] = []
+        self.listeners: List[Callable[[str], None]] = []
+        self.waiters = 0
+
+    def publish(self, delta: str) -> None:
+        self.parts.append(delta)
+        for listener in list(self.listeners):
+            try:
+                listener(delta)
+            except Exception:
+                # Um participante com problemas deixa de receber deltas; o pedido dos outros
+                # continua.
+                self.listeners.remove(listener)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def run(self, key: Hashable, start: Callable[[Callable[[str], None]], Awaitable],
+                  on_chunk: Optional[Callable[[str], None]] = None):
+        """Resultado de start(publish), partilhado com as chamadas simultâneas com a mesma chave.
+
+        start recebe publish(delta), que entrega cada delta a todos os participantes
+        em streaming, e devolve o texto ou um objeto com .text (LLMAnswer). Um
+        participante com on_chunk que se junte a uma execução sem streaming recebe o
+        texto completo num só delta no fim.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(streaming=on_chunk is not None)
+            flight.task = asyncio.ensure_future(start(flight.publish))
+            flight.task.add_done_callback(lambda _task, k=key, f=flight: self._forget(k, f))
+        elif on_chunk is not None and flight.parts:
+            on_chunk("".join(flight.parts))
+        if on_chunk is not None and flight.streaming:
+            flight.listeners.append(on_chunk)
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if on_chunk is not None and on_chunk in flight.listeners:
+                flight.listeners.remove(on_chunk)
+            if flight.waiters == 0 and not flight.task.done():
+                # Ninguém espera pelo resultado: cancela o pedido e não o deixa ser reaproveitado.
+                self._forget(key, flight)
+                flight.task.cancel()
+        if on_chunk is not None and not flight.streaming:
+            on_chunk(getattr(result, 'text', result))
+        return result
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
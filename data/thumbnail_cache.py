@@ -0,0 +1,83 @@
+"""
+Cache persistente das miniaturas de imagens das explicações.
+
+Dois níveis: as miniaturas usadas recentemente ficam em memória (LRU até
+THUMBNAIL_MEMORY_CACHE_BYTES) e todas ficam em disco (data/disk_cache.py, um
+ficheiro por URL, LRU por tamanho), na pasta de dados da aplicação. Assim uma
+explicação revisitada, mesmo depois de reiniciar a aplicação ou sem rede,
+mostra as imagens de imediato: loadResource() serve-as sem pedidos.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .app_paths import get_cache_dir
+from .constants import THUMBNAIL_CACHE_MAX_BYTES, THUMBNAIL_CACHE_TTL, THUMBNAIL_MEMORY_CACHE_BYTES
+from .disk_cache import DiskCache
+
+
+class _MemoryLRU:
+    """URL -> bytes em memória, limitado em tamanho total (seguro entre threads)."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(url)
+            if data is not None:
+                self._items.move_to_end(url)
+            return data
+
+    def put(self, url: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(url, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[url] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_memory = _MemoryLRU(THUMBNAIL_MEMORY_CACHE_BYTES)
+_disk: Optional[DiskCache] = None
+_disk_lock = threading.Lock()
+
+
+def _get_disk_cache() -> DiskCache:
+    global _disk
+    with _disk_lock:
+        if _disk is None:
+            # As imagens já vêm comprimidas: guardadas tal como chegam.
+            _disk = DiskCache(get_cache_dir("thumbnails"), THUMBNAIL_CACHE_MAX_BYTES,
+                              THUMBNAIL_CACHE_TTL, compress_level=0)
+        return _disk
+
+
+def get_thumbnail(url: str) -> Optional[bytes]:
+    """Bytes da imagem em cache (memória e depois disco), ou None."""
+    if not url:
+        return None
+    data = _memory.get(url)
+    if data is None:
+        data = _get_disk_cache().get(url)
+        if data:
+            _memory.put(url, data)
+    return data or None
+
+
+def store_thumbnail(url: str, data: bytes) -> None:
+    if not url or not data:
+        return
+    _memory.put(url, data)
+    _get_disk_cache().set(url, data)
@@ -11,7 +11,6 @@ import time
 from pathlib import Path
 
 from PySide6.QtWidgets import QApplication, QMainWindow, QMessageBox
-from PySide6.QtCore import QThread, Signal
 
 sys.path.insert(0, str(Path(__file__).parent))
 # pylint: disable=wrong-import-position
@@ -20,8 +19,21 @@ from data.test_logger import TestLogger
 from data.preferences import Preferences
 from data.selection_screen import SelectionScreen
 from data.settings_screen import SettingsScreen
-from data.llm_client import LLMClient
+from data.llm_async import AsyncLLMClient, submit as submit_llm
+from data.llm_client import set_custom_endpoint
+from data.connection_prewarm import ConnectionPrewarmer, image_prewarm_urls, llm_prewarm_urls
+from data.llm_race import create_llm_client
+from data.explanation_jobs import answered_priority, start_test_prefetch
+from data.explanation_batch import build_explanation_prompt, question_prompt_section
+from data.http_log import set_http_log_level
 from data.explanation_viewer import show_explanation
+from data.explanation_cache import (
+    explanation_cache_key, get_cached_explanation, similar_cached_explanation, store_explanation)
+from data.explanation_render import (
+    StreamRenderer, answer_page_html, error_page_html, images_page_html, llm_debug_comment,
+    loading_page_html)
+from data.gui_workers import GuiDispatcher, ImagesWorker, LLMWorker
+from data.question_similarity import QuestionIndex
 from data.question_screen import QuestionScreen
 from data.results_screen import ResultsScreen
 from data.question_browser import QuestionBrowser
@@ -29,80 +41,6 @@ from data.i18n import initialize_translator, change_language, get_current_langua
 # pylint: enable=wrong-import-position
 
 
-class LLMWorker(QThread):
-    """Worker thread for LLM generation to avoid blocking UI."""
-    finished = Signal(str)
-    error = Signal(str)
-
-    def __init__(self, client, prompt):
-        super().__init__()
-        self.client = client
-        self.prompt = prompt
-        self._cancelled = False
-        # Ensure thread is deleted when finished
-        self.finished.connect(self.deleteLater)
-        self.error.connect(self.deleteLater)
-
-    def cancel(self):
-        self._cancelled = True
-        # Disconnect auto-delete to handle manually
-        self.finished.disconnect(self.deleteLater)
-        self.error.disconnect(self.deleteLater)
-        if self.isRunning():
-            if not self.wait(1000):  # Wait max 1 second
-                # If still running, terminate (last resort)
-                self.terminate()
-                self.wait()
-        # Ensure deletion
-        self.deleteLater()
-
-    def run(self):
-        try:
-            if self._cancelled:
-                return
-            result = self.client.generate(self.prompt)
-            if not self._cancelled:
-                self.finished.emit(result)
-        except Exception as e:
-            if not self._cancelled:
-                self.error.emit(str(e))
-
-
-class ImagesWorker(QThread):
-    """Worker thread for image search to avoid blocking UI."""
-    finished = Signal(int, object, float, str)  # job_id, groups, seconds, provider
-
-    def __init__(self, job_id: int, keywords_list: tuple[str, ...], provider: str):
-        super().__init__()
-        self.job_id = job_id
-        self.keywords_list = keywords_list
-        self.provider = provider
-        self._cancelled = False
-        self.finished.connect(self.deleteLater)
-
-    def cancel(self):
-        self._cancelled = True
-        # Disconnect auto-delete to handle manually
-        self.finished.disconnect(self.deleteLater)
-        if self.isRunning():
-            self.wait(200)
-        # Ensure deletion
-        self.deleteLater()
-
-    def run(self):
-        try:
-            if self._cancelled:
-                return
-            from data.image_enrichment import fetch_image_groups
-            groups, seconds = fetch_image_groups(self.keywords_list, provider=self.provider)
-            if not self._cancelled:
-                self.finished.emit(self.job_id, groups, float(seconds), self.provider)
-        except Exception:
-            # Treat unexpected exceptions as an empty result set
-            if not self._cancelled:
-                self.finished.emit(self.job_id, tuple((tuple(), 'worker_exception') for _ in self.keywords_list), 0.0, self.provider)
-
-
 class GIFT_TestApp(QMainWindow):
     """Aplicação de Prática de Testes GIFT"""
 
@@ -119,15 +57,21 @@ class GIFT_TestApp(QMainWindow):
 
         # Dados
         self.parser = None
+        self._similarity_index = None  # (parser, QuestionIndex), construído no primeiro uso
         self.logger = TestLogger()
         self.preferences = Preferences()
+        # Subscritores de preferências mexem em widgets: notificados sempre na thread da GUI.
+        self._gui_dispatcher = GuiDispatcher(self)
+        self.preferences.set_dispatcher(self._gui_dispatcher.call.emit)
         self.selected_questions = []
         self.current_question_index = 0
         self.user_answers = {}  # {question_number: answer_index}
         # Estado por-teste (não persiste entre testes)
         self.correct_me_if_wrong = False
         self.current_gift_file = None
-        self._llm_worker = None  # Keep reference to thread
+        self._llm_worker = None  # Keep reference to worker
+        self._prefetcher = None  # Pré-geração de explicações do teste em curso
+        self._prewarmer = ConnectionPrewarmer()  # Ligações prontas quando uma explicação é provável
 
         # Variáveis de UI que serão criadas pelos screens
         self.category_vars = {}
@@ -135,6 +79,16 @@ class GIFT_TestApp(QMainWindow):
         self.answer_var = None
         self.explain_question_var = None
 
+        # Reage a alterações do tamanho da janela sem reconstruir o ecrã
+        self.preferences.subscribe('ui', self._on_ui_preferences_changed)
+        set_http_log_level(self.preferences.get_http_log_level())
+        prefs = self.preferences
+        prefs.subscribe('llm.http_log_level',
+                        lambda _c: set_http_log_level(prefs.get_http_log_level()))
+        set_custom_endpoint(**prefs.get_llm_custom_endpoint())
+        prefs.subscribe('llm.custom',
+                        lambda _c: set_custom_endpoint(**prefs.get_llm_custom_endpoint()))
+
         # Tenta carregar último ficheiro usado
         last_file = self.preferences.get_last_gift_file()
         if last_file:
@@ -163,10 +117,22 @@ class GIFT_TestApp(QMainWindow):
         h = int(screen.height() * height_percent / 100)
         self.resize(w, h)
 
+    def _on_ui_preferences_changed(self, changes: dict):
+        """Reaplica o tamanho da janela quando muda nas preferências."""
+        if not hasattr(self, '_geometry_applied'):
+            return
+        if any(k.startswith('ui.main_window_') for k in changes):
+            self._apply_configured_geometry()
+
     def closeEvent(self, event):
         """Handle application close, ensuring threads are properly cleaned up."""
         if self._llm_worker and self._llm_worker.isRunning():
             self._llm_worker.cancel()
+        self._stop_explanation_prefetch()
+        self._prewarmer.stop()
+        if not self.preferences.flush():
+            message = tr("Não foi possível gravar as preferências:\n{0}")
+            QMessageBox.warning(self, tr("Aviso"), message.format(self.preferences.write_error))
         super().closeEvent(event)
 
     def load_questions(self, gift_file: str = None):
@@ -205,6 +171,8 @@ class GIFT_TestApp(QMainWindow):
 
     def show_selection_screen(self):
         """Mostra tela de seleção de categorias e número de perguntas."""
+        # Sair do teste (ou dos resultados) termina a pré-geração.
+        self._stop_explanation_prefetch()
         self.selection_screen = SelectionScreen(self)
         self.selection_screen.show()
 
@@ -234,7 +202,6 @@ class GIFT_TestApp(QMainWindow):
         c_layout.addWidget(apptitle_label)
         c_layout.addSpacing(8)
 
-
         # Grupo: O que este programa faz
         what_grp = QGroupBox(tr("O que o programa faz"))
         what_layout = QVBoxLayout()
@@ -314,6 +281,7 @@ class GIFT_TestApp(QMainWindow):
             return
         self.browser = QuestionBrowser(self, self.parser.questions)
         self.browser.show()
+        self._prewarm_connections()
 
     def start_quick_test(self):
         """Inicia um teste rápido com perguntas aleatórias de todas as categorias."""
@@ -329,10 +297,55 @@ class GIFT_TestApp(QMainWindow):
         self.current_question_index = 0
         self.user_answers = {}
         self.correct_me_if_wrong = False
+        self._start_explanation_prefetch()
+        self._prewarm_connections()
 
         # Mostra primeira pergunta
         self.show_question()
 
+    def _start_explanation_prefetch(self):
+        """Pré-gera em segundo plano as explicações das perguntas do teste."""
+        self._stop_explanation_prefetch()
+        self._prefetcher = start_test_prefetch(self.preferences, self.selected_questions)
+
+    def _stop_explanation_prefetch(self):
+        if self._prefetcher is not None:
+            self._prefetcher.cancel()
+            self._prefetcher = None
+
+    def on_question_answered(self, question, answer):
+        """Respostas erradas passam para a frente da fila de pré-geração."""
+        if self._prefetcher is None:
+            return
+        self._prefetcher.set_priority(question.number, answered_priority(question, answer))
+
+    def _prewarm_connections(self):
+        """Abre em segundo plano as ligações aos providers LLM e de imagens."""
+        prefs = self.preferences
+        self._prewarmer.trigger(
+            llm_prewarm_urls(prefs), image_prewarm_urls(prefs.get_image_provider()))
+
+    def _warm_up_llm(self, provider, model):
+        """Pede ao Hugging Face que carregue o modelo em segundo plano (opção nas Configurações)."""
+        key = self.preferences.get_llm_api_key(provider)
+        if provider == 'huggingface' and key and self.preferences.get_llm_hf_warmup():
+            # Uma falha fica no future: o pedido verdadeiro reporta o erro.
+            submit_llm(AsyncLLMClient(provider, key, model).warm_up())
+
+    def _build_explanation_prompt(self, question):
+        """Monta o prompt a partir do template + pergunta e opções."""
+        return build_explanation_prompt(
+            self.preferences.get_llm_prompt_template(), question_prompt_section(question))
+
+    def _similar_cached_explanation(self, question, provider, model, system_prompt):
+        """Explicação em cache de uma pergunta semelhante: (texto, pergunta, semelhança) ou None."""
+        if not self.parser:
+            return None
+        if self._similarity_index is None or self._similarity_index[0] is not self.parser:
+            self._similarity_index = (self.parser, QuestionIndex(self.parser.questions))
+        return similar_cached_explanation(self._similarity_index[1], question, provider, model,
+                                          system_prompt, self._build_explanation_prompt)
+
     def explain_question(self, question_obj=None, user_answer=None, user_was_correct=None):
         """Gera e mostra a explicação via LLM para a pergunta indicada.
 
@@ -384,37 +397,24 @@ class GIFT_TestApp(QMainWindow):
 
             qnum = str(question.number)
 
-        # Monta prompt a partir do template + pergunta e opções
-        template = self.preferences.get_llm_prompt_template()
-        prompt = template.strip()
-        prompt += "\n\nPergunta:"\
-                  f"\n{question.text}\n\nRespostas possíveis:"\
-                  + "\n".join([f"- {opt['text']}" for opt in question.options])
+        prompt = self._build_explanation_prompt(question)
 
         provider = self.preferences.get_llm_provider()
-        key = self.preferences.get_llm_api_key(provider)
         model = self.preferences.get_llm_model(provider)
 
-        # Show viewer immediately with loading state
-        loading_html = f"""
-        <div style='text-align:center; padding-top:50px; font-family:sans-serif; color:#666;'>
-            <h2>{tr("A gerar explicação")}...</h2>
-            <p>{tr("Aguarde enquanto o modelo processa a sua pergunta.")}.</p>
-            <p><i>{tr("Isto pode demorar alguns segundos.")}.</i></p>
-        </div>
-        """
-
-        # Open dialog and keep references
-        dialog, viewer_widget, images_viewer_widget, content_splitter, time_label, images_time_label, explain_btn, image_source_combo = show_explanation(
+        # Open dialog (immediately, with loading state) and keep references
+        (dialog, viewer_widget, images_viewer_widget, content_splitter, time_label,
+         images_time_label, explain_btn, regenerate_btn, image_source_combo) = show_explanation(
             self,
             tr("Explicação") + f": {qnum}",
-            loading_html,
+            loading_page_html(),
             question_text=question.text,
             question_options=question.options,
             metadata={'provider': provider, 'model': model},
             on_reexplain_callback=lambda p, m: generate_explanation(p, m),
             user_answer=user_answer,
-            user_was_correct=user_was_correct
+            user_was_correct=user_was_correct,
+            on_regenerate_callback=lambda p, m: generate_explanation(p, m, use_cache=False)
         )
 
         # Keep references
@@ -425,6 +425,7 @@ class GIFT_TestApp(QMainWindow):
         time_label_ref = [time_label]
         images_time_label_ref = [images_time_label]
         explain_btn_ref = [explain_btn]
+        regenerate_btn_ref = [regenerate_btn]
         image_source_combo_ref = [image_source_combo]
 
         keywords_list_ref: list[tuple[str, ...]] = [tuple()]
@@ -474,7 +475,6 @@ class GIFT_TestApp(QMainWindow):
             except Exception:
                 pass
 
-
         def _render_images_column_from_cached_groups():
             if not has_result_ref[0]:
                 return
@@ -524,38 +524,12 @@ class GIFT_TestApp(QMainWindow):
             try:
                 if images_viewer_ref[0] and hasattr(images_viewer_ref[0], 'setHtml'):
                     if show_images:
-                        images_with_style = f"""
-                        <!DOCTYPE html>
-                        <html>
-                        <head>
-                            <meta charset="UTF-8">
-                            <style>
-                                body {{
-                                    font-family: Arial, Helvetica, sans-serif;
-                                    line-height: 1.3;
-                                    margin: 0;
-                                    padding: 6px;
-                                    overflow-x: hidden;
-                                    text-align: center;
-                                }}
-                                img {{
-                                    max-width: 100%;
-                                    height: auto;
-                                }}
-                            </style>
-                        </head>
-                        <body>
-                            {images_html}
-                        </body>
-                        </html>
-                        """
-                        images_viewer_ref[0].setHtml(images_with_style)
+                        images_viewer_ref[0].setHtml(images_page_html(images_html))
                     else:
                         images_viewer_ref[0].setHtml("")
             except Exception:
                 pass
 
-
         def _start_images_fetch_for_current_source():
             """Fetches image groups in a background thread; never blocks the UI."""
             if not has_result_ref[0]:
@@ -635,9 +609,6 @@ class GIFT_TestApp(QMainWindow):
             worker.finished.connect(_on_images_finished)
             worker.start()
 
-
-
-
         # Refresh images when the user changes the image source combo (non-persistent)
         try:
             image_source_combo_ref[0].currentIndexChanged.connect(lambda *_: _start_images_fetch_for_current_source())
@@ -654,10 +625,47 @@ class GIFT_TestApp(QMainWindow):
         except Exception:
             pass
 
-
         start_time = time.time()
 
-        def on_success(result):
+        def _render_partial(text_html):
+            if has_result_ref[0]:
+                return
+            try:
+                if not dialog_ref[0] or not dialog_ref[0].isVisible() or not viewer_ref[0]:
+                    return
+                if hasattr(viewer_ref[0], 'setHtml'):
+                    viewer_ref[0].setHtml(answer_page_html(text_html))
+                    if hasattr(viewer_ref[0], 'set_loading'):
+                        viewer_ref[0].set_loading(False)
+                else:
+                    viewer_ref[0].setPlainText(re.sub(r"<[^>]+>", "", text_html))
+            except (RuntimeError, AttributeError):
+                pass
+
+        # Streaming: a resposta vai aparecendo enquanto chega.
+        stream = StreamRenderer(dialog_ref[0], _render_partial)
+
+        def on_partial(worker, delta):
+            if worker is not self._llm_worker or has_result_ref[0]:
+                return
+            if stream.add(delta):
+                # Tempo até ao primeiro token: é a latência que o utilizador sente.
+                try:
+                    if time_label_ref[0]:
+                        time_label_ref[0].setText(
+                            tr("A gerar") + f"... ({time.time() - start_time:.2f}s)")
+                except (RuntimeError, AttributeError):
+                    pass
+
+        def on_answer(worker, answer):
+            # Quem respondeu (em modo race, talvez um provider de reserva) vem na própria resposta.
+            key = explanation_cache_key(answer.provider, answer.model, answer.system_prompt, prompt)
+            store_explanation(key, answer.text)
+            if worker is self._llm_worker:
+                on_success(answer.text, answer)
+
+        def on_success(result, answer=None, from_cache=False, similar_to=None):
+
             # Check if dialog still exists and is visible
             try:
                 if not dialog_ref[0]:
@@ -673,6 +681,14 @@ class GIFT_TestApp(QMainWindow):
 
             # Update time label
             time_text = f"Tempo (resposta): {duration:.2f}s"
+            if similar_to is not None:
+                similar_text = tr(
+                    "(de uma pergunta semelhante: {0}, {1:.0%}; Regenerar gera uma nova)")
+                time_text += " " + similar_text.format(similar_to[0].number, similar_to[1])
+            elif from_cache:
+                time_text += " (cache)"
+            elif answer is not None and answer.provider != provider:
+                time_text += f" (via {answer.provider})"
             try:
                 if time_label_ref[0]:
                     time_label_ref[0].setText(time_text)
@@ -685,72 +701,22 @@ class GIFT_TestApp(QMainWindow):
             text_html, image_blocks, keywords_list = split_explanation_text_and_keywords(result)
 
             # Embed HTTP request/response details in an HTML comment (view-source only).
-            def _safe_html_comment_text(s: str) -> str:
-                if s is None:
-                    return ''
-                s = str(s)
-                # Avoid invalid sequences in HTML comments.
-                s = s.replace('--', '- -')
-                s = s.replace('\x00', '')
-                return s
-
-            llm_debug_comment = ''
-            try:
-                import json as _json
-                from data.image_enrichment import is_html_content
-
-                client = None
-                try:
-                    client = getattr(self._llm_worker, 'client', None)
-                except Exception:
-                    client = None
-
-                payload = {
-                    'provider': provider,
-                    'model': model,
-                    'request': None,
-                    'response': None,
-                }
-                if client is not None and getattr(client, 'last_http_exchange', None):
-                    ex = client.last_http_exchange
-                    if isinstance(ex, dict):
-                        payload['request'] = (ex.get('request') or None)
-                        payload['response'] = (ex.get('response') or None)
-
-                if not is_html_content(result):
-                    payload['plaintext_body'] = result
-
-                debug_json = _safe_html_comment_text(_json.dumps(payload, ensure_ascii=False))
-                llm_debug_comment = f'<!-- llm_http_debug: {debug_json} -->\n'
-            except Exception:
-                llm_debug_comment = ''
+            if answer is not None:
+                llm_debug = llm_debug_comment(
+                    result, answer.provider, answer.model, answer.http_exchange)
+            else:
+                llm_debug = llm_debug_comment(result, provider, model)
 
             keywords_list_ref[0] = keywords_list
             has_result_ref[0] = True
 
+            stream.stop()
+
             # Update viewer content
             try:
                 if viewer_ref[0] and hasattr(viewer_ref[0], 'setHtml'):  # QWebEngineView
                     # Re-apply style
-                    html_with_style = f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <meta charset="UTF-8">
-                        <style>
-                            body {{
-                                font-family: Arial, Helvetica, sans-serif;
-                                line-height: 1.6;
-                                padding: 10px;
-                            }}
-                        </style>
-                    </head>
-                    <body>
-                        {llm_debug_comment}{text_html}
-                    </body>
-                    </html>
-                    """
-                    viewer_ref[0].setHtml(html_with_style)
+                    viewer_ref[0].setHtml(answer_page_html(f"{llm_debug}{text_html}"))
                     try:
                         if hasattr(viewer_ref[0], 'set_loading'):
                             viewer_ref[0].set_loading(False)
@@ -765,10 +731,12 @@ class GIFT_TestApp(QMainWindow):
             # Kick off async image search after rendering the answer
             _start_images_fetch_for_current_source()
 
-            # Re-enable button
+            # Re-enable buttons
             try:
                 if explain_btn_ref[0]:
                     explain_btn_ref[0].setEnabled(True)
+                if regenerate_btn_ref[0]:
+                    regenerate_btn_ref[0].setEnabled(True)
             except:
                 pass
 
@@ -776,16 +744,11 @@ class GIFT_TestApp(QMainWindow):
             # Check if dialog still exists
             if not dialog_ref[0] or not dialog_ref[0].isVisible():
                 return
+            stream.stop()
 
-            error_html = f"""
-            <div style='color:red; padding:20px; font-family:sans-serif;'>
-                <h3>{tr("Erro na geração")}</h3>
-                <p>{err_msg}</p>
-            </div>
-            """
             try:
                 if viewer_ref[0] and hasattr(viewer_ref[0], 'setHtml'):
-                    viewer_ref[0].setHtml(error_html)
+                    viewer_ref[0].setHtml(error_page_html(err_msg))
                     try:
                         if hasattr(viewer_ref[0], 'set_loading'):
                             viewer_ref[0].set_loading(False)
@@ -815,24 +778,37 @@ class GIFT_TestApp(QMainWindow):
                 pass
             _apply_splitter_visibility(False)
 
-            # Re-enable button
+            # Re-enable buttons
             try:
                 if explain_btn_ref[0]:
                     explain_btn_ref[0].setEnabled(True)
+                if regenerate_btn_ref[0]:
+                    regenerate_btn_ref[0].setEnabled(True)
             except:
                 pass
 
         # Function to generate explanation
-        def generate_explanation(new_provider=None, new_model=None):
+        def generate_explanation(new_provider=None, new_model=None, use_cache=True):
             nonlocal provider, model, start_time
             if new_provider:
                 provider = new_provider
             if new_model:
                 model = new_model
             start_time = time.time()
-            key = self.preferences.get_llm_api_key(provider)
-            client = LLMClient(provider, key, model, self.preferences.get_llm_system_prompt())
-            self._llm_worker = LLMWorker(client, prompt)
+            system_prompt = self.preferences.get_llm_system_prompt()
+            if use_cache:
+                key = explanation_cache_key(provider, model, system_prompt, prompt)
+                cached = get_cached_explanation(key)
+                if cached:
+                    on_success(cached, from_cache=True)
+                    return
+                # Variante parafraseada já explicada: mostrada de imediato, sem a guardar para esta.
+                similar = self._similar_cached_explanation(question, provider, model, system_prompt)
+                if similar:
+                    on_success(similar[0], from_cache=True, similar_to=similar[1:])
+                    return
+            client = create_llm_client(self.preferences, provider, model, system_prompt)
+            self._llm_worker = LLMWorker(client, prompt, self._gui_dispatcher.call.emit)
             # Update time_label to loading
             try:
                 if time_label_ref[0]:
@@ -854,6 +830,7 @@ class GIFT_TestApp(QMainWindow):
                 pass
             keywords_list_ref[0] = tuple()
             has_result_ref[0] = False
+            stream.reset()
             _apply_splitter_visibility(False)
 
             # Per-pane loading indicator for the answer pane
@@ -862,7 +839,9 @@ class GIFT_TestApp(QMainWindow):
                     viewer_ref[0].set_loading(True, tr("A carregar"))
             except Exception:
                 pass
-            self._llm_worker.finished.connect(on_success)
+            worker = self._llm_worker
+            worker.partial.connect(lambda delta: on_partial(worker, delta))
+            worker.finished.connect(lambda answer: on_answer(worker, answer))
             self._llm_worker.error.connect(on_error)
             self._llm_worker.start()
 
@@ -883,6 +862,9 @@ class GIFT_TestApp(QMainWindow):
 
         # Start initial worker
         generate_explanation()
+        # Explicação em cache (sem pedido em curso): aquece o modelo para "Regenerar".
+        if not (self._llm_worker and self._llm_worker.isRunning()):
+            self._warm_up_llm(provider, model)
 
     def clear_history(self):
         """Limpa todo o histórico de testes."""
@@ -933,6 +915,8 @@ class GIFT_TestApp(QMainWindow):
         self.current_question_index = 0
         self.user_answers = {}
         self.correct_me_if_wrong = False
+        self._start_explanation_prefetch()
+        self._prewarm_connections()
 
         # Mostra primeira pergunta
         self.show_question()
@@ -963,6 +947,7 @@ class GIFT_TestApp(QMainWindow):
 
         question = self.selected_questions[self.current_question_index]
         self.user_answers[question.number] = answer
+        self.on_question_answered(question, answer)
 
         self.current_question_index += 1
         self.show_question()
@@ -982,6 +967,7 @@ class GIFT_TestApp(QMainWindow):
         """Mostra os resultados do teste."""
         self.results_screen = ResultsScreen(self)
         self.results_screen.show()
+        self._prewarm_connections()
 
 
 def main():
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark: urllib (ligação nova por pedido) vs pool keep-alive (data/http_pool.py).
+
+Arranca um servidor HTTPS local que imita um endpoint de chat completions
+(certificado auto-assinado gerado com openssl) e mede a latência de N pedidos
+com cada cliente. --connect-delay-ms simula o RTT extra de abrir ligações.
+"""
+
+import argparse
+import json
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Adicionar o diretório pai ao path para importar módulos locais
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from data.http_pool import ConnectionPool
+# pylint: enable=wrong-import-position
+
+RESPONSE = json.dumps({
+    "choices": [{"message": {"role": "assistant", "content": "Resposta de teste. " * 20}}]
+}).encode('utf-8')
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo são escritos em separado: sem isto o Nagle atrasa ~40ms.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if self.server.response_delay:
+            time.sleep(self.server.response_delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class _TLSServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, ssl_context, connect_delay, response_delay):
+        super().__init__(addr, _ChatHandler)
+        self.ssl_context = ssl_context
+        self.connect_delay = connect_delay
+        self.response_delay = response_delay
+        self.connections = 0
+
+    def finish_request(self, request, client_address):
+        # Handshake TLS na thread do pedido; o atraso imita o custo de uma ligação nova.
+        self.connections += 1
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        try:
+            request = self.ssl_context.wrap_socket(request, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+        super().finish_request(request, client_address)
+
+
+def _make_cert(directory: Path):
+    cert, key = directory / 'cert.pem', directory / 'key.pem'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', str(key), '-out', str(cert), '-days', '1',
+         '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1'],
+        check=True, capture_output=True)
+    return cert, key
+
+
+def _run(label, send, requests, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            send()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    per_thread = [requests // threads + (1 if i < requests % threads else 0)
+                  for i in range(threads)]
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in per_thread]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<22} total {total:7.3f}s  média {statistics.mean(latencies) * 1000:7.2f}ms  "
+          f"p50 {statistics.median(latencies) * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark do pool HTTP keep-alive contra um servidor HTTPS local')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Número de pedidos por cliente (default: 200)')
+    parser.add_argument('--threads', type=int, default=1, help='Pedidos concorrentes (default: 1)')
+    parser.add_argument('--connect-delay-ms', type=float, default=20.0,
+                        help='Atraso por ligação nova, simula RTT de rede (default: 20)')
+    parser.add_argument('--response-delay-ms', type=float, default=0.0,
+                        help='Atraso do servidor por resposta (default: 0)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = _make_cert(Path(tmp))
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(cert, key)
+        client_ctx = ssl.create_default_context(cafile=str(cert))
+
+        server = _TLSServer(('127.0.0.1', 0), server_ctx,
+                            args.connect_delay_ms / 1000, args.response_delay_ms / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"https://localhost:{server.server_address[1]}/v1/chat/completions"
+        messages = [{"role": "user", "content": "Olá"}]
+        body = json.dumps({"model": "bench", "messages": messages}).encode('utf-8')
+        headers = {"Content-Type": "application/json", "Authorization": "Bearer bench"}
+
+        def send_urllib():
+            req = urllib.request.Request(url, data=body, headers=headers)
+            with urllib.request.urlopen(req, timeout=30, context=client_ctx) as resp:
+                resp.read()
+
+        pool = ConnectionPool(ssl_context=client_ctx)
+
+        def send_pool():
+            status, _, _ = pool.request('POST', url, body=body, headers=headers, timeout=30)
+            assert status == 200
+
+        print(f"{args.requests} pedidos, {args.threads} thread(s), "
+              f"+{args.connect_delay_ms:g}ms por ligação nova\n")
+        server.connections = 0
+        t_urllib = _run('urllib (sem pool)', send_urllib, args.requests, args.threads)
+        conns_urllib = server.connections
+        server.connections = 0
+        t_pool = _run('http_pool (keep-alive)', send_pool, args.requests, args.threads)
+        conns_pool = server.connections
+        pool.clear()
+        server.shutdown()
+
+    print(f"\nLigações abertas: urllib {conns_urllib}, pool {conns_pool}")
+    print(f"Speedup: {t_urllib / t_pool:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos clientes LLM contra o servidor mock (util/mock_llm_server.py).
+
+Cada cenário mede latência (p50/p95/p99) e débito (pedidos/s) de um caminho do
+cliente, sem rede nem API keys:
+- sync: LLMClient.generate sequencial por provider (pool keep-alive);
+- stream: generate_stream, tempo até ao primeiro delta e total;
+- async: AsyncLLMClient com --concurrency pedidos em simultâneo;
+- 429: limite de pedidos no servidor, absorvido pelo rate limiter;
+- erros: --error-rate de respostas 500 com novas tentativas;
+- cancelamento: tempo entre cancelar (CancelToken / Future.cancel) e o pedido terminar.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Adicionar o diretório pai ao path para importar módulos locais
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from data.http_log import set_http_log_level
+from data.http_pool import CancelToken, RequestCancelled
+from data.llm_async import AsyncLLMClient, submit
+from data.llm_client import LLM_ENDPOINT_ENV, LLMClient, LLMError
+from data.provider_health import reset_provider_health
+from data.rate_limiter import reset_rate_limiters
+from util.mock_llm_server import start_mock_server
+# pylint: enable=wrong-import-position
+
+PROMPT = "Explica a resposta certa da pergunta de teste."
+# Provider -> (api_key, modelo); o mock aceita qualquer chave.
+PROVIDERS = {
+    "groq": ("bench", "mock-model"),
+    "gemini": ("bench", "mock-model"),
+    "huggingface": ("bench", "mock/model"),
+    "cloudflare": ("account:bench", "@cf/mock/model"),
+}
+
+
+def _client(provider: str) -> LLMClient:
+    api_key, model = PROVIDERS[provider]
+    return LLMClient(provider, api_key, model)
+
+
+def _report(label: str, latencies: list, total: float, extra: str = "") -> None:
+    if not latencies:
+        print(f"{label:<26} sem resultados {extra}")
+        return
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0]
+    print(f"{label:<26} p50 {p50 * 1000:8.2f}ms  p95 {p95 * 1000:8.2f}ms  p99 {p99 * 1000:8.2f}ms  "
+          f"{len(latencies) / total:8.1f} pedidos/s {extra}")
+
+
+def _timed(call, count: int) -> tuple:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+def bench_sync(requests: int) -> None:
+    for provider in PROVIDERS:
+        client = _client(provider)
+        latencies, total = _timed(lambda c=client: c.generate(PROMPT), requests)
+        _report(f"sync {provider}", latencies, total)
+
+
+def bench_stream(requests: int) -> None:
+    for provider in ("groq", "gemini", "cloudflare"):
+        client = _client(provider)
+        first, totals = [], []
+        start = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            seen = []
+
+            def on_chunk(_delta, t0=t0, seen=seen):
+                if not seen:
+                    seen.append(time.perf_counter() - t0)
+
+            client.generate_stream(PROMPT, on_chunk)
+            totals.append(time.perf_counter() - t0)
+            first.extend(seen)
+        elapsed = time.perf_counter() - start
+        _report(f"stream {provider} (1º)", first, elapsed)
+        _report(f"stream {provider} (total)", totals, elapsed)
+
+
+def bench_async(requests: int, concurrency: int) -> None:
+    import asyncio  # pylint: disable=import-outside-toplevel
+    api_key, model = PROVIDERS["groq"]
+    client = AsyncLLMClient("groq", api_key, model)
+    latencies = []
+
+    async def one(semaphore, i):
+        async with semaphore:
+            t0 = time.perf_counter()
+            # Prompts distintos: pedidos iguais em simultâneo seriam agrupados num só
+            # (single-flight).
+            await client.generate(f"{PROMPT} #{i}")
+            latencies.append(time.perf_counter() - t0)
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(one(semaphore, i) for i in range(requests)))
+
+    start = time.perf_counter()
+    submit(run()).result()
+    _report(f"async groq x{concurrency}", latencies, time.perf_counter() - start)
+
+
+def _with_retries(client: LLMClient, attempts: int, counters: dict) -> None:
+    for attempt in range(attempts):
+        try:
+            client.generate(PROMPT)
+            return
+        except LLMError as e:
+            counters[e.status_code] = counters.get(e.status_code, 0) + 1
+            if attempt == attempts - 1:
+                raise
+
+
+def bench_rate_limit(server, requests: int, threads: int) -> None:
+    server.rate_limit, server.rate_window = max(1, requests // 4), 0.5
+    server.rejected = 0
+    reset_rate_limiters()
+    reset_provider_health()
+    counters, failures, latencies = {}, [], []
+    lock = threading.Lock()
+
+    def worker(count):
+        client = _client("groq")
+        for _ in range(count):
+            t0 = time.perf_counter()
+            try:
+                _with_retries(client, 5, counters)
+            except LLMError as e:
+                failures.append(e)
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(requests // threads,)) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    _report(f"429 groq x{threads}", latencies, time.perf_counter() - start,
+            f"({server.rejected} respostas 429, {len(failures)} falhados)")
+    server.rate_limit = 0
+    reset_rate_limiters()
+
+
+def bench_errors(server, requests: int, error_rate: float) -> None:
+    server.error_rate = error_rate
+    reset_provider_health()
+    failures = []
+    client = _client("groq")
+    received = server.requests
+
+    def call():
+        try:
+            client.generate(PROMPT)  # com as novas tentativas do próprio cliente
+        except LLMError as e:
+            failures.append(e)
+
+    latencies, total = _timed(call, requests)
+    _report(f"erros {error_rate:.0%} + retry", latencies, total,
+            f"({server.requests - received - requests} novas tentativas, {len(failures)} falhados)")
+    server.error_rate = 0.0
+    reset_provider_health()
+
+
+def bench_cancel(server, requests: int) -> None:
+    latency = server.latency
+    server.latency = max(latency, 1.0)
+    # Síncrono: CancelToken a meio da espera pela resposta.
+    latencies = []
+    for _ in range(requests):
+        client = _client("groq")
+        client.cancel_token = CancelToken()
+        done = threading.Event()
+
+        def run(c=client, ev=done):
+            try:
+                c.generate(PROMPT)
+            except (RequestCancelled, LLMError):
+                pass
+            ev.set()
+
+        threading.Thread(target=run, daemon=True).start()
+        time.sleep(0.05)
+        t0 = time.perf_counter()
+        client.cancel_token.cancel()
+        done.wait(5)
+        latencies.append(time.perf_counter() - t0)
+    _report("cancelar sync (token)", latencies, sum(latencies) or 1)
+
+    # Assíncrono: Future.cancel() cancela a task e fecha o socket.
+    api_key, model = PROVIDERS["groq"]
+    client = AsyncLLMClient("groq", api_key, model)
+    latencies = []
+    for _ in range(requests):
+        future = submit(client.generate(PROMPT))
+        time.sleep(0.05)
+        t0 = time.perf_counter()
+        future.cancel()
+        while not future.done():
+            time.sleep(0.0005)
+        latencies.append(time.perf_counter() - t0)
+    _report("cancelar async (task)", latencies, sum(latencies) or 1)
+    server.latency = latency
+
+
+def main():
+    scenarios = ['sync', 'stream', 'async', '429', 'errors', 'cancel']
+    parser = argparse.ArgumentParser(
+        description='Benchmark dos clientes LLM contra o servidor mock local')
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Pedidos por cenário (default: 100)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Pedidos simultâneos no cenário async (default: 8)')
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help='Latência do servidor (default: 20)')
+    parser.add_argument('--jitter-ms', type=float, default=5.0,
+                        help='Variação da latência (default: 5)')
+    parser.add_argument('--token-delay-ms', type=float, default=1.0,
+                        help='Intervalo entre eventos SSE (default: 1)')
+    parser.add_argument('--error-rate', type=float, default=0.2,
+                        help='Fração de erros 500 no cenário de erros (default: 0.2)')
+    parser.add_argument('--scenarios', nargs='+', default=scenarios, choices=scenarios,
+                        help='Cenários a correr')
+    parser.add_argument('--http-log', default='off',
+                        help='Nível do registo HTTP durante o benchmark (default: off)')
+    args = parser.parse_args()
+
+    server = start_mock_server(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                               token_delay=args.token_delay_ms / 1000)
+    os.environ[LLM_ENDPOINT_ENV] = server.url
+    set_http_log_level(args.http_log)
+    print(f"Mock em {server.url}: latência {args.latency_ms:g}±{args.jitter_ms:g}ms, "
+          f"{args.requests} pedidos por cenário\n")
+
+    if 'sync' in args.scenarios:
+        bench_sync(args.requests)
+    if 'stream' in args.scenarios:
+        bench_stream(max(1, args.requests // 4))
+    if 'async' in args.scenarios:
+        bench_async(args.requests, args.concurrency)
+    if '429' in args.scenarios:
+        bench_rate_limit(server, args.requests, min(args.concurrency, args.requests))
+    if 'errors' in args.scenarios:
+        bench_errors(server, args.requests, args.error_rate)
+    if 'cancel' in args.scenarios:
+        bench_cancel(server, max(1, args.requests // 10))
+
+    server.shutdown()
+    print(f"\n{server.requests} pedidos recebidos pelo mock")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 import re
@@ -9,16 +10,20 @@ from typing import List, Dict, Any, Callable
 
 # Adicionar o diretório pai ao sys.path para encontrar os módulos data
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from data.llm_client import LLMClient, LLMError
+from data.llm_client import LLMClient, LLMError, set_custom_endpoint
+from data.llm_async import AsyncLLMClient, set_provider_concurrency
 from data.preferences import Preferences
+from data.http_log import set_http_log_level
+from data.constants import HTTP_LOG_LEVELS
 
 # ========================== 
 # CONSTANTES E CONFIGURAÇÕES GLOBAIS
 # ========================== 
 DEFAULT_BATCH_SIZE = 10
-DEFAULT_SLEEP_SECONDS = 10
+DEFAULT_SLEEP_SECONDS = 0  # o ritmo é gerido pelo cliente LLM (data/rate_limiter.py)
 DEFAULT_MAX_RETRIES = 3
 DEFAULT_INITIAL_SLEEP = 5
+DEFAULT_CONCURRENCY = 1
 ERROR_LOG_FILE = "gift2boolean_error.log"
 
 # ========================== 
@@ -112,6 +117,12 @@ def parse_gift_file(path: str) -> List[Dict[str, Any]]:
 # ========================== 
 # PROCESSAMENTO DE LOTES COM RETENTATIVAS
 # ========================== 
+def retry_sleep(error: LLMError, initial_sleep: int, attempt: int) -> int:
+    """Espera antes de nova tentativa. Num 429 o cliente LLM já aguarda o Retry-After/reset."""
+    if error.status_code == 429:
+        return 0
+    return initial_sleep * (2 ** attempt)
+
 def process_batch_with_retries(llm_client: LLMClient, batch_prompt: str, max_retries: int, initial_sleep: int, parse_func: Callable) -> List[Dict[str, Any]]:
     for attempt in range(max_retries):
         try:
@@ -134,15 +145,66 @@ def process_batch_with_retries(llm_client: LLMClient, batch_prompt: str, max_ret
             print(f" {error_message}")
             log_error(error_message)
             if attempt < max_retries - 1:
-                sleep_time = initial_sleep * (2 ** attempt)
-                print(f"A aguardar {sleep_time} segundos antes de tentar novamente...")
-                time.sleep(sleep_time)
+                sleep_time = retry_sleep(e, initial_sleep, attempt)
+                if sleep_time:
+                    print(f"A aguardar {sleep_time} segundos antes de tentar novamente...")
+                    time.sleep(sleep_time)
             else:
                 log_error(f"Lote falhou após {max_retries} tentativas.\n--- PROMPT ---\n{batch_prompt}\n----------")
                 print(f"[ERRO FATAL] O lote falhou após {max_retries} tentativas. Verifique {ERROR_LOG_FILE}.")
                 return []
     return []
 
+async def process_batch_with_retries_async(llm_client: AsyncLLMClient, batch_prompt: str,
+                                           max_retries: int, initial_sleep: int,
+                                           parse_func: Callable,
+                                           label: str) -> List[Dict[str, Any]]:
+    """Versão assíncrona de process_batch_with_retries (vários lotes em simultâneo)."""
+    for attempt in range(max_retries):
+        try:
+            output_text = await llm_client.generate(batch_prompt)
+            if not output_text or not output_text.strip():
+                raise LLMError("Resposta do modelo estava vazia.")
+
+            parsed = parse_func(output_text)
+
+            if not parsed:
+                error_detail = "Resposta do modelo inválida ou vazia após parsing."
+                log_error(f"Erro no Lote: {error_detail}\n--- PROMPT ---\n{batch_prompt}\n--- RESPOSTA ---\n{output_text}\n----------")
+                raise LLMError(error_detail)
+
+            return parsed
+        except LLMError as e:
+            error_message = f"Erro na tentativa {attempt + 1}: {e}"
+            print(f"{label} {error_message}")
+            log_error(error_message)
+            if attempt < max_retries - 1:
+                await asyncio.sleep(retry_sleep(e, initial_sleep, attempt))
+            else:
+                log_error(f"Lote falhou após {max_retries} tentativas.\n--- PROMPT ---\n{batch_prompt}\n----------")
+                print(f"{label} [ERRO FATAL] O lote falhou após {max_retries} tentativas. "
+                      f"Verifique {ERROR_LOG_FILE}.")
+                return []
+    return []
+
+async def run_batches_concurrently(args: argparse.Namespace, llm_client: LLMClient,
+                                   batches: List[List[Dict[str, Any]]],
+                                   build_prompt_func: Callable, parse_output_func: Callable,
+                                   on_batch_done: Callable):
+    """Envia todos os lotes em paralelo, até args.concurrency pedidos em curso."""
+    client = AsyncLLMClient(llm_client.provider, llm_client.api_key, llm_client.model,
+                            llm_client.system_prompt)
+    set_provider_concurrency(client.provider, args.concurrency)
+
+    async def run_one(index: int, batch: List[Dict[str, Any]]):
+        parsed = await process_batch_with_retries_async(
+            client, build_prompt_func(batch), args.max_retries, args.initial_sleep,
+            parse_output_func, f"[Lote {index}]")
+        if parsed:
+            on_batch_done(batch, parsed)
+
+    await asyncio.gather(*(run_one(i + 1, batch) for i, batch in enumerate(batches)))
+
 # ========================== 
 # LÓGICA DO MODO "GENERATE"
 # ========================== 
@@ -219,11 +281,11 @@ def run_generate_mode(args: argparse.Namespace, llm_client: LLMClient):
         all_items=all_questions,
         item_type="perguntas",
         progress_file=progress_file,
-        output_file_header="Categoria\tID Pergunta\tFrase Gerada\tV/F\tFrase Correcta\n",
+        output_file_header=["Categoria", "ID Pergunta", "Frase Gerada", "V/F", "Frase Correcta"],
         build_prompt_func=build_generate_prompt,
         parse_output_func=parse_generate_output,
-        write_item_func=lambda f, item: f.write(
-            f"{all_questions[item['id']-1]['categoria']}\t{item['id']}\t{item['frase']}\t{item['vf']}\t{item['correcta']}\n"
+        write_item_func=lambda writer, question, item: writer.writerow(
+            [question['categoria'], item['id'], item['frase'], item['vf'], item['correcta']]
         )
     )
 
@@ -365,7 +427,46 @@ def main_processing_loop(
 
             total_items = len(all_items)
             processed_in_this_session = 0
-            
+
+            def save_batch_results(batch, parsed_results):
+                nonlocal processed_in_this_session
+                batch_ids_processed = set()
+                parsed_map = {item['id']: item for item in parsed_results}
+
+                for original_item in batch:
+                    item_id = original_item['id']
+                    if item_id in parsed_map:
+                        data_to_write = (original_item.get(output_data_key) if output_data_key
+                                         else original_item)
+                        write_item_func(writer, data_to_write, parsed_map[item_id])
+                        batch_ids_processed.add(item_id)
+
+                f_out.flush()
+                os.fsync(f_out.fileno())
+
+                processed_ids.update(batch_ids_processed)
+                processed_in_this_session += len(batch_ids_processed)
+
+                with open(progress_file, "w", encoding="utf-8") as pf:
+                    json.dump({"output_file": args.output_file,
+                               "processed_item_ids": list(processed_ids)}, pf, indent=2)
+
+            if args.concurrency > 1:
+                batches = [items_to_process[i:i + args.batch_size]
+                           for i in range(0, len(items_to_process), args.batch_size)]
+                print(f"A processar {len(batches)} lotes com até {args.concurrency} pedidos "
+                      f"em simultâneo.")
+
+                def on_batch_done(batch, parsed_results):
+                    save_batch_results(batch, parsed_results)
+                    elapsed_time = time.time() - start_time
+                    print(f"Lote guardado ({len(processed_ids)} / {total_items} {item_type}) | "
+                          f"Decorrido: {format_time(elapsed_time)}")
+
+                asyncio.run(run_batches_concurrently(args, llm_client, batches, build_prompt_func,
+                                                     parse_output_func, on_batch_done))
+                items_to_process = []
+
             for i in range(0, len(items_to_process), args.batch_size):
                 batch = items_to_process[i:i + args.batch_size]
                 
@@ -384,24 +485,7 @@ def main_processing_loop(
                 parsed_results = process_batch_with_retries(llm_client, batch_prompt, args.max_retries, args.initial_sleep, parse_output_func)
                 
                 if parsed_results:
-                    batch_ids_processed = set()
-                    parsed_map = {item['id']: item for item in parsed_results}
-                    
-                    for original_item in batch:
-                        item_id = original_item['id']
-                        if item_id in parsed_map:
-                            data_to_write = original_item.get(output_data_key) if output_data_key else original_item
-                            write_item_func(writer, data_to_write, parsed_map[item_id])
-                            batch_ids_processed.add(item_id)
-                    
-                    f_out.flush()
-                    os.fsync(f_out.fileno())
-
-                    processed_ids.update(batch_ids_processed)
-                    processed_in_this_session += len(batch_ids_processed)
-
-                    with open(progress_file, "w", encoding="utf-8") as pf:
-                        json.dump({"output_file": args.output_file, "processed_item_ids": list(processed_ids)}, pf, indent=2)
+                    save_batch_results(batch, parsed_results)
                     print(f" Lote processado e guardado com sucesso.")
 
                 if i + args.batch_size < len(items_to_process) and args.sleep > 0:
@@ -430,9 +514,19 @@ def main():
     parent_parser.add_argument("--provider", default=prefs.get_llm_provider(), help=f"Provedor LLM (default: {prefs.get_llm_provider()})")
     parent_parser.add_argument("--model", help="Modelo a usar (sobrescreve o guardado nas preferências).")
     parent_parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE, help=f"Nº de itens por lote (default: {DEFAULT_BATCH_SIZE})")
-    parent_parser.add_argument("--sleep", type=int, default=DEFAULT_SLEEP_SECONDS, help=f"Segundos de espera entre lotes (default: {DEFAULT_SLEEP_SECONDS})")
+    parent_parser.add_argument("--sleep", type=int, default=DEFAULT_SLEEP_SECONDS,
+                               help="Segundos de espera extra entre lotes; o ritmo do provider "
+                                    "já é respeitado automaticamente "
+                                    f"(default: {DEFAULT_SLEEP_SECONDS})")
     parent_parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES, help=f"Nº máximo de retentativas por lote (default: {DEFAULT_MAX_RETRIES})")
     parent_parser.add_argument("--initial-sleep", type=int, default=DEFAULT_INITIAL_SLEEP, help=f"Espera inicial antes da primeira retentativa (default: {DEFAULT_INITIAL_SLEEP})")
+    parent_parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                               help="Nº de lotes enviados em simultâneo; >1 ignora --sleep "
+                                    f"(default: {DEFAULT_CONCURRENCY})")
+    parent_parser.add_argument("--http-log", choices=HTTP_LOG_LEVELS,
+                               default=prefs.get_http_log_level(),
+                               help="Detalhe de http_log.txt "
+                                    f"(default: {prefs.get_http_log_level()})")
 
     # --- Modo Generate ---
     parser_generate = subparsers.add_parser('generate', parents=[parent_parser], help="Gera frases V/F a partir de um ficheiro GIFT.")
@@ -445,20 +539,15 @@ def main():
     parser_validate.add_argument("output_file", help="Caminho para o ficheiro de frases validadas de saída.")
 
     args = parser.parse_args()
+    set_http_log_level(args.http_log)
 
-    print(f"DEBUG: args.provider = {args.provider}")
-    print(f"DEBUG: prefs.get_llm_provider() = {prefs.get_llm_provider()}")
     provider = args.provider
-    print(f"DEBUG: provider (after args assignment) = {provider}")
-
     api_key = prefs.get_llm_api_key(provider)
-    
-    print(f"DEBUG: args.model = {args.model}")
-    print(f"DEBUG: prefs.get_llm_model(provider) = {prefs.get_llm_model(provider)}")
+    has_access = prefs.has_llm_access(provider)
+    set_custom_endpoint(**prefs.get_llm_custom_endpoint())
     model = args.model or prefs.get_llm_model(provider)
-    print(f"DEBUG: model (after args assignment) = {model}")
 
-    if not api_key:
+    if not has_access:
         print(f"Erro: A API key para '{provider}' não está definida nas preferências (data/preferences.json).")
         sys.exit(1)
 
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita as APIs dos providers LLM, para testes e benchmarks
+sem API keys nem rede.
+
+Fala os formatos usados por data/llm_client.py:
+- chat/completions OpenAI-compatível (Groq, Mistral, Perplexity, OpenRouter),
+  com e sem streaming (SSE terminado por [DONE]);
+- Gemini generateContent / streamGenerateContent?alt=sse;
+- Hugging Face inference (/models/<modelo>);
+- Cloudflare Workers AI (/client/v4/accounts/<id>/ai/run/<modelo>);
+- listas de modelos (GET .../models).
+
+Latência até ao primeiro byte, ritmo do streaming, taxa de erros, um limite de
+pedidos por janela (429 com Retry-After e cabeçalhos x-ratelimit-*) e o tempo de
+carregamento de um modelo Hugging Face "frio" (503 com estimated_time) são
+configuráveis. O cliente é apontado para o servidor com a variável de ambiente
+GIFTTEST_LLM_ENDPOINT:
+
+    python util/mock_llm_server.py --port 8765 --latency-ms 300
+    GIFTTEST_LLM_ENDPOINT=http://127.0.0.1:8765 python util/test_llm_models.py ...
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+DEFAULT_PORT = 8765
+_WORDS = ("A ", "resposta ", "certa ", "é ", "a ", "segunda, ", "porque ", "o ", "enunciado ",
+          "refere ")
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo são escritos em separado: sem isto o Nagle atrasa ~40ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- Respostas ---
+    def _send_json(self, status: int, payload, headers: Optional[dict] = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, events, done_marker: bool, headers: dict) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        payloads = [f"data: {json.dumps(event)}\n\n" for event in events]
+        if done_marker:
+            payloads.append("data: [DONE]\n\n")
+        try:
+            for i, payload in enumerate(payloads):
+                if i and self.server.token_delay:
+                    time.sleep(self.server.token_delay)
+                data = payload.encode('utf-8')
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass  # O cliente cancelou e fechou a ligação
+
+    # --- Pedidos ---
+    def do_GET(self):  # pylint: disable=invalid-name
+        path = self.path.split('?', 1)[0]
+        if not path.rstrip('/').endswith('/models'):
+            self._send_json(404, {"error": {"message": f"Caminho desconhecido: {path}"}})
+            return
+        model = self.server.model
+        if path.startswith('/api/'):
+            # Hugging Face Hub
+            self._send_json(200, [{"id": model, "pipeline_tag": "text-generation"}])
+            return
+        self._send_json(200, {
+            "data": [{"id": model, "owned_by": "mock"}],
+            "models": [{"name": f"models/{model}",
+                        "supportedGenerationMethods": ["generateContent"]}],
+            "result": [{"name": model}],
+            "success": True,
+        })
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "JSON inválido"}})
+            return
+        self.server.count_request()
+
+        allowed, limit_headers = self.server.take_rate_limit()
+        if not allowed:
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)"}}, limit_headers)
+            return
+        if self.server.latency:
+            jitter = random.uniform(-self.server.jitter, self.server.jitter)
+            time.sleep(max(0.0, self.server.latency + jitter))
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self._send_json(self.server.error_status,
+                            {"error": {"message": "Erro simulado (mock)"}}, limit_headers)
+            return
+
+        path = self.path.split('?', 1)[0]
+        words = list(_WORDS) * max(1, self.server.tokens // len(_WORDS))
+        text = "".join(words).strip()
+        # Contagem de tokens no formato de cada provider (uma "palavra" = um token).
+        usage = {"prompt_tokens": length // 4, "completion_tokens": len(words)}
+        gemini_usage = {"promptTokenCount": length // 4, "candidatesTokenCount": len(words)}
+        if path.endswith(':streamGenerateContent'):
+            events = [{"candidates": [{"content": {"parts": [{"text": w}], "role": "model"}}]}
+                      for w in words]
+            events[-1]["usageMetadata"] = gemini_usage
+            self._send_stream(events, False, limit_headers)
+        elif path.endswith(':generateContent'):
+            content = {"parts": [{"text": text}], "role": "model"}
+            self._send_json(200, {"candidates": [{"content": content}],
+                                  "usageMetadata": gemini_usage}, limit_headers)
+        elif '/ai/run/' in path:
+            if request.get('stream'):
+                events = [{"response": w} for w in words] + [{"response": "", "usage": usage}]
+                self._send_stream(events, True, limit_headers)
+            else:
+                self._send_json(200, {"success": True, "errors": [],
+                                      "result": {"response": text, "usage": usage}},
+                                limit_headers)
+        elif path.endswith('/chat/completions') or path.endswith('/completions'):
+            if request.get('stream'):
+                events = [{"choices": [{"index": 0, "delta": {"content": w}}]} for w in words]
+                events.append({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                               "usage": usage})
+                self._send_stream(events, True, limit_headers)
+            else:
+                self._send_json(200, {
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                }, limit_headers)
+        elif re.search(r'/models/.+', path):
+            loading = self.server.take_hf_loading()
+            if loading:
+                model_id = path.split('/models/', 1)[1]
+                self._send_json(503, {"error": f"Model {model_id} is currently loading",
+                                      "estimated_time": loading})
+                return
+            self._send_json(200, [{"generated_text": text}], limit_headers)
+        else:
+            self._send_json(404, {"error": {"message": f"Caminho desconhecido: {path}"}})
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Servidor mock; os atributos podem ser alterados com o servidor a correr."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, addr: Tuple[str, int], latency: float = 0.0, jitter: float = 0.0,
+                 token_delay: float = 0.0, tokens: int = 40, error_rate: float = 0.0,
+                 error_status: int = 500,
+                 rate_limit: int = 0, rate_window: float = 60.0, model: str = "mock-model",
+                 hf_load_time: float = 0.0, verbose: bool = False):
+        super().__init__(addr, _MockHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.model = model
+        self.hf_load_time = hf_load_time
+        self.verbose = verbose
+        self.requests = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._hf_ready_at: Optional[float] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def take_hf_loading(self) -> float:
+        """Segundos até o modelo Hugging Face "carregar" (desde o primeiro pedido); 0 se pronto."""
+        if not self.hf_load_time:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            if self._hf_ready_at is None:
+                self._hf_ready_at = now + self.hf_load_time
+            return max(0.0, self._hf_ready_at - now)
+
+    def take_rate_limit(self) -> Tuple[bool, dict]:
+        """Janela fixa de rate_window segundos com rate_limit pedidos (0 = sem limite)."""
+        if not self.rate_limit:
+            return True, {}
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.rate_window:
+                self._window_start, self._window_count = now, 0
+            reset = max(0.0, self.rate_window - (now - self._window_start))
+            allowed = self._window_count < self.rate_limit
+            if allowed:
+                self._window_count += 1
+            else:
+                self.rejected += 1
+            headers = {
+                'x-ratelimit-limit-requests': str(self.rate_limit),
+                'x-ratelimit-remaining-requests': str(self.rate_limit - self._window_count),
+                'x-ratelimit-reset-requests': f"{reset:.3f}s",
+            }
+            if not allowed:
+                headers['retry-after'] = f"{reset:.3f}"
+        return allowed, headers
+
+
+def start_mock_server(host: str = '127.0.0.1', port: int = 0, **options) -> MockLLMServer:
+    """Arranca o servidor numa thread em segundo plano (port=0 escolhe uma porta livre)."""
+    server = MockLLMServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Servidor local que imita as APIs dos providers LLM')
+    parser.add_argument('--host', default='127.0.0.1', help='Endereço (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'Porta (default: {DEFAULT_PORT})')
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='Espera até ao primeiro byte (default: 0)')
+    parser.add_argument('--jitter-ms', type=float, default=0.0,
+                        help='Variação aleatória da latência (default: 0)')
+    parser.add_argument('--token-delay-ms', type=float, default=0.0,
+                        help='Intervalo entre eventos no streaming (default: 0)')
+    parser.add_argument('--tokens', type=int, default=40,
+                        help='Palavras por resposta (default: 40)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fração de pedidos com erro (default: 0)')
+    parser.add_argument('--error-status', type=int, default=500,
+                        help='Estado HTTP dos erros (default: 500)')
+    parser.add_argument('--rate-limit', type=int, default=0,
+                        help='Pedidos aceites por janela; os restantes recebem 429 '
+                             '(default: 0 = sem limite)')
+    parser.add_argument('--rate-window', type=float, default=60.0,
+                        help='Janela do limite, segundos (default: 60)')
+    parser.add_argument('--hf-load-time', type=float, default=0.0,
+                        help='Segundos que o modelo Hugging Face demora a "carregar" '
+                             '(503; default: 0)')
+    parser.add_argument('--verbose', action='store_true', help='Mostra cada pedido')
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        (args.host, args.port), latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+        token_delay=args.token_delay_ms / 1000, tokens=args.tokens, error_rate=args.error_rate,
+        error_status=args.error_status, rate_limit=args.rate_limit, rate_window=args.rate_window,
+        hf_load_time=args.hf_load_time, verbose=args.verbose)
+    print(f"Mock LLM em {server.url} (GIFTTEST_LLM_ENDPOINT={server.url}); Ctrl+C para terminar")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n{server.requests} pedidos, {server.rejected} rejeitados com 429")
+
+
+if __name__ == '__main__':
+    main()
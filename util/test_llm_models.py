@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
 """
 Script para testar todos os modelos de todos os providers e gerar relatório HTML.
+
+Os modelos são testados em paralelo (cliente assíncrono, com limite global e
+por provider); os resultados ficam em llm_tests_cache.json e uma nova execução
+só repete os modelos que falharam ou cujo teste já é antigo (--full repete
+todos). O relatório llm_tests.html é atualizado à medida que os testes terminam.
 """
 
 import argparse
+import asyncio
+import json
+import os
 import sys
+import tempfile
 import time
 from pathlib import Path
 
@@ -12,122 +21,175 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 # pylint: disable=wrong-import-position
-from data.llm_client import LLMClient, LLMError
+from data.llm_async import AsyncLLMClient, get_provider_concurrency, set_provider_concurrency
+from data.llm_client import LLMError, set_custom_endpoint
 from data.preferences import Preferences
+from data.constants import DEFAULT_LLM_TIMEOUT, LLM_PROVIDERS
 # pylint: enable=wrong-import-position
 
 
-def test_all_models(limit_providers=None):
-    """Testa todos os modelos de todos os providers."""
-    prefs = Preferences()
+TEST_PROMPT = "Summarize in 3 bullets your functionalities and what makes you stand out as a specific version of a language model compared to others."
+OUTPUT_DIR = Path(__file__).resolve().parent.parent
+REPORT_PATH = OUTPUT_DIR / "llm_tests.html"
+# Resultados anteriores (por "provider|modelo", com tested_at) para re-execuções incrementais
+CACHE_PATH = OUTPUT_DIR / "llm_tests_cache.json"
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_AGE_HOURS = 24
+# Intervalo mínimo entre reescritas do relatório HTML durante os testes (segundos)
+REPORT_INTERVAL = 2.0
+
+
+def _load_cache():
+    try:
+        with CACHE_PATH.open('r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    try:
+        fd, tmp = tempfile.mkstemp(dir=CACHE_PATH.parent, prefix=".llm_tests_cache-", suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, CACHE_PATH)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar {CACHE_PATH}: {e}")
+
+
+def _error_message(e):
+    if isinstance(e, LLMError) and e.status_code is not None:
+        return f"Status Code: {e.status_code}\nHeaders: {e.headers}\nBody: {e.body}"
+    return str(e) or type(e).__name__
+
+
+async def _probe(provider, api_key, model_info, timeout):
+    """Testa um modelo; devolve o resultado no formato do relatório."""
+    model_id = model_info.get('id', '')
+    result = {
+        'provider': provider,
+        'model': model_id,
+        'description': model_info.get('description', ''),
+        'response_time': 0,
+        'response_size': 0,
+        'success': False,
+    }
+    client = AsyncLLMClient(provider=provider, api_key=api_key, model=model_id)
+    start_time = time.perf_counter()
+    try:
+        # timeout é o tempo de leitura: a espera pela vez no provider e no rate limiter não conta.
+        response = await client.generate(TEST_PROMPT, timeout)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        result['response'] = f"Erro: {_error_message(e)}"
+    else:
+        result.update(response_time=round(time.perf_counter() - start_time, 2),
+                      response_size=len(response), response=response, success=True)
+    result['tested_at'] = time.time()
+    return result
+
+
+async def _list_models(provider, api_key, system_prompt):
+    try:
+        models = await AsyncLLMClient(provider, api_key, system_prompt=system_prompt).list_models(refresh=True)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"  Erro ao obter modelos para {provider}: {e}")
+        return []
+    if not models:
+        print(f"  Nenhum modelo encontrado para {provider}")
+    return models or []
+
+
+async def _probe_all(providers, api_keys, system_prompt, workers, timeout, max_age, cache, on_progress):
+    model_lists = await asyncio.gather(*(_list_models(p, api_keys[p], system_prompt) for p in providers))
+
+    results = {}  # "provider|modelo" -> resultado, pela ordem das listas
+    pending = []
+    now = time.time()
+    for provider, models in zip(providers, model_lists):
+        for model_info in models:
+            key = f"{provider}|{model_info.get('id', '')}"
+            cached = cache.get(key)
+            # Só os sucessos recentes são reaproveitados; falhas e resultados antigos são repetidos.
+            if cached and cached.get('success') and now - cached.get('tested_at', 0) < max_age:
+                results[key] = cached
+            else:
+                results[key] = None
+                pending.append((key, provider, model_info))
+    print(f"{len(pending)} modelos a testar, {len(results) - len(pending)} reaproveitados da cache")
+
+    workers_semaphore = asyncio.Semaphore(workers)
+    provider_semaphores = {p: asyncio.Semaphore(get_provider_concurrency(p)) for p in providers}
+    remaining = [len(pending)]
+
+    async def run(key, provider, model_info):
+        # Primeiro a vez no provider (o limite do cliente assíncrono), só depois um
+        # worker do pool global: um provider saturado não ocupa workers em espera.
+        async with provider_semaphores[provider], workers_semaphore:
+            result = await _probe(provider, api_keys[provider], model_info, timeout)
+        results[key] = cache[key] = result
+        remaining[0] -= 1
+        if result['success']:
+            print(f"  ✓ {provider} {result['model']}: {result['response_time']}s, {result['response_size']} chars")
+        else:
+            print(f"  ✗ {provider} {result['model']}: {result['response'].splitlines()[0][:200]}")
+        on_progress([r for r in results.values() if r is not None], remaining[0])
 
-    # Obter system prompt configurado
-    system_prompt = prefs.get_llm_system_prompt()
+    await asyncio.gather(*(run(*job) for job in pending))
+    return [r for r in results.values() if r is not None]
 
-    # Pergunta de teste
-    test_prompt = "Summarize in 3 bullets your functionalities and what makes you stand out as a specific version of a language model compared to others."
 
-    model_results = []
+def test_all_models(limit_providers=None, workers=DEFAULT_WORKERS, timeout=DEFAULT_LLM_TIMEOUT,
+                    max_age_hours=DEFAULT_MAX_AGE_HOURS, per_provider=None, full=False):
+    """Testa todos os modelos de todos os providers, em paralelo.
+
+    Até workers pedidos em simultâneo, no máximo per_provider (ou o limite do
+    cliente assíncrono, PROVIDER_CONCURRENCY) por provider, sempre ao ritmo do
+    rate limiter. Os sucessos com menos de max_age_hours são reaproveitados de
+    CACHE_PATH (full=True testa tudo de novo); o relatório HTML é reescrito à
+    medida que os resultados chegam.
+    """
+    prefs = Preferences()
+
+    # Obter system prompt e chaves API
+    system_prompt = prefs.get_llm_system_prompt()
+    api_keys = {p: prefs.get_llm_api_key(p) for p in LLM_PROVIDERS}
+    usable = {p for p in LLM_PROVIDERS if prefs.has_llm_access(p)}
+    set_custom_endpoint(**prefs.get_llm_custom_endpoint())
 
     # Lista de providers suportados
-    providers = ["groq", "huggingface", "gemini", "mistral", "perplexity", "openrouter", "cloudflare"]
+    providers = list(LLM_PROVIDERS)
 
     # Filtrar providers se especificado
     if limit_providers:
         providers = [p for p in providers if p in limit_providers]
-
-    for provider in providers:
-        print(f"Testando provider: {provider}")
-
-        try:
-            # Obter chave API
-            api_key = prefs.get_llm_api_key(provider)
-            if not api_key:
-                print(f"  Pulando {provider}: chave API não configurada")
-                continue
-
-            # Criar cliente com system prompt
-            client = LLMClient(provider, api_key, system_prompt=system_prompt)
-
-            # Obter lista de modelos
-            try:
-                models = client.list_models()
-            except Exception as e:
-                print(f"  Erro ao obter modelos para {provider}: {e}")
-                continue
-
-            if not models:
-                print(f"  Nenhum modelo encontrado para {provider}")
-                continue
-
-            # Limitar a primeiros 5 modelos por provider para não demorar muito
-            models_to_test = models  # Testar todos os modelos disponíveis
-
-            for model_info in models_to_test:
-                model_id = model_info.get('id', '')
-                model_desc = model_info.get('description', '')
-
-                print(f"  Testando modelo: {model_id}")
-
-                try:
-                    # Criar client com o modelo específico
-                    test_client = LLMClient(provider=provider, api_key=api_key, model=model_id)
-                    # Medir tempo
-                    start_time = time.time()
-                    response = test_client.generate(test_prompt)
-                    end_time = time.time()
-
-                    response_time = round(end_time - start_time, 2)
-                    response_size = len(response)
-
-                    model_results.append({
-                        'provider': provider,
-                        'model': model_id,
-                        'description': model_desc,
-                        'response_time': response_time,
-                        'response_size': response_size,
-                        'response': response,
-                        'success': True
-                    })
-
-                    print(f"    ✓ Tempo: {response_time}s, Tamanho: {response_size} chars")
-
-                except Exception as e:
-                    if isinstance(e, LLMError) and hasattr(e, 'status_code'):
-                        error_msg = f"Status Code: {e.status_code}\nHeaders: {e.headers}\nBody: {e.body}"
-                    else:
-                        error_msg = str(e)
-                        # Tentar extrair corpo de erro se disponível
-                        if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                            error_msg += f"\nCorpo da resposta: {e.response.text}"
-                        elif hasattr(e, 'read'):
-                            try:
-                                error_body = e.read().decode('utf-8')
-                                error_msg += f"\nCorpo do erro: {error_body}"
-                            except Exception:  # pylint: disable=broad-exception-caught
-                                pass
-                    print(f"    ✗ Erro no modelo {model_id}: {error_msg}")
-                    model_results.append({
-                        'provider': provider,
-                        'model': model_id,
-                        'description': model_desc,
-                        'response_time': 0,
-                        'response_size': 0,
-                        'response': f"Erro: {error_msg}",
-                        'success': False
-                    })
-
-                # Espera entre testes para evitar rate limiting
-                time.sleep(2)
-
-        except Exception as e:
-            print(f"Erro geral com provider {provider}: {e}")
-
-    return model_results
-
-
-def generate_html(results):
-    """Gera arquivo HTML com os resultados."""
+    for provider in list(providers):
+        if provider not in usable:
+            print(f"  Pulando {provider}: chave API não configurada")
+            providers.remove(provider)
+        elif per_provider:
+            set_provider_concurrency(provider, per_provider)
+
+    cache = {} if full else _load_cache()
+    last_write = [0.0]
+
+    def on_progress(results, remaining):
+        # Relatório e cache parciais, no máximo a cada REPORT_INTERVAL segundos
+        # (o relatório final é escrito por quem chama)
+        if not remaining or time.monotonic() - last_write[0] < REPORT_INTERVAL:
+            return
+        last_write[0] = time.monotonic()
+        _save_cache(cache)
+        generate_html(results, pending=remaining, quiet=True)
+
+    results = asyncio.run(_probe_all(
+        providers, api_keys, system_prompt, max(1, workers), timeout, max_age_hours * 3600, cache, on_progress))
+    _save_cache(cache)
+    return results
+
+
+def generate_html(results, pending=0, quiet=False):
+    """Gera arquivo HTML com os resultados (pending: testes ainda em curso)."""
     test_prompt = (
         "Resume em 3 bullets as tuas funcionalidades, e o que te destaca, "
         "enquanto versão específica de modelo de linguagem, dos outros modelos."
@@ -163,6 +225,7 @@ def generate_html(results):
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Teste de Modelos LLM</title>
+    {'<meta http-equiv="refresh" content="5">' if pending else ''}
     <style>
         body {{
             font-family: Arial, sans-serif;
@@ -281,7 +344,7 @@ def generate_html(results):
 <body>
     <h1>Teste de Modelos LLM</h1>
     <p>Pergunta de teste: "{test_prompt}"</p>
-    <p>Total de testes realizados: {len(results)}</p>
+    <p>Total de testes realizados: {len(results)}{f" ({pending} em curso)" if pending else ""}</p>
 
     <div class="summary">
         <h2>Resumo dos Testes</h2>
@@ -471,22 +534,35 @@ def generate_html(results):
 </html>
 """
 
-    # Salvar arquivo
-    output_path = Path(__file__).resolve().parent.parent / "llm_tests.html"
-    with open(output_path, 'w', encoding='utf-8') as f:
+    # Salvar arquivo (substituição atómica: o relatório pode estar aberto no browser)
+    output_path = REPORT_PATH
+    fd, tmp = tempfile.mkstemp(dir=output_path.parent, prefix=".llm_tests-", suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
         f.write(html_content)
+    os.replace(tmp, output_path)
 
-    print(f"Arquivo HTML gerado: {output_path}")
+    if not quiet:
+        print(f"Arquivo HTML gerado: {output_path}")
     return output_path
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Testar modelos LLM de providers.")
     parser.add_argument("--limitproviders", nargs="*", help="Lista de providers para limitar o teste (ex.: groq perplexity)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Testes em simultâneo, no total (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--per-provider", type=int, default=None,
+                        help="Testes em simultâneo por provider (default: limite do cliente assíncrono)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_LLM_TIMEOUT,
+                        help=f"Tempo máximo de leitura da resposta, segundos (default: {DEFAULT_LLM_TIMEOUT})")
+    parser.add_argument("--max-age", type=float, default=DEFAULT_MAX_AGE_HOURS,
+                        help=f"Reaproveita sucessos com menos de N horas (default: {DEFAULT_MAX_AGE_HOURS})")
+    parser.add_argument("--full", action="store_true", help="Ignora a cache e testa todos os modelos")
     args = parser.parse_args()
 
     print("Iniciando testes de modelos LLM...")
-    results = test_all_models(limit_providers=args.limitproviders)
+    results = test_all_models(limit_providers=args.limitproviders, workers=args.workers, timeout=args.timeout,
+                              max_age_hours=args.max_age, per_provider=args.per_provider, full=args.full)
     print(f"Testes concluídos. {len(results)} modelos testados.")
 
     if results: